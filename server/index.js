@@ -28,6 +28,15 @@ app.use('/outputs', express.static(path.join(__dirname, 'outputs'), {
       res.set('Accept-Ranges', 'bytes');
       res.set('Content-Type', 'video/mp4');
     }
+    if (filePath.endsWith('.m3u8')) {
+      // Progressive playlists grow while the lecture renders; never cache them
+      res.set('Content-Type', 'application/vnd.apple.mpegurl');
+      res.set('Cache-Control', 'no-cache');
+      return;
+    }
+    if (filePath.endsWith('.ts')) {
+      res.set('Content-Type', 'video/mp2t');
+    }
     // Cache videos for 7 days
     res.set('Cache-Control', 'public, max-age=604800, immutable');
   }
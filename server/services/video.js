@@ -1,7 +1,14 @@
 const { spawn } = require('child_process');
 const path = require('path');
+const readline = require('readline');
 const fs = require('fs').promises;
 
+// Render through one long-lived `src.video_lecture.worker` process so jobs skip
+// interpreter startup, imports and TTS/font initialisation. Set PY_RENDER_WORKER=0
+// to fall back to spawning the CLI per job.
+const USE_WORKER = process.env.PY_RENDER_WORKER !== '0';
+const WORKER_JOBS = parseInt(process.env.PY_RENDER_JOBS || '2', 10);
+
 async function ensureDirs() {
   await fs.mkdir(path.join(__dirname, '..', 'outputs', 'scripts'), { recursive: true });
   await fs.mkdir(path.join(__dirname, '..', 'outputs', 'videos'), { recursive: true });
@@ -13,17 +20,98 @@ function resolvePython() {
   return venvPy; // let spawn try it; if missing, process will error and we can suggest installing
 }
 
-async function generateVideoFromTextFile(textFilePath, opts = {}) {
-  await ensureDirs();
+let worker = null;
+let nextJobId = 1;
+const pendingJobs = new Map();
+
+function getWorker() {
+  if (worker) return worker;
+  const projectRoot = path.join(__dirname, '..', '..');
+  const child = spawn(resolvePython(), ['-m', 'src.video_lecture.worker', '--jobs', String(WORKER_JOBS)], {
+    cwd: projectRoot,
+    shell: false,
+  });
+  let stderrTail = '';
+
+  readline.createInterface({ input: child.stdout }).on('line', (line) => {
+    let msg;
+    try {
+      msg = JSON.parse(line);
+    } catch {
+      return;
+    }
+    const job = pendingJobs.get(msg.id);
+    if (!job) return;
+    if (msg.event === 'result') {
+      pendingJobs.delete(msg.id);
+      job.resolve(msg);
+    } else if (msg.event === 'error') {
+      pendingJobs.delete(msg.id);
+      job.reject(new Error(`Video generation failed: ${msg.error}`));
+    } else if (msg.event === 'playlist') {
+      // Progressive HLS playlist grew (or completed); see opts.onPlaylist
+      if (job.onPlaylist) job.onPlaylist(msg);
+    } else if (job.onProgress) {
+      // stage_start / stage_end / progress events from the build
+      job.onProgress(msg);
+    }
+  });
+  child.stderr.on('data', (d) => {
+    stderrTail = (stderrTail + d.toString()).slice(-4000);
+  });
+
+  const fail = (err) => {
+    if (worker === child) worker = null;
+    for (const [id, job] of pendingJobs) {
+      job.reject(err);
+      pendingJobs.delete(id);
+    }
+  };
+  child.on('error', (err) => fail(new Error(`Failed to start python worker: ${err.message}`)));
+  child.on('exit', (code) => fail(new Error(`Python worker exited (code ${code}): ${stderrTail}`)));
+
+  worker = child;
+  return child;
+}
+
+function runInWorker(args, onProgress, onPlaylist) {
+  const child = getWorker();
+  const id = String(nextJobId++);
+  return new Promise((resolve, reject) => {
+    pendingJobs.set(id, { resolve, reject, onProgress, onPlaylist });
+    child.stdin.write(JSON.stringify({ id, args }) + '\n');
+  });
+}
+
+function runCli(args) {
   const projectRoot = path.join(__dirname, '..', '..');
   const py = resolvePython();
+  return new Promise((resolve, reject) => {
+    const child = spawn(py, ['-m', 'src.video_lecture.cli', ...args], { cwd: projectRoot, shell: false });
+    let stdout = '';
+    let stderr = '';
+
+    child.stdout.on('data', (d) => { stdout += d.toString(); });
+    child.stderr.on('data', (d) => { stderr += d.toString(); });
+
+    child.on('error', (err) => reject(new Error(`Failed to start python: ${err.message}`)));
+    child.on('close', (code) => {
+      if (code !== 0) {
+        return reject(new Error(`Video generation failed (code ${code}): ${stderr || stdout}`));
+      }
+      resolve(stdout);
+    });
+  });
+}
+
+async function generateVideoFromTextFile(textFilePath, opts = {}) {
+  await ensureDirs();
 
   const ts = new Date().toISOString().replace(/[:.]/g, '-');
   const baseName = path.basename(textFilePath, path.extname(textFilePath));
   const outMp4 = path.join(__dirname, '..', 'outputs', 'videos', `${baseName}_${ts}.mp4`);
 
   const args = [
-    '-m', 'src.video_lecture.cli',
     textFilePath,
     '--tts-provider', opts.ttsProvider || 'edge',
     '--theme', opts.theme || 'dark',
@@ -36,24 +124,20 @@ async function generateVideoFromTextFile(textFilePath, opts = {}) {
   if (opts.music) args.push('--music', opts.music);
   if (opts.font) args.push('--font', opts.font);
   if (opts.kenburns) args.push('--kenburns');
+  // With opts.progressive (worker only), an HLS playlist at outM3u8 becomes playable
+  // after the first sections; opts.onPlaylist({ path, segments, duration, complete })
+  // fires each time it grows, so the UI can start playback before the MP4 exists.
+  const progressive = USE_WORKER && opts.progressive;
+  if (progressive) args.push('--progressive');
 
-  return new Promise((resolve, reject) => {
-    const child = spawn(py, args, { cwd: projectRoot, shell: false });
-    let stdout = '';
-    let stderr = '';
-
-    child.stdout.on('data', (d) => { stdout += d.toString(); });
-    child.stderr.on('data', (d) => { stderr += d.toString(); });
-
-    child.on('error', (err) => reject(new Error(`Failed to start python: ${err.message}`)));
-    child.on('close', async (code) => {
-      if (code !== 0) {
-        return reject(new Error(`Video generation failed (code ${code}): ${stderr || stdout}`));
-      }
-      const outSrt = outMp4.replace(/\.mp4$/i, '.srt');
-      resolve({ outMp4, outSrt, stdout });
-    });
-  });
+  const outSrt = outMp4.replace(/\.mp4$/i, '.srt');
+  const outM3u8 = progressive ? outMp4.replace(/\.mp4$/i, path.join('_live', 'index.m3u8')) : null;
+  if (USE_WORKER) {
+    const result = await runInWorker(args, opts.onProgress, opts.onPlaylist);
+    return { outMp4: result.video || outMp4, outSrt: result.srt || outSrt, outM3u8, stdout: JSON.stringify(result) };
+  }
+  const stdout = await runCli(args);
+  return { outMp4, outSrt, outM3u8, stdout };
 }
 
 module.exports = { generateVideoFromTextFile };
@@ -1,22 +1,65 @@
 from __future__ import annotations
 
+import copy
+import itertools
 import os
+import shutil
 import tempfile
-from typing import List, Optional, Tuple
+from concurrent.futures import Future
+from typing import Iterable, List, Optional, Sequence, Tuple
 
-from moviepy import (
-    AudioFileClip,
-    CompositeAudioClip,
-    ImageClip,
-    concatenate_videoclips,
-)
+from moviepy import ImageClip
 
-from .slides import Section, render_slides
+from .audio import assemble_narration
+from .cache import DiskCache
+from .encode import (
+    EncodeProfile, concat_segments, encode_still_frame, package_hls, plan_segments, retime_frames,
+    transition_frames,
+)
+from .kenburns import ZOOM, encode_zoom_segment
+from .transitions import encode_fade_segment
+from .manifest import manifest_path, segment_key, transition_key, write_manifest
+from .metrics import Instrumentation, dir_bytes, moviepy_logger
+from .pipeline import SegmentEncoder, build_streaming
+from .renditions import Rendition, write_master_playlist
+from .slides import Section, SlideFrame, iter_frames
 from .tts import TTS
-from .subtitles import build_subtitles, to_srt
+from .tts_cache import TTSCache
+from .subtitles import SubtitleWriter
+from .timeline import Timeline, TimelineClip
+
+
+# Draft previews: slides at 1/DRAFT_SCALE of the frame size, at most DRAFT_FPS, hard cuts.
+DRAFT_SCALE = 3
+DRAFT_FPS = 10
+DRAFT_BITRATE = "300k"
+DRAFT_PROFILE = EncodeProfile("vfr", crf=30)
+
+
+def progressive_playlist(out_video: str) -> str:
+    """Where `build(progressive=True)` writes the growing HLS playlist for `out_video`."""
+    return os.path.join(os.path.splitext(out_video)[0] + "_live", "index.m3u8")
 
 
 class LectureMaker:
+    """Turns parsed sections into a narrated slide video plus an SRT file.
+
+    `engine` selects how video is encoded: "ffmpeg" encodes each slide as its
+    own segment (a still image, or frames streamed from the zoom engine with
+    `kenburns`) plus a short blended segment for each crossfade, and joins
+    them with the concat demuxer; "moviepy" composites every frame in Python.
+    "auto" picks ffmpeg.
+
+    With a `cache_dir`, narration and (for the ffmpeg engine) encoded slide
+    segments are cached, so a re-render only rebuilds the sections that changed.
+
+    `profile` selects constant-rate encoding or quality-targeted variable frame
+    rate output (see `EncodeProfile`); MoviePy always writes a constant frame
+    rate but uses the profile's rate control and keyframes at slide starts.
+
+    `close()` (or leaving a `with` block) stops the TTS engine processes.
+    """
+
     def __init__(
         self,
         size: Tuple[int, int] = (1920, 1080),
@@ -24,91 +67,601 @@ class LectureMaker:
         font_path: Optional[str] = None,
         voice: Optional[str] = None,
         rate: int = 180,
+        tts_provider: Optional[str] = None,
         kenburns: bool = False,
+        cache_dir: Optional[str] = None,
+        tts_cache_bytes: int = 512 * 1024 * 1024,
+        segment_cache_bytes: int = 2048 * 1024 * 1024,
+        tts_concurrency: int = 4,
+        render_workers: Optional[int] = 0,
+        engine: str = "auto",
+        bitrate: str = "3000k",
+        max_temp_bytes: Optional[int] = None,
+        music_volume: float = 0.2,
+        music_duck: float = 0.4,
+        loudness: Optional[float] = -20.0,
+        profile: Optional[EncodeProfile] = None,
     ):
         self.size = size
+        # Slides at a derived size (drafts, renditions) are laid out like ones at `size`.
+        self.layout_scale = 1.0
+        self.bitrate = bitrate
+        self.profile = profile or EncodeProfile()
+        self.max_temp_bytes = max_temp_bytes
+        # Passed to every `assemble_narration` call, including progressive partial mixes.
+        self.mix_options = {"music_volume": music_volume, "duck": music_duck, "loudness": loudness}
         self.theme = theme
         self.font_path = font_path
         self.kenburns = kenburns
-        self.tts = TTS(voice=voice, rate=rate)
+        self.tts_concurrency = tts_concurrency
+        self.render_workers = render_workers
+        self.engine = engine
+        tts_cache = TTSCache(os.path.join(cache_dir, "tts"), max_bytes=tts_cache_bytes) if cache_dir else None
+        # pyttsx3 runs one engine process per core, up to `tts_concurrency`.
+        self.tts = TTS(
+            voice=voice, rate=rate, provider=tts_provider, cache=tts_cache,
+            workers=min(tts_concurrency, os.cpu_count() or 1),
+        )
+        self.segment_cache = (
+            DiskCache(os.path.join(cache_dir, "segments"), max_bytes=segment_cache_bytes) if cache_dir else None
+        )
+
+    def close(self) -> None:
+        self.tts.close()
+
+    def __enter__(self) -> "LectureMaker":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
 
     def build(
         self,
-        sections: List[Section],
+        sections: Iterable[Section],
         out_video: str,
         out_srt: Optional[str] = None,
         music_path: Optional[str] = None,
         fps: int = 30,
         crossfade: float = 0.3,
         keep_temp: bool = False,
+        instrument: Optional[Instrumentation] = None,
+        streaming: bool = False,
+        queue_depth: int = 4,
+        renditions: Optional[Sequence[Rendition]] = None,
+        progressive: bool = False,
+        draft: bool = False,
     ) -> Tuple[str, Optional[str]]:
+        """Render `sections` to `out_video` and its SRT; returns both paths.
+
+        Pass an `Instrumentation` to collect per-stage/per-section metrics and
+        receive progress events while the build runs. With `streaming` (ffmpeg
+        engine only) narration, rendering and encoding overlap section by
+        section instead of running as whole-deck phases; `sections` may then be
+        any iterable and at most `queue_depth` sections are buffered per stage.
+
+        `renditions` (ffmpeg engine) encodes several sizes/bitrates/containers
+        from one pass of narration, subtitles and mixing; each is written next
+        to `out_video` (see `Rendition.output_path`) and the returned path is
+        the HLS master playlist if there is one, else the first rendition.
+        Renditions always use the batch path (`streaming` is ignored).
+
+        `progressive` implies `streaming` and also writes an HLS playlist
+        (`progressive_playlist(out_video)`) that grows section by section, so
+        playback can start before the MP4 is finished.
+
+        `draft` writes a quick preview with the final render's timeline and
+        subtitles: the same narration (cached for the final render) and mix, but
+        slides at 1/`DRAFT_SCALE` size and `DRAFT_FPS` in `DRAFT_PROFILE`,
+        without fades or zoom.
+        Rendering the same notes again without `draft` only re-encodes the pixels.
+        """
+        if renditions and self.resolve_engine() != "ffmpeg":
+            raise ValueError("Renditions need the ffmpeg engine.")
+        if renditions and len({r.label for r in renditions}) != len(renditions):
+            raise ValueError("Renditions need distinct names (two share a height; set `name`).")
+        if progressive and (renditions or self.resolve_engine() != "ffmpeg"):
+            raise ValueError("Progressive output needs the ffmpeg engine and a single rendition.")
+        if draft and (renditions or progressive):
+            raise ValueError("Draft previews are a single MP4; drop renditions and progressive output.")
+        instr = instrument or Instrumentation()
         tmp_dir = tempfile.mkdtemp(prefix="lecture_")
+        instr.tmp_dir = tmp_dir
+        if out_srt is None:
+            out_srt = os.path.splitext(out_video)[0] + ".srt"
         try:
-            # 1) Render slides to PNGs
-            slides = render_slides(sections, size=self.size, theme=self.theme, font_path=self.font_path)
-            slide_paths: List[str] = []
-            for i, img in enumerate(slides):
-                p = os.path.join(tmp_dir, f"slide_{i:03d}.png")
-                img.save(p)
-                slide_paths.append(p)
-
-            # 2) TTS per section -> wav
-            audio_paths: List[str] = []
-            durations: List[float] = []
-            for i, sec in enumerate(sections):
-                text = f"{sec.title}. {sec.body}" if sec.body else sec.title
-                audio_file = self.tts.synthesize_to_file(text)
-                audio_paths.append(audio_file)
-                with AudioFileClip(audio_file) as a:
-                    durations.append(a.duration)
-
-            # 3) Build subtitle file
-            if out_srt is None:
-                out_srt = os.path.splitext(out_video)[0] + ".srt"
-            srt_text = to_srt(build_subtitles([f"{s.title}. {s.body}" for s in sections], durations))
-            with open(out_srt, "w", encoding="utf-8") as f:
-                f.write(srt_text)
-
-            # 4) Build video clips aligned to audio durations
+            if progressive or (streaming and not renditions and not draft and self.resolve_engine() == "ffmpeg"):
+                os.makedirs(os.path.dirname(os.path.abspath(out_video)) or ".", exist_ok=True)
+                build_streaming(
+                    self, sections, out_video, out_srt, tmp_dir, music_path, fps, crossfade, instr, depth=queue_depth,
+                    playlist_path=progressive_playlist(out_video) if progressive else None, keep_temp=keep_temp,
+                )
+                return out_video, out_srt
+
+            sections = list(sections)
+            n = len(sections)
+            # 1) TTS per section (batched, concurrent for edge-tts)
+            with instr.stage("tts"):
+                done = [0]
+
+                def tts_done(i: int, seconds: float, cached: bool) -> None:
+                    instr.section(i, "tts", seconds, cached=cached)
+                    done[0] += 1
+                    instr.progress("tts", done[0], n)
+
+                texts = [f"{sec.title}. {sec.body}" if sec.body else sec.title for sec in sections]
+                narration = self.tts.synthesize_many(texts, concurrency=self.tts_concurrency, on_done=tts_done)
+                audio_paths = [p for p, _ in narration]
+                durations = [d for _, d in narration]
+
+            os.makedirs(os.path.dirname(os.path.abspath(out_video)) or ".", exist_ok=True)
+            # 2) Build subtitle file
+            with instr.stage("subtitles"), SubtitleWriter(out_srt) as subs:
+                for sec, dur in zip(sections, durations):
+                    subs.add(f"{sec.title}. {sec.body}", dur)
+
+            # 3-6) Render slides, assemble clips, mix music, write output
+            args = (sections, audio_paths, durations, out_video, tmp_dir, music_path, fps, crossfade, instr)
+            if renditions:
+                out_video = self._write_renditions(renditions, *args, keep_temp=keep_temp)
+            elif draft:
+                self._write_draft(*args, keep_temp=keep_temp)
+            elif self.resolve_engine() == "ffmpeg":
+                self._write_ffmpeg(*args, keep_temp=keep_temp)
+            else:
+                self._write_moviepy(*args, keep_temp=keep_temp)
+            return out_video, out_srt
+        finally:
+            if not keep_temp:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def resolve_engine(self) -> str:
+        return "ffmpeg" if self.engine == "auto" else self.engine
+
+    def render_settings(self, fps: int) -> dict:
+        """Everything besides section text that affects a slide segment."""
+        settings = {
+            "size": list(self.size),
+            "theme": self.theme,
+            "font": self.font_path,
+            "fps": fps,
+            "provider": self.tts.provider,
+            "voice": self.tts.voice,
+            "rate": self.tts.rate,
+            "encoder": ["libx264", self.bitrate, "ultrafast", *self.profile.settings()],
+        }
+        if self.kenburns:
+            settings["kenburns"] = ZOOM
+        if self.layout_scale != 1.0:
+            settings["layout_scale"] = round(self.layout_scale, 6)
+        return settings
+
+    def segment_keys(
+        self, section: Section, prev: Optional[Section], settings: dict, frames: int, fade: int, prev_frames: int
+    ) -> Tuple[str, Optional[str]]:
+        """Cache keys of a slide's static segment and of the fade into it (None without one)."""
+        key = segment_key(section, settings, frames - fade, fade if self.kenburns else 0)
+        fade_key = transition_key(prev, section, settings, fade, prev_frames) if fade and prev else None
+        return key, fade_key
+
+    def _encode_segment(
+        self, slide: SlideFrame, frames: int, out_path: str, fps: int, duration: float, offset: int = 0
+    ) -> str:
+        """Encode one slide segment; `duration` is the slide's narration length and
+        `offset` the segment's first frame within the slide."""
+        if self.kenburns:
+            return encode_zoom_segment(
+                slide.image(), frames, out_path, fps=fps, duration=duration, offset=offset, bitrate=self.bitrate,
+                workers=2, profile=self.profile,
+            )
+        return encode_still_frame(
+            slide.data, slide.size, frames, out_path, fps=fps, bitrate=self.bitrate, profile=self.profile
+        )
+
+    def _encode_fade(
+        self,
+        from_slide: SlideFrame,
+        to_slide: SlideFrame,
+        frames: int,
+        out_path: str,
+        fps: int,
+        from_duration: float,
+        from_frames: int,
+        duration: float,
+    ) -> str:
+        """Encode the fade between two slides; the outgoing one has shown `from_frames` frames."""
+        kenburns = (from_duration, from_frames, duration) if self.kenburns else None
+        return encode_fade_segment(
+            from_slide.image(), to_slide.image(), frames, out_path, fps=fps, kenburns=kenburns, bitrate=self.bitrate,
+            profile=self.profile,
+        )
+
+    def _write_moviepy(
+        self,
+        sections: List[Section],
+        audio_paths: List[str],
+        durations: List[float],
+        out_video: str,
+        tmp_dir: str,
+        music_path: Optional[str],
+        fps: int,
+        crossfade: float,
+        instr: Instrumentation,
+        keep_temp: bool = False,
+    ) -> None:
+        # 3) Render slides in memory
+        with instr.stage("render"):
+            def render_done(i: int, seconds: float) -> None:
+                instr.section(i, "render", seconds)
+                instr.progress("render", i + 1, len(sections))
+
+            images = []
+            for i, slide in enumerate(iter_frames(
+                sections, self.size, self.theme, self.font_path, self.render_workers, on_done=render_done,
+                scale=self.layout_scale,
+            )):
+                if keep_temp:
+                    slide.save(os.path.join(tmp_dir, f"slide_{i:03d}.png"))
+                images.append(slide.array().copy())
+                slide.release()
+
+        # 4) Build video clips aligned to audio durations
+        with instr.stage("clips"):
             clips = []
-            for i, (img_path, dur, ap) in enumerate(zip(slide_paths, durations, audio_paths)):
-                clip = ImageClip(img_path, duration=dur).with_audio(AudioFileClip(ap))
+            for img, dur in zip(images, durations):
+                clip = ImageClip(img, duration=dur)
                 # optional gentle zoom effect (slows rendering)
                 if self.kenburns:
-                    clip = clip.resized(lambda t: 1 + 0.02 * (t / max(dur, 0.001)))
+                    clip = clip.resized(lambda t, dur=dur: 1 + 0.02 * (t / max(dur, 0.001)))
                 clips.append(clip)
 
-            video = concatenate_videoclips(clips, method="compose", padding=-crossfade)
+            # Each clip starts `crossfade` before the previous one ends and fades in over it.
+            timeline = Timeline.from_durations(durations, crossfade)
+            video = TimelineClip(clips, timeline, size=self.size, crossfade=crossfade)
 
-            # 5) Optional background music under VO
-            if music_path and os.path.exists(music_path):
-                music = AudioFileClip(music_path).volumex(0.08)
-                video = video.with_audio(CompositeAudioClip([video.audio, music.with_duration(video.duration)]))
+        # 5) Narration at each clip's start, plus music
+        with instr.stage("audio"):
+            audio_path = os.path.join(tmp_dir, "narration.m4a")
+            assemble_narration(
+                audio_paths, timeline.starts, video.duration, audio_path, music_path=music_path, **self.mix_options
+            )
 
-            # 6) Write output
-            os.makedirs(os.path.dirname(os.path.abspath(out_video)) or ".", exist_ok=True)
+        # 6) Write output
+        rate = {"bitrate": self.bitrate}
+        if self.profile.mode != "cbr":
+            keyframes = ",".join(f"{t:.3f}" for t in timeline.starts)
+            rate = {"ffmpeg_params": self.profile.rate_args(self.bitrate) + ["-force_key_frames", keyframes]}
+        with instr.stage("write"):
             video.write_videofile(
                 out_video,
                 fps=fps,
                 codec="libx264",
-                audio_codec="aac",
-                bitrate="3000k",
+                audio=audio_path,
+                audio_codec="copy",
+                **rate,
                 preset="ultrafast",
                 threads=max(1, os.cpu_count() or 4),
-                temp_audiofile=os.path.join(tmp_dir, "temp-audio.m4a"),
-                remove_temp=True,
+                logger=moviepy_logger(instr) if instr.hooks else "bar",
             )
-            return out_video, out_srt
-        finally:
-            if not keep_temp:
-                try:
-                    # Clean temp dir files
-                    for root, _, files in os.walk(tmp_dir, topdown=False):
-                        for name in files:
-                            try:
-                                os.remove(os.path.join(root, name))
-                            except Exception:
-                                pass
-                    os.rmdir(tmp_dir)
-                except Exception:
-                    pass
+
+    def _write_ffmpeg(
+        self,
+        sections: List[Section],
+        audio_paths: List[str],
+        durations: List[float],
+        out_video: str,
+        tmp_dir: str,
+        music_path: Optional[str],
+        fps: int,
+        crossfade: float,
+        instr: Instrumentation,
+        keep_temp: bool = False,
+    ) -> None:
+        segments, starts, total = self.encode_slides(
+            sections, durations, out_video, tmp_dir, fps, crossfade, instr, keep_temp
+        )
+        self.finish_ffmpeg(segments, audio_paths, starts, total, out_video, tmp_dir, music_path, instr)
+
+    def _write_renditions(
+        self,
+        renditions: Sequence[Rendition],
+        sections: List[Section],
+        audio_paths: List[str],
+        durations: List[float],
+        out_video: str,
+        tmp_dir: str,
+        music_path: Optional[str],
+        fps: int,
+        crossfade: float,
+        instr: Instrumentation,
+        keep_temp: bool = False,
+    ) -> str:
+        """Encode every rendition from one narration mix; returns the primary output
+        (the master playlist when any rendition is HLS)."""
+        frames, starts = plan_segments(durations, crossfade, fps)
+        total = sum(frames) / fps
+        audio_path = self._mix_narration(audio_paths, starts, total, tmp_dir, music_path, instr)
+        outputs: List[str] = []
+        for r in renditions:
+            # Slides are rasterized at each rendition's size rather than scaled from another one.
+            maker = self._for_rendition(r)
+            out = r.output_path(out_video)
+            work = os.path.join(tmp_dir, r.label)
+            os.makedirs(work, exist_ok=True)
+            os.makedirs(os.path.dirname(os.path.abspath(out)) or ".", exist_ok=True)
+            segments, _, _ = maker.encode_slides(sections, durations, out, work, fps, crossfade, instr, keep_temp)
+            maker._mux(segments, audio_path, total, out, r.format, tmp_dir, instr)
+            outputs.append(out)
+        if any(r.format == "hls" for r in renditions):
+            return write_master_playlist(os.path.splitext(out_video)[0] + ".m3u8", renditions, outputs)
+        return outputs[0]
+
+    def _write_draft(
+        self,
+        sections: List[Section],
+        audio_paths: List[str],
+        durations: List[float],
+        out_video: str,
+        tmp_dir: str,
+        music_path: Optional[str],
+        fps: int,
+        crossfade: float,
+        instr: Instrumentation,
+        keep_temp: bool = False,
+    ) -> None:
+        """Quick preview on the final render's timeline: the same narration mix and
+        section starts, with small, low-fps, hard-cut slides."""
+        frames, starts = plan_segments(durations, crossfade, fps)
+        total = sum(frames) / fps
+        draft_fps = min(fps, DRAFT_FPS)
+        segments, _, _ = self._for_draft().encode_slides(
+            sections, durations, out_video, tmp_dir, draft_fps, 0.0, instr, keep_temp,
+            frames=retime_frames(frames, fps, draft_fps),
+        )
+        self.finish_ffmpeg(segments, audio_paths, starts, total, out_video, tmp_dir, music_path, instr)
+
+    def _for_draft(self) -> "LectureMaker":
+        maker = copy.copy(self)
+        w, h = self.size
+        maker.size = (max(2, w // DRAFT_SCALE // 2 * 2), max(2, h // DRAFT_SCALE // 2 * 2))
+        maker.layout_scale = self.layout_scale * maker.size[1] / h
+        maker.bitrate = DRAFT_BITRATE
+        maker.profile = DRAFT_PROFILE
+        maker.kenburns = False
+        return maker
+
+    def _for_rendition(self, rendition: Rendition) -> "LectureMaker":
+        # Shares the TTS engine and caches; only the frame size and bitrate differ.
+        maker = copy.copy(self)
+        maker.size = rendition.size
+        maker.layout_scale = self.layout_scale * rendition.size[1] / self.size[1]
+        maker.bitrate = rendition.bitrate
+        return maker
+
+    def encode_slides(
+        self,
+        sections: List[Section],
+        durations: List[float],
+        out_video: str,
+        tmp_dir: str,
+        fps: int,
+        crossfade: float,
+        instr: Instrumentation,
+        keep_temp: bool = False,
+        frames: Optional[List[int]] = None,
+        lead: int = 0,
+    ) -> Tuple[List[str], List[float], float]:
+        """Encode (or reuse) every slide and fade segment of the ffmpeg engine.
+
+        `durations` are the sections' narration lengths in seconds, and `crossfade`
+        the fade between consecutive slides. Segments are written to `tmp_dir` (or
+        taken from the segment cache), and the build manifest is written next to
+        `out_video`; the video itself is not. `frames` overrides the per-slide frame
+        counts that `plan_segments` would give. The first `lead` sections only
+        supply the slide and timing of the fade into the next one (a shard's
+        predecessor); their own segments are left out, and starts and total still
+        cover every section.
+
+        Returns (segments, starts, total): segment paths in playback order, each
+        section's start in seconds, and the length of the whole timeline.
+        """
+        # 3) One static segment per slide, cut where the next clip covers it, preceded by
+        # a short fade segment where it covers the previous slide. Segments already in
+        # the cache are reused; only slides with a missing segment are rendered.
+        n = len(sections)
+        if frames is None:
+            frames, starts = plan_segments(durations, crossfade, fps)
+        else:
+            starts = [f / fps for f in itertools.accumulate([0] + frames[:-1])]
+        fades = [0] + [transition_frames(d, crossfade, fps) for d in durations[1:]]
+        settings = self.render_settings(fps)
+        keys: List[str] = []
+        fade_keys: List[Optional[str]] = []
+        for i, sec in enumerate(sections):
+            key, fade_key = self.segment_keys(
+                sec, sections[i - 1] if i else None, settings, frames[i], fades[i], frames[i - 1] if i else 0
+            )
+            keys.append(key)
+            fade_keys.append(fade_key)
+        own = range(lead, n)
+        statics: List[Optional[str]] = [self._cached_segment(k) if i >= lead else None for i, k in enumerate(keys)]
+        fade_segs: List[Optional[str]] = [
+            self._cached_segment(k) if k and i >= lead else None for i, k in enumerate(fade_keys)
+        ]
+        stale = [i for i in own if statics[i] is None or (fade_keys[i] and fade_segs[i] is None)]
+        need = sorted(
+            {i for i in own if statics[i] is None}
+            | {j for i in own if fade_keys[i] and fade_segs[i] is None for j in (i - 1, i)}
+        )
+        # 4) Render the slides that are needed, in order, and hand each to the encoders in
+        # memory; a slide is freed once the segments using it are encoded.
+        with instr.stage("encode"):
+            todo = sum(1 for i in own if statics[i] is None) + sum(
+                1 for i in own if fade_keys[i] and fade_segs[i] is None
+            )
+            done = [0]
+
+            def encode_done(i: int, stage: str) -> None:
+                done[0] += 1
+                instr.progress("encode", done[0], todo)
+
+            def render_done(j: int, seconds: float) -> None:
+                instr.section(need[j], "render", seconds)
+                instr.progress("render", j + 1, len(need))
+
+            encoder = SegmentEncoder(self, fps, instr, tmp_dir, backlog=4, on_done=encode_done)
+            futures: List[Tuple[int, str, Future]] = []
+            prev: Optional[SlideFrame] = None
+            slides = iter_frames(
+                [sections[i] for i in need], self.size, self.theme, self.font_path, self.render_workers,
+                on_done=render_done, scale=self.layout_scale,
+            )
+            try:
+                for i, slide in zip(need, slides):
+                    if keep_temp:
+                        slide.save(os.path.join(tmp_dir, f"slide_{i:03d}.png"))
+                    # Lead slides are only rendered for the fade into the first own one.
+                    if i >= lead and fade_keys[i] and fade_segs[i] is None:
+                        out = os.path.join(tmp_dir, f"fade_{i:03d}.mp4")
+                        args = (prev, slide, fades[i], out, fps, durations[i - 1], frames[i - 1], durations[i])
+                        futures.append((i, "fade", encoder.submit(
+                            self._encode_fade, args, [prev, slide], i, "fade", fades[i], fade_keys[i]
+                        )))
+                    if i >= lead and statics[i] is None:
+                        out = os.path.join(tmp_dir, f"segment_{i:03d}.mp4")
+                        count = frames[i] - fades[i]
+                        args = (slide, count, out, fps, durations[i], fades[i] if self.kenburns else 0)
+                        futures.append((i, "encode", encoder.submit(
+                            self._encode_segment, args, [slide], i, "encode", count, keys[i]
+                        )))
+                    if prev is not None:
+                        prev.release()
+                    prev = slide  # kept for the fade into the next slide
+            finally:
+                slides.close()  # frees slides rendered ahead if encoding failed
+                if prev is not None:
+                    prev.release()
+                encoder.shutdown()
+            for i, stage, fut in futures:
+                if stage == "fade":
+                    fade_segs[i] = fut.result()
+                else:
+                    statics[i] = fut.result()
+        total = sum(frames) / fps
+
+        segments: List[str] = []
+        for i in own:
+            if fade_segs[i]:
+                segments.append(fade_segs[i])
+            segments.append(statics[i])
+        self._write_manifest(
+            out_video, settings, [s.content_hash() for s in sections[lead:]], keys[lead:], durations[lead:],
+            frames[lead:], [i - lead for i in stale], fade_keys[lead:], fades[lead:],
+        )
+        return segments, starts, total
+
+    def _check_temp(self, tmp_dir: str) -> None:
+        """Abort the build if its temp dir has outgrown `max_temp_bytes`.
+
+        Checked before and after every segment encode and the mix, and before
+        the final join, so the build stops at the next step past the limit; a
+        single write can still take it over.
+        """
+        if self.max_temp_bytes and dir_bytes(tmp_dir) > self.max_temp_bytes:
+            raise RuntimeError(
+                f"Temp disk usage in {tmp_dir} exceeded the {self.max_temp_bytes / (1024 * 1024):.0f} MB limit"
+            )
+
+    def _cached_segment(self, key: str) -> Optional[str]:
+        hit = self.segment_cache.get(key) if self.segment_cache is not None else None
+        return hit[0] if hit else None
+
+    def _cache_segment(self, key: str, path: str, duration: float) -> str:
+        if self.segment_cache is None:
+            return path
+        return self.segment_cache.put(key, path, duration)[0]
+
+    def _write_manifest(
+        self,
+        out_video: str,
+        settings: dict,
+        hashes: List[str],
+        keys: List[str],
+        durations: List[float],
+        frames: List[int],
+        rebuilt: List[int],
+        fade_keys: Optional[List[Optional[str]]] = None,
+        fades: Optional[List[int]] = None,
+    ) -> None:
+        if self.segment_cache is None:
+            return
+        rebuilt_set = set(rebuilt)
+        entries = [
+            {
+                "hash": h,
+                "segment": key,
+                "duration": dur,
+                "frames": n,
+                "fade": fade_keys[i] if fade_keys else None,
+                "fade_frames": fades[i] if fades else 0,
+                "rebuilt": i in rebuilt_set,
+            }
+            for i, (h, key, dur, n) in enumerate(zip(hashes, keys, durations, frames))
+        ]
+        write_manifest(manifest_path(out_video), settings, entries)
+
+    def finish_ffmpeg(
+        self,
+        segments: List[str],
+        audio_paths: List[str],
+        starts: List[float],
+        total: float,
+        out_video: str,
+        tmp_dir: str,
+        music_path: Optional[str],
+        instr: Instrumentation,
+    ) -> None:
+        """Mix narration and music, then join `segments` with the mix into `out_video`.
+
+        `audio_paths[i]` starts at `starts[i]` seconds and the output is `total`
+        seconds long; segments are joined without re-encoding. The mix is written
+        to `tmp_dir`.
+        """
+        audio_path = self._mix_narration(audio_paths, starts, total, tmp_dir, music_path, instr)
+        self._mux(segments, audio_path, total, out_video, "mp4", tmp_dir, instr)
+
+    def _mix_narration(
+        self,
+        audio_paths: List[str],
+        starts: List[float],
+        total: float,
+        tmp_dir: str,
+        music_path: Optional[str],
+        instr: Instrumentation,
+    ) -> str:
+        # 5) Narration laid out on the same timeline (overlapping by `crossfade`), plus music
+        with instr.stage("audio"):
+            self._check_temp(tmp_dir)
+            audio_path = assemble_narration(
+                audio_paths, starts, total, os.path.join(tmp_dir, "narration.m4a"),
+                music_path=music_path, **self.mix_options,
+            )
+            self._check_temp(tmp_dir)
+            return audio_path
+
+    def _mux(
+        self,
+        segments: List[str],
+        audio_path: str,
+        total: float,
+        out_path: str,
+        fmt: str,
+        tmp_dir: str,
+        instr: Instrumentation,
+    ) -> None:
+        # 6) Join segments without re-encoding video
+        with instr.stage("write"):
+            self._check_temp(tmp_dir)
+            if fmt == "hls":
+                package_hls(segments, out_path, audio_path, duration=total)
+            else:
+                concat_segments(segments, out_path, audio_path=audio_path, duration=total, audio_codec="copy")
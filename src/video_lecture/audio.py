@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import wave
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .encode import ffmpeg_exe, probe_media, run_ffmpeg
+
+# MPEG audio header tables, indexed by [version][layer][bitrate index] (kbit/s).
+_MPEG1, _MPEG2, _MPEG25 = 3, 2, 0
+_BITRATES = {
+    _MPEG1: {
+        3: (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),  # layer I
+        2: (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),  # layer II
+        1: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),  # layer III
+    },
+    _MPEG2: {
+        3: (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+        2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+        1: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    },
+}
+_BITRATES[_MPEG25] = _BITRATES[_MPEG2]
+_SAMPLE_RATES = {_MPEG1: (44100, 48000, 32000), _MPEG2: (22050, 24000, 16000), _MPEG25: (11025, 12000, 8000)}
+
+# Narration files decoded per ffmpeg run; only files near the mix position are held in memory.
+_DECODE_BATCH = 16
+_BLOCK = 10.0  # seconds of audio mixed per numpy pass
+_WINDOW = 0.01  # analysis window for loudness and ducking (seconds)
+_GATE_DB = -50.0  # windows quieter than this are silence, not speech
+_HOLD = 0.25  # music stays ducked this long around speech (seconds)
+_RAMP = 0.3  # length of the duck's fade in and out (seconds)
+_PEAK = 0.95  # normalization never pushes a narration file's peak above this
+
+
+def probe_duration(path: str) -> float:
+    """Duration of an audio file in seconds, read from its header where possible.
+
+    WAV files use the RIFF header; MP3 files use the Xing/Info or VBRI frame
+    count, or the bitrate for constant-bitrate streams (what edge-tts writes).
+    Anything else is handed to ffmpeg, which only reads the container header.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        if ext == ".wav":
+            with wave.open(path, "rb") as w:
+                return w.getnframes() / float(w.getframerate())
+        if ext == ".mp3":
+            dur = _mp3_duration(path)
+            if dur is not None:
+                return dur
+    except (OSError, EOFError, wave.Error):
+        pass
+    return _ffmpeg_duration(path)
+
+
+def _mp3_duration(path: str) -> Optional[float]:
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        head = f.read(10)
+        start = 0
+        if head[:3] == b"ID3" and len(head) == 10:
+            start = 10 + ((head[6] & 0x7F) << 21 | (head[7] & 0x7F) << 14 | (head[8] & 0x7F) << 7 | (head[9] & 0x7F))
+            if head[5] & 0x10:
+                start += 10  # footer
+        f.seek(start)
+        buf = f.read(64 * 1024)
+        f.seek(max(0, size - 128))
+        tail = size - 128 if f.read(3) == b"TAG" else size  # ID3v1
+
+    for pos in range(len(buf) - 4):
+        if buf[pos] != 0xFF or buf[pos + 1] & 0xE0 != 0xE0:
+            continue
+        frame = _parse_frame(buf, pos)
+        if frame is None:
+            continue
+        version, layer, kbps, rate, spf, length, mono = frame
+        nxt = pos + length
+        # A lone 0xFFE pattern can appear in tag data; require the next header too.
+        if nxt + 4 <= len(buf) and _parse_frame(buf, nxt) is None:
+            continue
+        if layer == 1:
+            side = (17 if mono else 32) if version == _MPEG1 else (9 if mono else 17)
+            xing = pos + 4 + side
+            if buf[xing:xing + 4] in (b"Xing", b"Info") and buf[xing + 7] & 0x01:
+                frames = int.from_bytes(buf[xing + 8:xing + 12], "big")
+                return frames * spf / float(rate)
+            vbri = pos + 36
+            if buf[vbri:vbri + 4] == b"VBRI":
+                frames = int.from_bytes(buf[vbri + 14:vbri + 18], "big")
+                return frames * spf / float(rate)
+        return (tail - start - pos) * 8.0 / (kbps * 1000)
+    return None
+
+
+def _parse_frame(buf: bytes, pos: int):
+    if pos + 4 > len(buf) or buf[pos] != 0xFF or buf[pos + 1] & 0xE0 != 0xE0:
+        return None
+    b1, b2, b3 = buf[pos + 1], buf[pos + 2], buf[pos + 3]
+    version = (b1 >> 3) & 0x03
+    layer = (b1 >> 1) & 0x03
+    br_index = b2 >> 4
+    sr_index = (b2 >> 2) & 0x03
+    if version == 1 or layer == 0 or br_index in (0, 15) or sr_index == 3:
+        return None
+    kbps = _BITRATES[version][layer][br_index]
+    rate = _SAMPLE_RATES[version][sr_index]
+    padding = (b2 >> 1) & 0x01
+    if layer == 3:
+        spf = 384
+        length = (12 * kbps * 1000 // rate + padding) * 4
+    else:
+        spf = 1152 if (layer == 2 or version == _MPEG1) else 576
+        length = (spf // 8) * kbps * 1000 // rate + padding
+    return version, layer, kbps, rate, spf, length, (b3 >> 6) == 3
+
+
+def _ffmpeg_duration(path: str) -> float:
+    dur, _ = probe_media(path)
+    if dur is None:
+        raise RuntimeError(f"Could not read the duration of {path}")
+    return dur
+
+
+def assemble_narration(
+    audio_paths: Sequence[str],
+    starts: Sequence[float],
+    total: float,
+    out_path: str,
+    music_path: Optional[str] = None,
+    music_volume: float = 0.2,
+    duck: float = 0.4,
+    loudness: Optional[float] = -20.0,
+    sample_rate: int = 44100,
+    codec: str = "aac",
+    bitrate: str = "192k",
+    offset: float = 0.0,
+    music: Optional[np.ndarray] = None,
+) -> str:
+    """Lay every narration file at its start time, mix in music and encode one track.
+
+    Inputs are decoded once to float PCM and mixed block by block in NumPy, and
+    the finished stereo mix is piped to a single ffmpeg encode. Each narration
+    file is normalized to `loudness` dB RMS over its voiced windows (None keeps
+    it as is), so clips match each other and a partial mix matches the full one.
+    Overlaps (the crossfade between sections) are summed. Music loops to length
+    at `music_volume` and is ducked to `duck` times that around speech. The
+    track is exactly `total` seconds; with `offset` it covers only
+    [offset, total) of that timeline. `music` is the music already decoded by
+    `decode_music`, for callers that mix many slices of one timeline.
+    """
+    sr = sample_rate
+    win = max(1, int(round(sr * _WINDOW)))
+    first = int(round(offset * sr))
+    length = max(0, int(round(total * sr)) - first)
+    hold, ramp = int(round(_HOLD / _WINDOW)), int(round(_RAMP / _WINDOW / 2))
+    lookahead = (hold + ramp + 1) * win
+    base = os.path.splitext(out_path)[0]
+
+    # (start sample relative to the output, path), in start order
+    queue = sorted((int(round(st * sr)) - first, p) for p, st in zip(audio_paths, starts))
+    clips: List[Tuple[int, np.ndarray]] = []
+    speech = np.zeros(length // win + 1, dtype=bool)
+    if music is None and music_path:
+        music = decode_music(music_path, sr, base + ".music")
+    if music is not None and not len(music):
+        music = None
+
+    def load(until: int) -> None:
+        while queue and queue[0][0] < until:
+            batch = queue[:_DECODE_BATCH]
+            del queue[:len(batch)]
+            decoded = _decode([p for _, p in batch], sr, 1, f"{base}.voice{len(clips):05d}")
+            for (st, _), pcm in zip(batch, decoded):
+                clip, voiced = _normalize(pcm[:, 0], win, loudness)
+                idx = np.flatnonzero(voiced) + st // win
+                speech[idx[(idx >= 0) & (idx < len(speech))]] = True
+                clips.append((st, clip))
+
+    def blocks():
+        step = int(_BLOCK * sr)
+        for a in range(0, length, step):
+            b = min(length, a + step)
+            load(b + lookahead)
+            voice = np.zeros(b - a, dtype=np.float32)
+            for st, clip in clips:
+                lo, hi = max(a, st), min(b, st + len(clip))
+                if hi > lo:
+                    voice[lo - a:hi - a] += clip[lo - st:hi - st]
+            clips[:] = [c for c in clips if c[0] + len(c[1]) > b]
+            mix = np.repeat(voice[:, None], 2, axis=1)
+            if music is not None:
+                w0 = a // win
+                gain = _duck_gain(speech, w0, (b - 1) // win + 1, hold, ramp, duck)
+                centers = (np.arange(len(gain)) + w0) * win + win / 2.0
+                env = (np.interp(np.arange(a, b), centers, gain) * music_volume).astype(np.float32)
+                mix += music[(np.arange(a, b) + first) % len(music)] * env[:, None]
+            yield mix.astype("<f4").tobytes()
+
+    return _encode_pcm(blocks(), sr, out_path, codec, bitrate)
+
+
+def decode_music(music_path: str, sample_rate: int = 44100, tmp_base: Optional[str] = None) -> Optional[np.ndarray]:
+    """Decode a music file to stereo float PCM for `assemble_narration`; None if it does not exist."""
+    if not os.path.exists(music_path):
+        return None
+    return _decode([music_path], sample_rate, 2, tmp_base or os.path.splitext(music_path)[0])[0]
+
+
+def _decode(paths: Sequence[str], sample_rate: int, channels: int, tmp_base: str) -> List[np.ndarray]:
+    # One ffmpeg run decodes every file to its own raw float file; returns (samples, channels) arrays.
+    args: List[str] = []
+    raws: List[str] = []
+    for p in paths:
+        args += ["-i", p]
+    for k in range(len(paths)):
+        raw = f"{tmp_base}.{k:03d}.f32"
+        args += ["-map", f"{k}:a:0", "-ac", str(channels), "-ar", str(sample_rate), "-f", "f32le", raw]
+        raws.append(raw)
+    try:
+        run_ffmpeg(args)
+        return [np.fromfile(raw, dtype="<f4").reshape(-1, channels) for raw in raws]
+    finally:
+        for raw in raws:
+            try:
+                os.remove(raw)
+            except OSError:
+                pass
+
+
+def _normalize(clip: np.ndarray, win: int, loudness: Optional[float]) -> Tuple[np.ndarray, np.ndarray]:
+    # Scale a mono clip to `loudness` dB RMS over its voiced windows; also return which windows are voiced.
+    n = len(clip) // win
+    power = np.square(clip[:n * win], dtype=np.float64).reshape(n, win).mean(axis=1)
+    voiced = power > 10 ** (_GATE_DB / 10)
+    if loudness is None or not voiced.any():
+        return clip, voiced
+    gain = 10 ** ((loudness - 10 * np.log10(power[voiced].mean())) / 20)
+    gain = min(gain, _PEAK / float(np.abs(clip).max()))
+    return clip * np.float32(gain), voiced
+
+
+def _duck_gain(speech: np.ndarray, w0: int, w1: int, hold: int, ramp: int, duck: float) -> np.ndarray:
+    # Music gain for analysis windows [w0, w1): speech is widened by `hold` windows
+    # each side, then smoothed with a (2 * ramp + 1)-window moving average.
+    pad = hold + ramp
+    seg = np.zeros(w1 - w0 + 2 * pad, dtype=np.float32)
+    lo, hi = max(0, w0 - pad), min(len(speech), w1 + pad)
+    if hi > lo:
+        seg[lo - (w0 - pad):hi - (w0 - pad)] = speech[lo:hi]
+    held = sliding_window_view(seg, 2 * hold + 1).max(axis=1)
+    smooth = sliding_window_view(held, 2 * ramp + 1).mean(axis=1)
+    return 1.0 - (1.0 - duck) * smooth
+
+
+def _encode_pcm(blocks, sample_rate: int, out_path: str, codec: str, bitrate: Optional[str]) -> str:
+    # Pipe interleaved stereo float32 PCM blocks into one ffmpeg audio encode.
+    cmd = [
+        ffmpeg_exe(), "-y", "-hide_banner", "-loglevel", "error",
+        "-f", "f32le", "-ar", str(sample_rate), "-ac", "2", "-i", "-", "-c:a", codec,
+    ]
+    if bitrate:
+        cmd += ["-b:a", bitrate]
+    proc = subprocess.Popen(cmd + [out_path], stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        for block in blocks:
+            proc.stdin.write(block)
+    except BrokenPipeError:
+        pass  # ffmpeg exited early; its error is reported below
+    finally:
+        try:
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
+    err = proc.stderr.read()
+    if proc.wait() != 0:
+        err = err.decode("utf-8", "replace").strip()[-2000:]
+        raise RuntimeError(f"ffmpeg failed (code {proc.returncode}): {err}")
+    return out_path
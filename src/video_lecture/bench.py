@@ -0,0 +1,348 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from .metrics import Instrumentation, peak_rss_mb
+from .slides import Section, render_slide, render_slides, split_script
+from .subtitles import build_subtitles, to_srt
+
+
+def synthetic_sections(count: int) -> list:
+    sections = []
+    for i in range(count):
+        bullets = "\n".join(
+            f"- Point {j + 1} of slide {i + 1}: a sentence long enough to wrap across the slide width."
+            for j in range(4)
+        )
+        sections.append(Section(title=f"Topic {i + 1}: benchmarking the lecture pipeline", body=bullets))
+    return sections
+
+
+def synthetic_notes(count: int) -> str:
+    """Markdown notes with `count` headed sections, deterministic for a given count."""
+    parts = []
+    for i in range(count):
+        parts.append(f"## Topic {i + 1}: benchmarking the lecture pipeline")
+        parts.append(
+            f"Section {i + 1} introduces an idea. It has a few sentences of narration! "
+            "Does it wrap and split the way real notes do? It should."
+        )
+        for j in range(3):
+            parts.append(f"- Point {j + 1}: a bullet long enough to wrap across the slide width at 1080p.")
+        parts.append("")
+    return "\n".join(parts)
+
+
+def _timed(fn: Callable[[], object], repeat: int = 1) -> Tuple[float, object]:
+    best = float("inf")
+    result = None
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def bench_slides(count: int = 200, size: Tuple[int, int] = (1920, 1080), workers: Optional[int] = 0) -> dict:
+    """Time serial vs process-pool slide rendering and check the output matches."""
+    sections = synthetic_sections(count)
+
+    t0 = time.perf_counter()
+    serial = render_slides(sections, size=size, workers=1)
+    t_serial = time.perf_counter() - t0
+
+    n_workers = workers or os.cpu_count() or 1
+    render_slides(sections[: n_workers * 2], size=size, workers=n_workers)  # warm up the pool
+    t0 = time.perf_counter()
+    parallel = render_slides(sections, size=size, workers=n_workers)
+    t_parallel = time.perf_counter() - t0
+
+    identical = all(a.tobytes() == b.tobytes() for a, b in zip(serial, parallel))
+    return {
+        "slides": count,
+        "size": list(size),
+        "workers": n_workers,
+        "serial_s": round(t_serial, 3),
+        "parallel_s": round(t_parallel, 3),
+        "speedup": round(t_serial / t_parallel, 2) if t_parallel else None,
+        "identical": identical,
+    }
+
+
+def bench_stages(count: int, size: Tuple[int, int], repeat: int = 3) -> dict:
+    """Micro-benchmarks for parsing, slide rendering and subtitles on `count` sections."""
+    text = synthetic_notes(count)
+    t_split, sections = _timed(lambda: split_script(text), repeat)
+    sample = sections[: min(len(sections), 20)]
+    t_render, _ = _timed(lambda: [render_slide(s, size=size) for s in sample], 1)
+    texts = [f"{s.title}. {s.body}" for s in sections]
+    durations = [2.0 + (i % 7) * 0.5 for i in range(len(sections))]
+    t_subs, subs = _timed(lambda: build_subtitles(texts, durations), repeat)
+    t_srt, _ = _timed(lambda: to_srt(subs), repeat)
+    return {
+        "sections": len(sections),
+        "split_script_s": round(t_split, 4),
+        "render_slide_ms": round(1000 * t_render / max(len(sample), 1), 2),
+        "slides_per_sec": round(len(sample) / t_render, 2) if t_render else None,
+        "build_subtitles_s": round(t_subs, 4),
+        "to_srt_s": round(t_srt, 4),
+        "subtitles": len(subs),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def bench_build(
+    count: int,
+    size: Tuple[int, int],
+    fps: int,
+    engine: str = "auto",
+    crossfade: float = 0.3,
+    workdir: Optional[str] = None,
+) -> dict:
+    """End-to-end LectureMaker.build with the stub TTS provider (no network, no speech engine)."""
+    from .assemble import LectureMaker
+
+    workdir = workdir or tempfile.mkdtemp(prefix="bench_")
+    sections = split_script(synthetic_notes(count))
+    maker = LectureMaker(size=size, tts_provider="stub", engine=engine, cache_dir=None)
+    instr = Instrumentation()
+    out = os.path.join(workdir, f"build_{count}.mp4")
+    t0 = time.perf_counter()
+    maker.build(sections, out, fps=fps, crossfade=crossfade, instrument=instr)
+    wall = time.perf_counter() - t0
+    report = instr.report()
+    video_s = sum(_narration_durations(maker, sections)) - crossfade * (len(sections) - 1)
+    return {
+        "sections": count,
+        "engine": maker.resolve_engine(),
+        "wall_s": round(wall, 3),
+        "slides_per_sec": round(count / wall, 2),
+        "output_s": round(video_s, 1),
+        "output_sec_per_wall_sec": round(video_s / wall, 2),
+        "stages": {s["stage"]: s["wall_s"] for s in report["stages"]},
+        "peak_rss_mb": report["peak_rss_mb"],
+        "output_bytes": os.path.getsize(out),
+    }
+
+
+def _narration_durations(maker, sections: Sequence[Section]) -> List[float]:
+    return [maker.tts.stub_duration(f"{s.title}. {s.body}" if s.body else s.title) for s in sections]
+
+
+def make_avatar_clip(path: str, seconds: float = 2.0, size: Tuple[int, int] = (320, 240), fps: int = 24) -> str:
+    """Synthetic talking-head stand-in (test pattern + tone) for scene benchmarks."""
+    from .encode import run_ffmpeg
+
+    run_ffmpeg([
+        "-f", "lavfi", "-i", f"testsrc=size={size[0]}x{size[1]}:rate={fps}:duration={seconds}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest", path,
+    ])
+    return path
+
+
+def bench_scenes(count: int, size: Tuple[int, int], fps: int, workdir: Optional[str] = None) -> dict:
+    from .scene_compose import compose_scenes
+
+    workdir = workdir or tempfile.mkdtemp(prefix="bench_")
+    avatar = make_avatar_clip(os.path.join(workdir, "avatar.mp4"), fps=fps)
+    scenes = [{"title": f"Scene {i + 1}", "visual": "A diagram of the pipeline", "avatar_video": avatar} for i in range(count)]
+    out = os.path.join(workdir, f"scenes_{count}.mp4")
+    t, _ = _timed(lambda: compose_scenes(scenes, out, size=size, fps=fps))
+    return {"scenes": count, "wall_s": round(t, 3), "scenes_per_sec": round(count / t, 2), "peak_rss_mb": peak_rss_mb()}
+
+
+def bench_kenburns(seconds: float, size: Tuple[int, int], fps: int, workdir: Optional[str] = None) -> dict:
+    """One slide encoded static vs with the zoom engine, plus the old MoviePy paths for reference."""
+    from moviepy import ImageClip
+
+    from .encode import encode_still_frame
+    from .kenburns import ZOOM, encode_zoom_segment
+
+    workdir = workdir or tempfile.mkdtemp(prefix="bench_")
+    png = os.path.join(workdir, "kenburns.png")
+    slide = render_slide(synthetic_sections(1)[0], size=size)
+    slide.save(png)
+    frames = int(round(seconds * fps))
+    t_static, _ = _timed(
+        lambda: encode_still_frame(slide.tobytes(), size, frames, os.path.join(workdir, "kb_static.mp4"), fps=fps)
+    )
+    t_zoom, _ = _timed(
+        lambda: encode_zoom_segment(png, frames, os.path.join(workdir, "kb_zoom.mp4"), fps=fps, duration=seconds)
+    )
+
+    def moviepy(zoom: bool) -> None:
+        clip = ImageClip(png, duration=seconds)
+        if zoom:
+            clip = clip.resized(lambda t: 1 + ZOOM * t / seconds)
+        clip.write_videofile(
+            os.path.join(workdir, f"kb_moviepy_{int(zoom)}.mp4"),
+            fps=fps, codec="libx264", bitrate="3000k", preset="ultrafast", audio=False, logger=None,
+        )
+
+    t_mp_static, _ = _timed(lambda: moviepy(False))
+    t_mp_zoom, _ = _timed(lambda: moviepy(True))
+    return {
+        "seconds": seconds,
+        "frames": frames,
+        "static_s": round(t_static, 3),
+        "zoom_s": round(t_zoom, 3),
+        "moviepy_static_s": round(t_mp_static, 3),
+        "moviepy_zoom_s": round(t_mp_zoom, 3),
+        "zoom_vs_static": round(t_zoom / t_static, 2) if t_static else None,
+        "zoom_vs_moviepy_static": round(t_zoom / t_mp_static, 2) if t_mp_static else None,
+    }
+
+
+def bench_timeline(counts: Sequence[int] = (10, 100, 1000), samples: int = 200, crossfade: float = 0.3) -> dict:
+    """Per-frame lookup cost of TimelineClip vs compose concatenation as the section count grows."""
+    import random
+
+    import numpy as np
+    from moviepy import ImageClip, concatenate_videoclips
+
+    from .timeline import Timeline, TimelineClip
+
+    frame = np.zeros((36, 64, 3), dtype=np.uint8)
+    results = {}
+    for n in counts:
+        durations = [2.0 + (i % 7) * 0.5 for i in range(n)]
+        clips = [ImageClip(frame, duration=d) for d in durations]
+        timeline = TimelineClip(clips, Timeline.from_durations(durations, crossfade))
+        compose = concatenate_videoclips(clips, method="compose", padding=-crossfade)
+        rng = random.Random(n)
+        times = [rng.uniform(0, timeline.duration - 0.01) for _ in range(samples)]
+        t_timeline, _ = _timed(lambda: [timeline.get_frame(t) for t in times], 3)
+        t_compose, _ = _timed(lambda: [compose.get_frame(t) for t in times], 1)
+        results[str(n)] = {
+            "timeline_frame_us": round(1e6 * t_timeline / samples, 1),
+            "compose_frame_us": round(1e6 * t_compose / samples, 1),
+        }
+    return results
+
+
+def _git_rev() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run_suite(
+    sizes: Sequence[int],
+    build_sizes: Sequence[int],
+    scene_sizes: Sequence[int],
+    size: Tuple[int, int],
+    fps: int,
+    kenburns_seconds: float = 5.0,
+) -> dict:
+    workdir = tempfile.mkdtemp(prefix="bench_")
+    try:
+        return {
+            "meta": {
+                "rev": _git_rev(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "size": list(size),
+                "fps": fps,
+            },
+            "stages": {str(n): bench_stages(n, size) for n in sizes},
+            "build": {str(n): bench_build(n, size, fps, workdir=workdir) for n in build_sizes},
+            "scenes": {str(n): bench_scenes(n, size, fps, workdir=workdir) for n in scene_sizes},
+            "kenburns": bench_kenburns(kenburns_seconds, size, fps, workdir=workdir) if kenburns_seconds else None,
+            "timeline": bench_timeline(),
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def compare(old: dict, new: dict, threshold: float = 0.10) -> List[str]:
+    """List timing fields that got more than `threshold` slower between two suite results."""
+    lines: List[str] = []
+
+    def walk(a, b, path):
+        if isinstance(a, dict) and isinstance(b, dict):
+            for k in a:
+                if k in b and k != "meta":
+                    walk(a[k], b[k], f"{path}.{k}" if path else k)
+        elif isinstance(a, (int, float)) and isinstance(b, (int, float)) and path.endswith(("_s", "_ms")) and a > 0:
+            change = (b - a) / a
+            mark = "REGRESSION" if change > threshold else ("faster" if change < -threshold else "")
+            lines.append(f"{path:60s} {a:>10.4f} -> {b:>10.4f} {change:+7.1%} {mark}".rstrip())
+
+    walk(old, new, "")
+    return lines
+
+
+def _ints(s: str) -> List[int]:
+    return [int(x) for x in s.split(",") if x.strip()]
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmarks for the lecture pipeline")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    ps = sub.add_parser("slides", help="Serial vs parallel slide rendering")
+    ps.add_argument("--count", type=int, default=200)
+    ps.add_argument("--width", type=int, default=1920)
+    ps.add_argument("--height", type=int, default=1080)
+    ps.add_argument("--workers", type=int, default=0, help="0 = one per CPU core")
+
+    pa = sub.add_parser("suite", help="Per-stage and end-to-end benchmarks with the stub TTS")
+    pa.add_argument("--sizes", default="10,100,1000", help="Section counts for parse/render/subtitle stages")
+    pa.add_argument("--build-sizes", default="10,100", help="Section counts for end-to-end builds")
+    pa.add_argument("--scene-sizes", default="5", help="Scene counts for compose_scenes ('' to skip)")
+    pa.add_argument("--width", type=int, default=1280)
+    pa.add_argument("--height", type=int, default=720)
+    pa.add_argument("--fps", type=int, default=24)
+    pa.add_argument("--kenburns-seconds", type=float, default=5.0, help="Slide length for the zoom benchmark (0 to skip)")
+    pa.add_argument("--output", "-o", help="Write results JSON here (e.g. bench/<rev>.json)")
+
+    pt = sub.add_parser("timeline", help="Per-frame timeline lookup cost for 10/100/1000 sections")
+    pt.add_argument("--counts", default="10,100,1000")
+
+    pc = sub.add_parser("compare", help="Compare two suite result files")
+    pc.add_argument("old")
+    pc.add_argument("new")
+    pc.add_argument("--threshold", type=float, default=0.10)
+    args = p.parse_args()
+
+    if args.cmd == "compare":
+        with open(args.old, "r", encoding="utf-8") as f:
+            old = json.load(f)
+        with open(args.new, "r", encoding="utf-8") as f:
+            new = json.load(f)
+        print("\n".join(compare(old, new, args.threshold)))
+        return
+
+    if args.cmd == "slides":
+        result = bench_slides(args.count, size=(args.width, args.height), workers=args.workers)
+    elif args.cmd == "timeline":
+        result = bench_timeline(_ints(args.counts))
+    else:
+        result = run_suite(
+            _ints(args.sizes),
+            _ints(args.build_sizes),
+            _ints(args.scene_sizes),
+            (args.width, args.height),
+            args.fps,
+            args.kenburns_seconds,
+        )
+        if args.output:
+            os.makedirs(os.path.dirname(os.path.abspath(args.output)) or ".", exist_ok=True)
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(result, f, indent=2)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Optional, Tuple
+
+
+def default_cache_dir() -> str:
+    env = os.environ.get("VIDEO_LECTURE_CACHE")
+    if env:
+        return env
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "video_lecture")
+
+
+def _discard(path: str) -> None:
+    # Remove a temp file that was not renamed into place (no-op once it was).
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class DiskCache:
+    """Content-addressed on-disk store for rendered media files.
+
+    Each entry holds one file plus a small JSON sidecar with its duration. The
+    sidecar is written last, so an entry only becomes visible once its
+    file is complete; both files are published with atomic renames, which
+    keeps the store safe to share between concurrent renders. When the store
+    grows past `max_bytes`, least recently used entries are evicted.
+    """
+
+    def __init__(self, root: str, max_bytes: int = 512 * 1024 * 1024, min_age: float = 60.0):
+        self.root = root
+        self.max_bytes = max_bytes
+        # Entries touched more recently than this are never evicted, so a render
+        # that just got a hit can still open the file.
+        self.min_age = min_age
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(root, exist_ok=True)
+        self._bytes = self._scan_bytes()
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key + ".json")
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """Return (path, duration) for `key`, or None on a miss."""
+        meta_path = self._meta_path(key)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            path = os.path.join(os.path.dirname(meta_path), meta["file"])
+            if not os.path.exists(path):
+                raise FileNotFoundError(path)
+            now = time.time()
+            os.utime(meta_path, (now, now))
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path, float(meta["duration"])
+
+    def put(self, key: str, src_path: str, duration: float, move: bool = True) -> Tuple[str, float]:
+        """Store `src_path` under `key` and return the cached (path, duration)."""
+        entry_dir = os.path.dirname(self._meta_path(key))
+        os.makedirs(entry_dir, exist_ok=True)
+        ext = os.path.splitext(src_path)[1] or ".bin"
+        name = key + ext
+        dest = os.path.join(entry_dir, name)
+
+        fd, tmp = tempfile.mkstemp(dir=entry_dir, prefix=".tmp_", suffix=ext)
+        os.close(fd)
+        try:
+            shutil.copyfile(src_path, tmp)
+            size = os.path.getsize(tmp)
+            # Another render may have stored this key already; count the file once.
+            try:
+                size -= os.path.getsize(dest)
+            except OSError:
+                pass
+            os.replace(tmp, dest)
+        finally:
+            _discard(tmp)
+        self._write_json(self._meta_path(key), {"file": name, "duration": duration})
+        if move:
+            try:
+                os.remove(src_path)
+            except OSError:
+                pass
+
+        self._bytes += size
+        if self._bytes > self.max_bytes:
+            self.evict()
+        return dest, duration
+
+    def _write_json(self, path: str, data: dict) -> None:
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp_", suffix=".json")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, path)
+        finally:
+            _discard(tmp)
+
+    def _entries(self):
+        """Yield (meta_path, file_path, size, last_used) for every committed entry."""
+        for sub in os.scandir(self.root):
+            if not sub.is_dir():
+                continue
+            metas = []
+            files = {}
+            for e in os.scandir(sub.path):
+                if e.name.startswith(".tmp_"):
+                    continue
+                if e.name.endswith(".json"):
+                    metas.append(e)
+                else:
+                    files[os.path.splitext(e.name)[0]] = e
+            for m in metas:
+                a = files.get(m.name[:-5])
+                try:
+                    last_used = m.stat().st_mtime
+                    size = a.stat().st_size if a else 0
+                except OSError:
+                    continue
+                yield m.path, a.path if a else None, size, last_used
+
+    def _scan_bytes(self) -> int:
+        return sum(size for _, _, size, _ in self._entries())
+
+    def evict(self) -> int:
+        """Drop least recently used entries until the store fits in `max_bytes`.
+
+        Returns the number of bytes freed.
+        """
+        entries = sorted(self._entries(), key=lambda e: e[3])
+        total = sum(e[2] for e in entries)
+        # Evict down to 90% of the budget so we don't rescan on every put.
+        target = int(self.max_bytes * 0.9)
+        cutoff = time.time() - self.min_age
+        freed = 0
+        for meta_path, file_path, size, last_used in entries:
+            if total - freed <= target:
+                break
+            if last_used > cutoff:
+                continue
+            # Remove the sidecar first so readers never see a dangling entry.
+            for p in (meta_path, file_path):
+                if not p:
+                    continue
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+            freed += size
+        self._bytes = total - freed
+        return freed
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "bytes": self._bytes, "max_bytes": self.max_bytes}
@@ -1,68 +1,141 @@
 from __future__ import annotations
 
 import argparse
+import itertools
 import os
+import sys
 from datetime import datetime
+from typing import Optional, Tuple
 
-from .slides import split_script
+from .slides import iter_sections
 from .assemble import LectureMaker
+from .encode import PROFILES, EncodeProfile
+from .renditions import parse_rendition
+from .cache import default_cache_dir
+from .metrics import Instrumentation, json_lines_hook
 
 
-def main():
+def build_parser() -> argparse.ArgumentParser:
     p = argparse.ArgumentParser(description="Convert a script/notes into a narrated video lecture.")
     p.add_argument("input", help="Path to script file (.txt/.md)")
     p.add_argument("--output", "-o", help="Output video path (.mp4). Default: out/lecture_<timestamp>.mp4")
     p.add_argument("--theme", choices=["dark", "light"], default="dark")
     p.add_argument("--width", type=int, default=1920)
     p.add_argument("--height", type=int, default=1080)
+    p.add_argument("--bitrate", default="3000k", help="Video bitrate (ffmpeg syntax, e.g. 3000k)")
+    p.add_argument("--encode-profile", choices=PROFILES, default="cbr", help="cbr: every frame at --fps against --bitrate. vfr: quality-targeted (CRF, capped at --bitrate) with static slides stored at 1 fps, for smaller files and faster encodes")
+    p.add_argument("--crf", type=int, default=23, help="x264 CRF for --encode-profile vfr (lower = better quality, larger file)")
+    p.add_argument("--rendition", action="append", type=parse_rendition, metavar="WxH[:BITRATE][:mp4|hls]", help="Encode this size, bitrate and container (mp4 or hls) instead of the single output; repeatable, e.g. 1280x720:2500k:hls. Narration and subtitles are shared; outputs are named after --output, and HLS renditions get a master .m3u8")
+    p.add_argument("--subtitles", choices=["srt", "vtt"], default="srt", help="Subtitle format written next to the video (SubRip or WebVTT)")
     p.add_argument("--font", help="Path to .ttf font for rendering text")
     p.add_argument("--voice", help="Voice name or id for TTS (edge-tts or pyttsx3)")
     p.add_argument("--rate", type=int, default=180, help="TTS rate (edge-tts percent around 180 baseline; pyttsx3 WPM)")
-    p.add_argument("--tts-provider", choices=["edge", "pyttsx3"], default=None, help="Choose TTS backend. Default: edge if installed, else pyttsx3")
-    p.add_argument("--music", help="Optional background music file (mp3/wav)")
+    p.add_argument("--tts-provider", choices=["edge", "pyttsx3", "stub"], default=None, help="Choose TTS backend (stub = offline test tone). Default: edge if installed, else pyttsx3")
+    p.add_argument("--tts-concurrency", type=int, default=4, help="Max concurrent edge-tts requests, or pyttsx3 engine processes (capped at the CPU count)")
+    p.add_argument("--music", help="Optional background music file (mp3/wav); loops to the lecture's length")
+    p.add_argument("--music-volume", type=float, default=0.2, help="Music gain between narration (0-1)")
+    p.add_argument("--music-duck", type=float, default=0.4, help="Extra music gain while the narrator speaks (1 = no ducking)")
+    p.add_argument("--loudness", type=float, default=-20.0, help="Normalize each narration clip to this RMS level in dBFS")
+    p.add_argument("--no-normalize", action="store_true", help="Keep narration at the level the TTS engine produced")
     p.add_argument("--fps", type=int, default=30)
     p.add_argument("--crossfade", type=float, default=0.3, help="Seconds of crossfade between slides")
-    p.add_argument("--kenburns", action="store_true", help="Enable slow zoom effect (slower rendering)")
-    p.add_argument("--keep-temp", action="store_true", help="Keep temp assets for debugging")
-
-    args = p.parse_args()
-
-    with open(args.input, "r", encoding="utf-8") as f:
-        text = f.read()
-
-    sections = split_script(text)
-    if not sections:
-        raise SystemExit("No content parsed from script.")
+    p.add_argument("--render-workers", type=int, default=0, help="Processes for slide rendering (0 = one per CPU core, 1 = serial)")
+    p.add_argument("--engine", choices=["auto", "ffmpeg", "moviepy"], default="auto", help="Video encoder: ffmpeg per-slide segments or MoviePy compositing. Default: ffmpeg")
+    p.add_argument("--streaming", action="store_true", help="Overlap narration, slide rendering and encoding per section (ffmpeg engine)")
+    p.add_argument("--progressive", action="store_true", help="Also write an HLS playlist (<output>_live/index.m3u8) that grows as sections finish, so playback can start early; implies --streaming")
+    p.add_argument("--queue-depth", type=int, default=4, help="Sections buffered between streaming stages")
+    p.add_argument("--draft", action="store_true", help="Quick low-resolution, low-fps preview with the final render's timeline and subtitles (default output gets a _draft suffix)")
+    p.add_argument("--kenburns", action="store_true", help="Enable slow zoom effect")
+    p.add_argument("--keep-temp", action="store_true", help="Keep temp assets (segments, and slide PNGs which are otherwise never written) for debugging")
+    p.add_argument("--max-temp-mb", type=int, default=0, help="Abort the build once its temp directory has grown past this many MB, checked around each segment encode and the mix and before the final join; one write can overshoot it (0 = no limit)")
+    p.add_argument("--cache-dir", default=default_cache_dir(), help="Directory for cached narration and slide segments. Default: $VIDEO_LECTURE_CACHE or ~/.cache/video_lecture")
+    p.add_argument("--tts-cache-mb", type=int, default=512, help="Size budget for the narration cache in MB (LRU eviction)")
+    p.add_argument("--segment-cache-mb", type=int, default=2048, help="Size budget for cached slide segments in MB")
+    p.add_argument("--metrics-json", help="Write per-stage/per-section timings, CPU, peak RSS and temp-disk usage to this JSON file")
+    p.add_argument("--progress", action="store_true", help="Stream JSON-lines progress events to stderr while rendering")
+    p.add_argument("--no-cache", action="store_true", help="Disable caching (always re-render everything)")
+    return p
 
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    out_dir = os.path.join("out")
-    os.makedirs(out_dir, exist_ok=True)
-    out_video = args.output or os.path.join(out_dir, f"lecture_{ts}.mp4")
 
-    maker = LectureMaker(
+def make_maker(args: argparse.Namespace) -> LectureMaker:
+    return LectureMaker(
         size=(args.width, args.height),
         theme=args.theme,
         font_path=args.font,
         voice=args.voice,
         rate=args.rate,
+        tts_provider=args.tts_provider,
         kenburns=args.kenburns,
+        cache_dir=None if args.no_cache else args.cache_dir,
+        tts_cache_bytes=args.tts_cache_mb * 1024 * 1024,
+        segment_cache_bytes=args.segment_cache_mb * 1024 * 1024,
+        tts_concurrency=args.tts_concurrency,
+        render_workers=args.render_workers,
+        engine=args.engine,
+        bitrate=args.bitrate,
+        profile=EncodeProfile(args.encode_profile, crf=args.crf),
+        max_temp_bytes=args.max_temp_mb * 1024 * 1024 or None,
+        music_volume=args.music_volume,
+        music_duck=args.music_duck,
+        loudness=None if args.no_normalize else args.loudness,
     )
-    # Override TTS provider if specified
-    if args.tts_provider:
-        maker.tts.provider = args.tts_provider
 
-    video_path, srt_path = maker.build(
-        sections,
-        out_video,
-        out_srt=None,
-        music_path=args.music,
-        fps=args.fps,
-        crossfade=args.crossfade,
-        keep_temp=args.keep_temp,
-    )
+
+def run(
+    args: argparse.Namespace,
+    maker: Optional[LectureMaker] = None,
+    instrument: Optional[Instrumentation] = None,
+) -> Tuple[str, Optional[str]]:
+    """Render one lecture from parsed CLI args; reuses `maker` when given.
+
+    The script is parsed lazily from the open file, so streaming builds never
+    hold the whole input in memory.
+    """
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    out_dir = os.path.join("out")
+    os.makedirs(out_dir, exist_ok=True)
+    out_video = args.output or os.path.join(out_dir, f"lecture_{ts}{'_draft' if args.draft else ''}.mp4")
+
+    if maker is None:
+        maker = make_maker(args)
+    instr = instrument or Instrumentation()
+    if args.progress:
+        instr.add_hook(json_lines_hook(sys.stderr))
+    with open(args.input, "r", encoding="utf-8") as f:
+        sections = iter_sections(f)
+        first = next(sections, None)
+        if first is None:
+            raise SystemExit("No content parsed from script.")
+        result = maker.build(
+            itertools.chain([first], sections),
+            out_video,
+            out_srt=os.path.splitext(out_video)[0] + "." + args.subtitles,
+            music_path=args.music,
+            fps=args.fps,
+            crossfade=args.crossfade,
+            keep_temp=args.keep_temp,
+            instrument=instr,
+            streaming=args.streaming,
+            queue_depth=args.queue_depth,
+            renditions=args.rendition,
+            progressive=args.progressive,
+            draft=args.draft,
+        )
+    if args.metrics_json:
+        instr.write_json(args.metrics_json)
+    return result
+
+
+def main():
+    args = build_parser().parse_args()
+    with make_maker(args) as maker:
+        video_path, srt_path = run(args, maker)
 
     print(f"Video saved to: {video_path}")
     print(f"Subtitles saved to: {srt_path}")
+    if maker.tts.cache is not None:
+        st = maker.tts.cache.stats()
+        print(f"TTS cache: {st['hits']} hits, {st['misses']} misses")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+import math
+import os
+import re
+import subprocess
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+
+
+PROFILES = ("cbr", "vfr")
+
+
+@dataclass(frozen=True)
+class EncodeProfile:
+    """Rate control and frame rate of encoded video segments.
+
+    "cbr" encodes every frame at the output fps against a bitrate target.
+    "vfr" is quality-targeted (x264 CRF, capped at the bitrate) and encodes a
+    static range (a slide without zoom) as `still_fps` frames per second plus
+    its last frame, so the output has a variable frame rate; dynamic ranges
+    (fades, zoom, avatar video) keep every frame. Every segment starts on a
+    keyframe either way, so slide boundaries are keyframes.
+    """
+
+    mode: str = "cbr"
+    crf: int = 23
+    still_fps: float = 1.0
+
+    def __post_init__(self):
+        if self.mode not in PROFILES:
+            raise ValueError(f"Unknown encode profile {self.mode!r}; expected one of {', '.join(PROFILES)}")
+
+    def rate_args(self, bitrate: str) -> List[str]:
+        if self.mode == "vfr":
+            return ["-crf", str(self.crf), "-maxrate", bitrate, "-bufsize", bitrate]
+        return ["-b:v", bitrate]
+
+    def still_args(self, frames: int, fps: int) -> List[str]:
+        """Filter and timing args that hold a single input frame for `frames` frames at `fps`."""
+        if self.mode == "vfr":
+            step = max(1, int(round(fps / self.still_fps)))
+            # Keep every `step`-th frame with its timestamp, and the last one so the length is exact.
+            keep = f"select='not(mod(n\\,{step}))+eq(n\\,{frames - 1})'"
+            return [
+                "-vf", f"loop=loop={frames - 1}:size=1,{keep}", "-fps_mode", "passthrough",
+                "-g", str(max(1, int(math.ceil(10 * self.still_fps)))),
+            ]
+        return ["-vf", "loop=loop=-1:size=1", "-frames:v", str(frames), "-g", str(fps * 10), "-r", str(fps)]
+
+    def settings(self) -> list:
+        """Cache-key fields; empty for "cbr" so existing keys stay valid."""
+        return [] if self.mode == "cbr" else [self.mode, self.crf, self.still_fps]
+
+
+def ffmpeg_exe() -> str:
+    """Path to the ffmpeg binary bundled with imageio-ffmpeg, else `ffmpeg` on PATH."""
+    try:
+        import imageio_ffmpeg  # type: ignore
+
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return "ffmpeg"
+
+
+def run_ffmpeg(args: Sequence[str]) -> None:
+    cmd = [ffmpeg_exe(), "-y", "-hide_banner", "-loglevel", "error", *args]
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        err = proc.stderr.decode("utf-8", "replace").strip()[-2000:]
+        raise RuntimeError(f"ffmpeg failed (code {proc.returncode}): {err}")
+
+
+def probe_media(path: str) -> Tuple[Optional[float], bool]:
+    """(duration in seconds or None, has an audio stream) from ffmpeg's header dump."""
+    proc = subprocess.run([ffmpeg_exe(), "-hide_banner", "-i", path], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    m = re.search(rb"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)", proc.stderr)
+    dur = int(m.group(1)) * 3600 + int(m.group(2)) * 60 + float(m.group(3)) if m else None
+    return dur, re.search(rb"Stream #\S+.*: Audio:", proc.stderr) is not None
+
+
+def plan_segments(durations: Sequence[float], crossfade: float, fps: int) -> Tuple[List[int], List[float]]:
+    """Frame count and start time of each slide on the output timeline.
+
+    Mirrors `concatenate_videoclips(..., padding=-crossfade)`: each clip starts
+    `crossfade` seconds before the previous one ends and covers it, so slide i
+    is on screen for `duration - crossfade` (the last one for its full
+    duration). Frame counts are rounded per slide, and starts are derived from
+    them so audio placed at `starts` stays frame-accurate.
+    """
+    frames: List[int] = []
+    starts: List[float] = []
+    total = 0
+    n = len(durations)
+    for i, dur in enumerate(durations):
+        visible = dur if i == n - 1 else dur - crossfade
+        starts.append(total / fps)
+        f = max(1, int(round(visible * fps)))
+        frames.append(f)
+        total += f
+    return frames, starts
+
+
+def retime_frames(frames: Sequence[int], fps: int, to_fps: int) -> List[int]:
+    """Frame counts at `to_fps` for segments planned as `frames` at `fps`.
+
+    Each boundary is rounded from its exact time rather than per segment, so it
+    lands within half a frame of the original and errors never accumulate.
+    Every segment keeps at least one frame.
+    """
+    out: List[int] = []
+    total = done = 0
+    for f in frames:
+        total += f
+        end = max(done + 1, int(round(total * to_fps / fps)))
+        out.append(end - done)
+        done = end
+    return out
+
+
+def transition_frames(duration: float, crossfade: float, fps: int) -> int:
+    """Frames of the fade into a slide: the crossfade, kept shorter than the slide itself.
+
+    Bounded by the slide's non-final length so that the result does not
+    depend on whether the slide turns out to be the last one.
+    """
+    if crossfade <= 0:
+        return 0
+    visible = max(1, int(round((duration - crossfade) * fps)))
+    return max(0, min(int(round(crossfade * fps)), visible - 1))
+
+
+def encode_still_frame(
+    frame: Union[bytes, memoryview],
+    size: Tuple[int, int],
+    frames: int,
+    out_path: str,
+    fps: int = 30,
+    bitrate: str = "3000k",
+    preset: str = "ultrafast",
+    threads: int = 2,
+    profile: Optional[EncodeProfile] = None,
+) -> str:
+    """Encode one raw RGB frame, held for `frames` frames, as a video-only H.264 segment.
+
+    The frame is piped once and repeated by ffmpeg's `loop` filter, so nothing
+    touches the disk and no image is decoded per frame. The segment starts on
+    a keyframe so segments can be joined with `concat_segments`.
+    """
+    W, H = size
+    profile = profile or EncodeProfile()
+    cmd = [
+        ffmpeg_exe(), "-y", "-hide_banner", "-loglevel", "error",
+        "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{W}x{H}", "-framerate", str(fps), "-i", "-",
+        *profile.still_args(frames, fps),
+        "-c:v", "libx264", "-preset", preset, "-tune", "stillimage",
+        *profile.rate_args(bitrate), "-pix_fmt", "yuv420p",
+        "-video_track_timescale", "90000",
+        "-threads", str(threads), "-an",
+        out_path,
+    ]
+    proc = subprocess.run(cmd, input=frame, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        err = proc.stderr.decode("utf-8", "replace").strip()[-2000:]
+        raise RuntimeError(f"ffmpeg failed (code {proc.returncode}): {err}")
+    return out_path
+
+
+def encode_raw_segment(
+    frames: Iterable[bytes],
+    size: Tuple[int, int],
+    count: int,
+    out_path: str,
+    fps: int = 30,
+    bitrate: str = "3000k",
+    preset: str = "ultrafast",
+    threads: int = 2,
+    profile: Optional[EncodeProfile] = None,
+) -> str:
+    """Encode `count` raw RGB frames piped from Python as a video-only H.264 segment.
+
+    Settings match `encode_still_frame` so the segments can be concatenated;
+    `profile` only sets the rate control, since every frame is kept.
+    """
+    profile = profile or EncodeProfile()
+    W, H = size
+    cmd = [
+        ffmpeg_exe(), "-y", "-hide_banner", "-loglevel", "error",
+        "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{W}x{H}", "-framerate", str(fps), "-i", "-",
+        "-frames:v", str(count),
+        "-c:v", "libx264", "-preset", preset,
+        *profile.rate_args(bitrate), "-pix_fmt", "yuv420p",
+        "-g", str(fps * 10), "-r", str(fps),
+        "-video_track_timescale", "90000",
+        "-threads", str(threads), "-an",
+        out_path,
+    ]
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        for frame in frames:
+            proc.stdin.write(frame)
+    except BrokenPipeError:
+        pass  # ffmpeg exited early; its error is reported below
+    finally:
+        try:
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
+    err = proc.stderr.read()
+    if proc.wait() != 0:
+        err = err.decode("utf-8", "replace").strip()[-2000:]
+        raise RuntimeError(f"ffmpeg failed (code {proc.returncode}): {err}")
+    return out_path
+
+
+def write_concat_list(segment_paths: Sequence[str], list_path: str) -> None:
+    with open(list_path, "w", encoding="utf-8") as f:
+        for p in segment_paths:
+            safe = os.path.abspath(p).replace("\\", "/").replace("'", "'\\''")
+            f.write(f"file '{safe}'\n")
+
+
+def concat_segments(
+    segment_paths: Sequence[str],
+    out_path: str,
+    audio_path: Optional[str] = None,
+    duration: Optional[float] = None,
+    audio_codec: str = "aac",
+    audio_bitrate: str = "192k",
+) -> str:
+    """Join segments with ffmpeg's concat demuxer (no video re-encode), optionally muxing in audio.
+
+    Without `audio_path` the segments' own streams are copied as they are.
+    """
+    list_path = out_path + ".concat.txt"
+    write_concat_list(segment_paths, list_path)
+    args = ["-f", "concat", "-safe", "0", "-i", list_path]
+    if audio_path:
+        args += ["-i", audio_path, "-map", "0:v:0", "-map", "1:a:0", "-c:a", audio_codec]
+        if audio_codec != "copy":
+            args += ["-b:a", audio_bitrate]
+    args += ["-c:v", "copy"] if audio_path else ["-c", "copy"]
+    if duration is not None:
+        args += ["-t", f"{duration:.3f}"]
+    args += ["-movflags", "+faststart", out_path]
+    try:
+        run_ffmpeg(args)
+    finally:
+        try:
+            os.remove(list_path)
+        except OSError:
+            pass
+    return out_path
+
+
+def package_hls(
+    segment_paths: Sequence[str],
+    playlist_path: str,
+    audio_path: str,
+    duration: Optional[float] = None,
+    segment_seconds: float = 6.0,
+) -> str:
+    """Join segments and an encoded audio track into an HLS playlist of fMP4 media segments.
+
+    Nothing is re-encoded: media segments are cut at keyframes near every
+    `segment_seconds` and written next to `playlist_path` (`init.mp4`,
+    `seg_00000.m4s`, ...).
+    """
+    out_dir = os.path.dirname(os.path.abspath(playlist_path))
+    os.makedirs(out_dir, exist_ok=True)
+    list_path = playlist_path + ".concat.txt"
+    write_concat_list(segment_paths, list_path)
+    args = [
+        "-f", "concat", "-safe", "0", "-i", list_path, "-i", audio_path,
+        "-map", "0:v:0", "-map", "1:a:0", "-c", "copy",
+    ]
+    if duration is not None:
+        args += ["-t", f"{duration:.3f}"]
+    args += [
+        "-f", "hls", "-hls_time", str(segment_seconds), "-hls_playlist_type", "vod",
+        "-hls_segment_type", "fmp4", "-hls_fmp4_init_filename", "init.mp4",
+        "-hls_segment_filename", os.path.join(out_dir, "seg_%05d.m4s"),
+        playlist_path,
+    ]
+    try:
+        run_ffmpeg(args)
+    finally:
+        try:
+            os.remove(list_path)
+        except OSError:
+            pass
+    return playlist_path
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from .encode import EncodeProfile, encode_raw_segment
+
+# Scale reached at the end of a slide's narration (1.02 = 2% zoom-in).
+ZOOM = 0.02
+
+
+def zoom_boxes(
+    frames: int, fps: int, duration: float, size: Tuple[int, int], zoom: float = ZOOM, offset: int = 0
+) -> np.ndarray:
+    """Source crop rectangle (x0, y0, x1, y1) for every frame of a centered zoom.
+
+    Frame k shows the slide scaled by `1 + zoom * t / duration` (with
+    t = (offset + k) / fps) and cropped back to `size` around the center,
+    which is what `clip.resized(lambda t: ...)` composited at the center
+    produced. The boxes are fractional, so the zoom is smooth rather than
+    stepping a pixel at a time.
+    """
+    W, H = size
+    t = np.arange(offset, offset + frames, dtype=np.float64) / fps
+    scale = 1.0 + zoom * t / max(duration, 0.001)
+    w, h = W / scale, H / scale
+    x0, y0 = (W - w) / 2.0, (H - h) / 2.0
+    return np.stack([x0, y0, x0 + w, y0 + h], axis=1)
+
+
+def zoom_frames(
+    image: Image.Image,
+    boxes: np.ndarray,
+    resample: int = Image.BOX,
+    workers: int = 1,
+) -> Iterator[bytes]:
+    """Yield raw RGB frames for `boxes`, in order.
+
+    Each frame is one crop-and-resample of the same source image (PIL's `box`
+    argument). Pillow releases the GIL while resampling, so `workers` > 1
+    renders frames on threads; at most `4 * workers` frames are in flight.
+    """
+    size = image.size
+    src = image.convert("RGB")
+    src.load()
+
+    def one(box) -> bytes:
+        return src.resize(size, resample=resample, box=tuple(box)).tobytes()
+
+    if workers <= 1:
+        for box in boxes:
+            yield one(box)
+        return
+    window = 4 * workers
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        pending = [ex.submit(one, box) for box in boxes[:window]]
+        for k in range(window, len(boxes) + window):
+            frame = pending.pop(0).result()
+            if k < len(boxes):
+                pending.append(ex.submit(one, boxes[k]))
+            yield frame
+
+
+def encode_zoom_segment(
+    image: Union[str, Image.Image],
+    frames: int,
+    out_path: str,
+    fps: int = 30,
+    duration: Optional[float] = None,
+    zoom: float = ZOOM,
+    offset: int = 0,
+    bitrate: str = "3000k",
+    preset: str = "ultrafast",
+    threads: int = 2,
+    workers: int = 1,
+    profile: Optional[EncodeProfile] = None,
+) -> str:
+    """Encode `frames` frames of a slowly zooming slide as a video-only H.264 segment.
+
+    `duration` is the slide's full narration length (the zoom's time base);
+    it defaults to the segment length. `offset` is the index of the segment's
+    first frame within the slide (e.g. after a fade-in segment). `image` is a
+    path or an in-memory image. Frames are piped to ffmpeg as raw RGB, so no
+    intermediate images touch the disk.
+    """
+    img = Image.open(image) if isinstance(image, str) else image
+    boxes = zoom_boxes(frames, fps, duration or frames / fps, img.size, zoom, offset)
+    return encode_raw_segment(
+        zoom_frames(img, boxes, workers=workers), img.size, frames, out_path,
+        fps=fps, bitrate=bitrate, preset=preset, threads=threads, profile=profile,
+    )
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from typing import List
+
+from .slides import Section
+
+
+def segment_key(section: Section, settings: dict, frames: int, offset: int = 0) -> str:
+    """Cache key for one encoded slide segment.
+
+    Combines the section's content hash with everything that affects its pixels
+    or length: render settings (size, theme, font, fps, encoder), the TTS
+    settings that produced its narration, and the resulting frame count.
+    `offset` is the segment's first frame within an animated slide.
+    """
+    parts = [section.content_hash(), settings, frames]
+    if offset:
+        parts.append(offset)
+    payload = json.dumps(parts, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def transition_key(prev: Section, section: Section, settings: dict, frames: int, prev_frames: int) -> str:
+    """Cache key for the fade from `prev` into `section` (`prev_frames`: prev's visible length)."""
+    payload = json.dumps(
+        ["fade", prev.content_hash(), section.content_hash(), settings, frames, prev_frames], sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def manifest_path(out_video: str) -> str:
+    return os.path.splitext(out_video)[0] + ".manifest.json"
+
+
+def write_manifest(path: str, settings: dict, entries: List[dict]) -> str:
+    """Write the build manifest atomically and return its path.
+
+    `entries` hold one dict per section (hash, segment key, duration, frames,
+    the fade into it, and whether it was rebuilt in this run).
+    """
+    data = {"version": 1, "settings": settings, "sections": entries}
+    # A plain open() under a hidden name, so the manifest gets the same umask-based
+    # permissions as the video next to it (mkstemp would make it owner-only).
+    head, tail = os.path.split(os.path.abspath(path))
+    tmp = os.path.join(head, f".{tail}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return path
+
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+try:
+    import resource  # type: ignore
+except ImportError:  # Windows
+    resource = None
+
+Hook = Callable[[dict], None]
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process and its finished children, in MB."""
+    if resource is None:
+        return None
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024  # bytes on macOS, KB elsewhere
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    child_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(max(self_rss, child_rss) / divisor, 1)
+
+
+def dir_bytes(path: Optional[str]) -> int:
+    total = 0
+    if not path:
+        return total
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class Instrumentation:
+    """Collects per-stage and per-section metrics for one build and streams events.
+
+    Hooks are called with event dicts such as
+    `{"event": "stage_end", "stage": "tts", "wall_s": 1.2, ...}` or
+    `{"event": "progress", "stage": "encode", "percent": 40.0}`.
+    """
+
+    def __init__(self, hooks: Optional[List[Hook]] = None):
+        self.hooks: List[Hook] = list(hooks or [])
+        self.tmp_dir: Optional[str] = None
+        self.stages: List[dict] = []
+        self.sections: Dict[int, dict] = {}
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook: Hook) -> None:
+        self.hooks.append(hook)
+
+    def emit(self, event: str, **data) -> None:
+        if not self.hooks:
+            return
+        payload = {"event": event, "elapsed_s": round(time.perf_counter() - self._t0, 3), **data}
+        # Stages report from encoder threads, so keep events whole and ordered.
+        with self._lock:
+            for hook in self.hooks:
+                hook(payload)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        self.emit("stage_start", stage=name)
+        wall0 = time.perf_counter()
+        cpu0 = time.process_time()
+        t0 = os.times()
+        try:
+            yield
+        finally:
+            t1 = os.times()
+            record = {
+                "stage": name,
+                "wall_s": round(time.perf_counter() - wall0, 3),
+                "cpu_s": round(time.process_time() - cpu0, 3),
+                "child_cpu_s": round((t1.children_user + t1.children_system) - (t0.children_user + t0.children_system), 3),
+                "peak_rss_mb": peak_rss_mb(),
+                "temp_bytes": dir_bytes(self.tmp_dir),
+            }
+            self.stages.append(record)
+            self.emit("stage_end", **record)
+
+    def section(self, index: int, stage: str, seconds: float, **extra) -> None:
+        """Record time spent on one section within `stage`."""
+        with self._lock:
+            rec = self.sections.setdefault(index, {"index": index})
+            rec[f"{stage}_s"] = round(seconds, 3)
+            for k, v in extra.items():
+                rec[f"{stage}_{k}"] = v
+
+    def progress(self, stage: str, done: int, total: int) -> None:
+        percent = round(100.0 * done / total, 1) if total else 100.0
+        self.emit("progress", stage=stage, done=done, total=total, percent=percent)
+
+    def report(self) -> dict:
+        return {
+            "total_wall_s": round(time.perf_counter() - self._t0, 3),
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": self.stages,
+            "sections": [self.sections[i] for i in sorted(self.sections)],
+        }
+
+    def write_json(self, path: str) -> str:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+        return path
+
+
+def json_lines_hook(stream) -> Hook:
+    """Hook that writes each event as one JSON line to `stream`."""
+
+    def hook(event: dict) -> None:
+        stream.write(json.dumps(event) + "\n")
+        stream.flush()
+
+    return hook
+
+
+def moviepy_logger(instr: Instrumentation, stage: str = "write"):
+    """proglog logger that turns MoviePy's frame counter into progress events."""
+    from proglog import ProgressBarLogger
+
+    class _Logger(ProgressBarLogger):
+        def __init__(self):
+            super().__init__()
+            self._last = -1.0
+
+        def bars_callback(self, bar, attr, value, old_value=None):
+            if bar != "frame_index" or attr != "index":
+                return
+            total = self.bars[bar].get("total") or 0
+            if not total:
+                return
+            percent = round(100.0 * value / total, 1)
+            if percent - self._last >= 1.0 or value >= total:
+                self._last = percent
+                instr.progress(stage, value, total)
+
+    return _Logger()
@@ -0,0 +1,458 @@
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Iterable, List, Optional, Tuple
+
+from .encode import transition_frames
+from .metrics import Instrumentation
+from .progressive import ProgressiveHLS
+from .slides import Section, SlideFrame, submit_frame
+from .subtitles import SubtitleWriter
+from .timeline import Timeline
+
+if TYPE_CHECKING:
+    from .assemble import LectureMaker
+
+_DONE = object()
+_POLL = 0.1  # seconds between checks of a stop event while a stage waits on a queue
+
+
+def _narration_text(sec: Section) -> str:
+    return f"{sec.title}. {sec.body}" if sec.body else sec.title
+
+
+def _put(q: "queue.Queue", item, stop: threading.Event) -> bool:
+    """Put `item` on a bounded queue unless `stop` is set first; returns whether it was put."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=_POLL)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _get(q: "queue.Queue", stop: threading.Event):
+    """Next item of `q`, or `_DONE` once `stop` is set."""
+    while not stop.is_set():
+        try:
+            return q.get(timeout=_POLL)
+        except queue.Empty:
+            pass
+    return _DONE
+
+
+def _release(*renders: Optional[Future]) -> None:
+    # Free slides that were rendered but will not be encoded.
+    for fut in renders:
+        if fut is None:
+            continue
+        try:
+            fut.result()[0].release()
+        except Exception:
+            pass
+
+
+def _release_rendered(item: tuple) -> None:
+    # The slides of a queued section: its own, and the previous one if drawn again for the fade.
+    render, prev_render, prev_fresh = item[10], item[11], item[12]
+    _release(render, prev_render if prev_fresh else None)
+
+
+def _stage(target, out: "queue.Queue", stop: threading.Event) -> threading.Thread:
+    """Start `target` on a daemon thread; an exception is forwarded down `out` unless `stop` is set."""
+
+    def run() -> None:
+        try:
+            target()
+        except BaseException as e:
+            _put(out, e, stop)
+
+    t = threading.Thread(target=run, daemon=True)
+    t.start()
+    return t
+
+
+class SegmentEncoder:
+    """Encodes slide and fade segments on a thread pool as rendered slides arrive.
+
+    At most `backlog` encodes are queued or running; each holds the slides it
+    uses (`SlideFrame.retain`) until it is done, which bounds how many rendered
+    slides are alive at once. Finished segments go into the maker's segment
+    cache, and `on_done(index, stage)` is called for each.
+    """
+
+    def __init__(
+        self,
+        maker: "LectureMaker",
+        fps: int,
+        instr: Instrumentation,
+        tmp_dir: str,
+        backlog: int = 4,
+        on_done: Optional[Callable[[int, str], None]] = None,
+    ):
+        self.maker = maker
+        self.fps = fps
+        self.instr = instr
+        self.tmp_dir = tmp_dir
+        self.on_done = on_done
+        self._pool = ThreadPoolExecutor(max_workers=max(1, min(backlog, (os.cpu_count() or 2) // 2)))
+        self._slots = threading.Semaphore(max(1, backlog))
+
+    def submit(
+        self, fn, args: tuple, slides: List[SlideFrame], i: int, stage: str, frames: int, key: str
+    ) -> "Future[str]":
+        """Run `fn(*args)` (which writes a `frames`-frame segment) and cache it under `key`."""
+        for slide in slides:
+            slide.retain()
+        self._slots.acquire()
+        return self._pool.submit(self._run, fn, args, slides, i, stage, frames, key)
+
+    def _run(self, fn, args: tuple, slides: List[SlideFrame], i: int, stage: str, frames: int, key: str) -> str:
+        try:
+            self.maker._check_temp(self.tmp_dir)
+            t0 = time.perf_counter()
+            seg = fn(*args)
+            self.instr.section(i, stage, time.perf_counter() - t0, frames=frames)
+            seg = self.maker._cache_segment(key, seg, frames / self.fps)
+            self.maker._check_temp(self.tmp_dir)
+            if self.on_done:
+                self.on_done(i, stage)
+            return seg
+        finally:
+            for slide in slides:
+                slide.release()
+            self._slots.release()
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True)
+
+
+class StreamingBuild:
+    """One lecture built with narration, slide rendering and encoding overlapped.
+
+    Sections flow through two bounded queues:
+
+    1. a TTS stage submits narration for upcoming sections (up to
+       `tts_concurrency` in flight),
+    2. a render stage waits for each narration, checks the segment cache and
+       draws the slides that miss it into memory (in the slide process pool
+       when `render_workers` allows),
+    3. the calling thread hands rendered slides to ffmpeg encoders, in memory.
+
+    At most `depth` sections wait in each queue and at most `depth` encodes are
+    queued, so memory is bounded by the queue depth rather than the deck size,
+    and `sections` may be a lazy iterator. The output, cache
+    keys and manifest match the batch ffmpeg engine, including the fade segments
+    between slides. With `progressive`, a fourth stage packages each section
+    into a growing HLS playlist as soon as its segments are encoded. With
+    `subtitles`, each section's cues are written as its narration length
+    becomes known.
+    """
+
+    def __init__(
+        self,
+        maker: "LectureMaker",
+        tmp_dir: str,
+        fps: int,
+        crossfade: float,
+        instr: Instrumentation,
+        depth: int = 4,
+        retries: int = 3,
+        backoff: float = 0.5,
+        progressive: Optional[ProgressiveHLS] = None,
+        keep_temp: bool = False,
+        subtitles: Optional[SubtitleWriter] = None,
+    ):
+        self.maker = maker
+        self.tmp_dir = tmp_dir
+        self.fps = fps
+        self.crossfade = crossfade
+        self.instr = instr
+        self.depth = max(1, depth)
+        self.retries = retries
+        self.backoff = backoff
+        self.progressive = progressive
+        self.keep_temp = keep_temp
+        self.subtitles = subtitles
+        self.settings = maker.render_settings(fps)
+
+    def _synthesize(self, i: int, text: str) -> Tuple[str, float]:
+        t0 = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                path, dur = self.maker.tts.synthesize(text)
+                break
+            except Exception:
+                if attempt >= self.retries:
+                    raise
+                time.sleep(self.backoff * (2 ** attempt))
+                attempt += 1
+        self.instr.section(i, "tts", time.perf_counter() - t0)
+        return path, dur
+
+    def _frames(self, dur: float, last: bool) -> int:
+        return max(1, int(round((dur if last else dur - self.crossfade) * self.fps)))
+
+    def _render(self, sec: Section, workers: Optional[int]) -> "Future[Tuple[SlideFrame, float]]":
+        return submit_frame(
+            sec,
+            size=self.maker.size,
+            theme=self.maker.theme,
+            font_path=self.maker.font_path,
+            workers=workers,
+            scale=self.maker.layout_scale,
+        )
+
+    def _cached(self, key: str) -> Optional[str]:
+        cache = self.maker.segment_cache
+        hit = cache.get(key) if cache is not None else None
+        return hit[0] if hit else None
+
+    @staticmethod
+    def _drain(q: "queue.Queue") -> None:
+        while True:
+            try:
+                item = q.get_nowait()
+            except queue.Empty:
+                return
+            if isinstance(item, tuple) and len(item) > 10:
+                _release_rendered(item)
+
+    def run(self, sections: Iterable[Section]):
+        """Build every section's segments; returns (content hashes, audio_paths, durations, frames,
+        keys, fade_keys, fades, segments, rebuilt). Sections are not kept once encoded."""
+        maker, instr = self.maker, self.instr
+        q_tts: "queue.Queue" = queue.Queue(maxsize=self.depth)
+        q_render: "queue.Queue" = queue.Queue(maxsize=self.depth)
+        # A single in-process pyttsx3 engine isn't thread-safe; an engine pool is.
+        tts_workers = maker.tts_concurrency if maker.tts.parallel else 1
+        tts_pool = ThreadPoolExecutor(max_workers=max(1, tts_workers))
+        # Set when the build ends, so both stages stop even while blocked on a full queue.
+        stop = threading.Event()
+
+        def tts_stage() -> None:
+            for i, sec in enumerate(sections):
+                if not _put(q_tts, (i, sec, tts_pool.submit(self._synthesize, i, _narration_text(sec))), stop):
+                    return
+            _put(q_tts, _DONE, stop)
+
+        def render_stage() -> None:
+            prev = None  # (section, frames, render) of the previous section
+            while True:
+                item = _get(q_tts, stop)
+                if item is _DONE or isinstance(item, BaseException):
+                    _put(q_render, item, stop)
+                    return
+                i, sec, fut = item
+                audio_path, dur = fut.result()
+                # Assume another section follows; the last one is re-cut below.
+                n = self._frames(dur, last=False)
+                fade = transition_frames(dur, self.crossfade, self.fps) if prev else 0
+                key, fade_key = maker.segment_keys(
+                    sec, prev[0] if prev else None, self.settings, n, fade, prev[1] if prev else 0
+                )
+                cached = self._cached(key)
+                fade_cached = self._cached(fade_key) if fade_key else None
+                fade_missing = bool(fade_key) and not fade_cached
+                render = None if cached and not fade_missing else self._render(sec, maker.render_workers)
+                prev_render = None
+                if fade_missing:
+                    # Reuse the previous slide if it was rendered, else draw it again just for the fade.
+                    prev_render = prev[2] or self._render(prev[0], maker.render_workers)
+                item = (
+                    i, sec, audio_path, dur, n, fade, key, cached, fade_key, fade_cached, render, prev_render,
+                    prev_render is not None and prev_render is not prev[2],
+                )
+                if not _put(q_render, item, stop):
+                    _release_rendered(item)
+                    return
+                prev = (sec, n, render)
+
+        encoder = SegmentEncoder(maker, self.fps, instr, self.tmp_dir, backlog=self.depth)
+
+        hashes: List[str] = []
+        audio_paths: List[str] = []
+        durations: List[float] = []
+        frames: List[int] = []
+        fades: List[int] = []
+        keys: List[str] = []
+        fade_keys: List[Optional[str]] = []
+        segments: list = []  # cached path or Future[path]
+        starts: List[float] = []
+        rebuilt: List[int] = []
+        held: List[SlideFrame] = []  # the previous slide, kept for the fade out of it
+
+        def finish(item, last: bool) -> None:
+            (i, sec, audio_path, dur, n, fade, key, cached, fade_key, fade_cached, render, prev_render,
+             prev_fresh) = item
+            if last and self._frames(dur, last=True) != n:
+                n = self._frames(dur, last=True)
+                key = maker.segment_keys(sec, None, self.settings, n, fade, 0)[0]
+                cached = self._cached(key)
+                if not cached and render is None:
+                    render = self._render(sec, 1)
+            hashes.append(sec.content_hash())
+            if self.subtitles is not None:
+                self.subtitles.add(f"{sec.title}. {sec.body}", dur)
+            audio_paths.append(audio_path)
+            durations.append(dur)
+            frames.append(n)
+            fades.append(fade)
+            keys.append(key)
+            fade_keys.append(fade_key)
+            starts.append(starts[-1] + frames[-2] / self.fps if starts else 0.0)
+            first_segment = len(segments)
+            slide = None
+            # This call's own references to slides; encoders retain what they are handed.
+            owned: List[SlideFrame] = []
+            fresh = prev_render if prev_fresh else None  # not yet taken
+            try:
+                if render is not None:
+                    slide, seconds = render.result()
+                    owned.append(slide)
+                    instr.section(i, "render", seconds)
+                    if self.keep_temp:
+                        slide.save(os.path.join(self.tmp_dir, f"slide_{i:03d}.png"))
+                if fade_key:
+                    if fade_cached:
+                        segments.append(fade_cached)
+                    else:
+                        fresh = None
+                        prev_slide = prev_render.result()[0]
+                        if prev_fresh:
+                            owned.append(prev_slide)
+                        out = os.path.join(self.tmp_dir, f"fade_{i:03d}.mp4")
+                        args = (prev_slide, slide, fade, out, self.fps, durations[-2], frames[-2], dur)
+                        segments.append(
+                            encoder.submit(maker._encode_fade, args, [prev_slide, slide], i, "fade", fade, fade_key)
+                        )
+                        if prev_fresh:
+                            owned.remove(prev_slide)
+                            prev_slide.release()
+                if cached:
+                    segments.append(cached)
+                else:
+                    out = os.path.join(self.tmp_dir, f"segment_{i:03d}.mp4")
+                    args = (slide, n - fade, out, self.fps, dur, fade if maker.kenburns else 0)
+                    segments.append(
+                        encoder.submit(maker._encode_segment, args, [slide], i, "encode", n - fade, key)
+                    )
+            except BaseException:
+                for frame in owned:
+                    frame.release()
+                _release(fresh)
+                raise
+            if not cached or (fade_key and not fade_cached):
+                rebuilt.append(i)
+            while held:
+                held.pop().release()
+            if slide is not None:
+                held.append(slide)
+            if self.progressive is not None:
+                # Narration still audible from earlier sections overlaps this one's start.
+                sources = []
+                for j in range(i, -1, -1):
+                    if j < i and starts[j] + durations[j] <= starts[i]:
+                        break
+                    sources.append((audio_paths[j], starts[j]))
+                q_pack.put((i, segments[first_segment:], sources[::-1], starts[i], starts[i] + n / self.fps))
+
+        q_pack: "queue.Queue" = queue.Queue()
+        pack_errors: "queue.Queue" = queue.Queue()
+
+        def pack_stage() -> None:
+            while True:
+                item = q_pack.get()
+                if item is _DONE:
+                    return
+                i, segs, sources, start, end = item
+                t0 = time.perf_counter()
+                self.progressive.add(i, [s.result() if isinstance(s, Future) else s for s in segs], sources, start, end)
+                instr.section(i, "package", time.perf_counter() - t0)
+
+        stages = [_stage(tts_stage, q_tts, stop), _stage(render_stage, q_render, stop)]
+        packer = _stage(pack_stage, pack_errors, threading.Event()) if self.progressive is not None else None
+        pending = None
+        try:
+            while True:
+                item = q_render.get()
+                if isinstance(item, BaseException):
+                    raise item
+                if item is _DONE:
+                    break
+                # Hold one section back: only the end of input says which one is last.
+                if pending is not None:
+                    done, pending = pending, item
+                    finish(done, last=False)
+                    instr.progress("pipeline", len(hashes), item[0] + 1)  # total so far; input may be lazy
+                else:
+                    pending = item
+            if pending is None:
+                raise ValueError("No sections to render.")
+            done, pending = pending, None
+            finish(done, last=True)
+            segments[:] = [s.result() if isinstance(s, Future) else s for s in segments]
+            instr.progress("pipeline", len(hashes), len(hashes))
+        finally:
+            while held:
+                held.pop().release()
+            # Stop the stages (also when the build failed) and free the slides still queued.
+            stop.set()
+            tts_pool.shutdown(wait=False, cancel_futures=True)
+            if pending is not None:
+                _release_rendered(pending)
+            for t in stages:
+                while t.is_alive():
+                    self._drain(q_render)
+                    t.join(_POLL)
+            self._drain(q_tts)
+            self._drain(q_render)
+            encoder.shutdown()
+            if packer is not None:
+                q_pack.put(_DONE)
+                packer.join()
+        if packer is not None:
+            if not pack_errors.empty():
+                raise pack_errors.get()
+            self.progressive.close()
+        return hashes, audio_paths, durations, frames, keys, fade_keys, fades, segments, rebuilt
+
+
+def build_streaming(
+    maker: "LectureMaker",
+    sections: Iterable[Section],
+    out_video: str,
+    out_srt: str,
+    tmp_dir: str,
+    music_path: Optional[str],
+    fps: int,
+    crossfade: float,
+    instr: Instrumentation,
+    depth: int = 4,
+    playlist_path: Optional[str] = None,
+    keep_temp: bool = False,
+) -> None:
+    """Streaming counterpart of the ffmpeg engine; see `StreamingBuild`.
+
+    With `playlist_path`, an HLS playlist of the lecture grows there while it renders.
+    """
+    progressive = ProgressiveHLS(playlist_path, crossfade, music_path, instr, mix_options=maker.mix_options) if playlist_path else None
+    with instr.stage("pipeline"), SubtitleWriter(out_srt) as subtitles:
+        hashes, audio_paths, durations, frames, keys, fade_keys, fades, segments, rebuilt = StreamingBuild(
+            maker, tmp_dir, fps, crossfade, instr, depth=depth, progressive=progressive, keep_temp=keep_temp,
+            subtitles=subtitles,
+        ).run(sections)
+
+    timeline = Timeline.from_frames(frames, fps)
+    maker._write_manifest(
+        out_video, maker.render_settings(fps), hashes, keys, durations, frames, rebuilt, fade_keys, fades
+    )
+    maker.finish_ffmpeg(
+        segments, audio_paths, timeline.starts, timeline.duration, out_video, tmp_dir, music_path, instr
+    )
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import csv
+import math
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .audio import assemble_narration, decode_music
+from .encode import run_ffmpeg, write_concat_list
+from .metrics import Instrumentation
+
+
+class ProgressiveHLS:
+    """HLS event playlist that grows while a lecture renders, so playback starts early.
+
+    Each finished section is muxed with its slice of the narration mix into
+    MPEG-TS media segments next to the playlist (cut at keyframes about every
+    `segment_seconds`) and appended to the playlist, which is rewritten
+    atomically. Timestamps run continuously across sections, and the music is
+    decoded once for all of them. `close` marks the playlist complete. Every
+    update is also reported as a `playlist` event.
+    """
+
+    def __init__(
+        self,
+        playlist_path: str,
+        crossfade: float = 0.0,
+        music_path: Optional[str] = None,
+        instr: Optional[Instrumentation] = None,
+        segment_seconds: float = 10.0,
+        mix_options: Optional[Dict[str, Any]] = None,
+    ):
+        self.path = playlist_path
+        self.dir = os.path.dirname(os.path.abspath(playlist_path))
+        self.music_path = music_path
+        self.instr = instr
+        self.segment_seconds = segment_seconds
+        self.mix_options = mix_options or {}
+        # Cuts land on the first keyframe after each `segment_seconds`; a fade segment
+        # (up to `crossfade` long) can push one further. The target may not change later.
+        self.target = int(math.ceil(segment_seconds + crossfade)) + 1
+        self.entries: List[Tuple[str, float]] = []
+        os.makedirs(self.dir, exist_ok=True)
+        self.music = decode_music(music_path, tmp_base=os.path.join(self.dir, "music")) if music_path else None
+        self._write(done=False)
+
+    @property
+    def duration(self) -> float:
+        return sum(d for _, d in self.entries)
+
+    def add(
+        self, index: int, segments: Sequence[str], sources: Sequence[Tuple[str, float]], start: float, end: float
+    ) -> None:
+        """Append the section covering [start, end) of the output.
+
+        `segments` are its encoded video segments and `sources` the narration
+        files (with their start times) that are audible during it.
+        """
+        base = os.path.join(self.dir, f"section_{index:04d}")
+        audio = assemble_narration(
+            [p for p, _ in sources], [st for _, st in sources], end, base + ".m4a",
+            music=self.music, offset=start, **self.mix_options,
+        )
+        list_path = base + ".concat.txt"
+        csv_path = base + ".csv"
+        write_concat_list(segments, list_path)
+        try:
+            run_ffmpeg([
+                "-f", "concat", "-safe", "0", "-i", list_path, "-i", audio,
+                "-map", "0:v:0", "-map", "1:a:0", "-c", "copy", "-t", f"{end - start:.3f}",
+                "-output_ts_offset", f"{start:.6f}",
+                "-f", "segment", "-segment_format", "mpegts", "-segment_time", str(self.segment_seconds),
+                "-segment_start_number", str(len(self.entries)),
+                "-segment_list", csv_path, "-segment_list_type", "csv",
+                os.path.join(self.dir, "seg_%05d.ts"),
+            ])
+            with open(csv_path, newline="", encoding="utf-8") as f:
+                # End times include the offset; the first start is reported as 0.
+                for name, t0, t1 in csv.reader(f):
+                    self.entries.append((os.path.basename(name), float(t1) - max(float(t0), start)))
+        finally:
+            for p in (list_path, csv_path, audio):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+        self._write(done=False)
+
+    def close(self) -> None:
+        self._write(done=True)
+
+    def _write(self, done: bool) -> None:
+        lines = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:3",
+            f"#EXT-X-TARGETDURATION:{self.target}",
+            "#EXT-X-MEDIA-SEQUENCE:0",
+            "#EXT-X-PLAYLIST-TYPE:EVENT",
+        ]
+        for name, dur in self.entries:
+            lines += [f"#EXTINF:{dur:.6f},", name]
+        if done:
+            lines.append("#EXT-X-ENDLIST")
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp, self.path)
+        if self.instr is not None:
+            self.instr.emit(
+                "playlist", path=self.path, segments=len(self.entries), duration=round(self.duration, 3), complete=done
+            )
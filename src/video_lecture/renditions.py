@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import os
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+FORMATS = ("mp4", "hls")
+
+# Audio is muxed at this rate into every rendition (see `concat_segments`).
+_AUDIO_BPS = 192_000
+
+
+@dataclass
+class Rendition:
+    """One output of a build: frame size, video bitrate and container ("mp4" or "hls")."""
+
+    width: int
+    height: int
+    bitrate: str = "3000k"
+    format: str = "mp4"
+    name: Optional[str] = None
+
+    def __post_init__(self):
+        if self.format not in FORMATS:
+            raise ValueError(f"Unknown rendition format {self.format!r}; expected one of {', '.join(FORMATS)}")
+        if self.width % 2 or self.height % 2:
+            raise ValueError(f"Rendition size must be even for yuv420p: {self.width}x{self.height}")
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.width, self.height
+
+    @property
+    def label(self) -> str:
+        return self.name or f"{self.height}p"
+
+    def output_path(self, out_video: str) -> str:
+        """`<root>_<label>.mp4`, or `<root>_<label>/index.m3u8` for HLS."""
+        root = os.path.splitext(out_video)[0]
+        if self.format == "hls":
+            return os.path.join(f"{root}_{self.label}", "index.m3u8")
+        return f"{root}_{self.label}.mp4"
+
+
+def parse_rendition(spec: str) -> Rendition:
+    """Parse `WxH[:bitrate][:mp4|hls]`, e.g. `1280x720:2500k:hls`."""
+    parts = spec.split(":")
+    m = re.fullmatch(r"(\d+)x(\d+)", parts[0].strip())
+    if not m or len(parts) > 3:
+        raise ValueError(f"Bad rendition {spec!r}; expected WxH[:bitrate][:mp4|hls]")
+    r = Rendition(int(m.group(1)), int(m.group(2)))
+    for part in parts[1:]:
+        part = part.strip().lower()
+        if part in FORMATS:
+            r.format = part
+        elif re.fullmatch(r"\d+(\.\d+)?[km]?", part):
+            r.bitrate = part
+        else:
+            raise ValueError(f"Bad rendition {spec!r}: {part!r} is neither a bitrate nor a format")
+    return r
+
+
+def bits_per_second(bitrate: str) -> int:
+    """`"3000k"` -> 3000000 (ffmpeg's k/M suffixes)."""
+    b = bitrate.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(b[-1:], 1)
+    return int(float(b.rstrip("km")) * scale)
+
+
+def write_master_playlist(path: str, renditions: Sequence[Rendition], outputs: Sequence[str]) -> str:
+    """Write an HLS master playlist pointing at the HLS renditions in `outputs`."""
+    base = os.path.dirname(os.path.abspath(path))
+    lines: List[str] = ["#EXTM3U", "#EXT-X-VERSION:7", "#EXT-X-INDEPENDENT-SEGMENTS"]
+    # Highest quality first, which is what players expect to see as the default.
+    hls = sorted(
+        ((r, out) for r, out in zip(renditions, outputs) if r.format == "hls"),
+        key=lambda ro: -bits_per_second(ro[0].bitrate),
+    )
+    for r, out in hls:
+        bandwidth = bits_per_second(r.bitrate) + _AUDIO_BPS
+        lines.append(f"#EXT-X-STREAM-INF:BANDWIDTH={bandwidth},RESOLUTION={r.width}x{r.height}")
+        lines.append(os.path.relpath(os.path.abspath(out), base).replace(os.sep, "/"))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    return path
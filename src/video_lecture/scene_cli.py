@@ -3,6 +3,7 @@ from __future__ import annotations
 import argparse
 import json
 import os
+from .encode import PROFILES, EncodeProfile
 from .scene_compose import compose_from_json
 
 
@@ -10,9 +11,17 @@ def main():
     p = argparse.ArgumentParser(description="Compose per-scene avatar + slides into a single video")
     p.add_argument("scenes_json", help="Path to scenes JSON file")
     p.add_argument("--output", "-o", required=True, help="Output MP4 path")
+    p.add_argument("--engine", choices=["ffmpeg", "moviepy"], default="ffmpeg", help="ffmpeg filter graph per scene, or MoviePy compositing")
+    p.add_argument("--workers", type=int, default=0, help="Scenes composited concurrently (0 = half the CPU cores)")
+    p.add_argument("--bitrate", default="3000k", help="Video bitrate (ffmpeg syntax, e.g. 3000k)")
+    p.add_argument("--encode-profile", choices=PROFILES, default="cbr", help="Rate control: constant --bitrate, or quality-targeted (CRF, capped at --bitrate)")
+    p.add_argument("--crf", type=int, default=23, help="x264 CRF for --encode-profile vfr (lower = better quality, larger file)")
     args = p.parse_args()
 
-    out = compose_from_json(args.scenes_json, args.output)
+    out = compose_from_json(
+        args.scenes_json, args.output, engine=args.engine, workers=args.workers or None,
+        profile=EncodeProfile(args.encode_profile, crf=args.crf), bitrate=args.bitrate,
+    )
     print(f"Video saved to: {out}")
 
 
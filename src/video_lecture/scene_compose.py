@@ -2,18 +2,29 @@ from __future__ import annotations
 
 import json
 import os
-from typing import List, Tuple, Optional
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple, Optional, Union
 
+import numpy as np
 from PIL import Image
 from moviepy import (
     VideoFileClip,
     ImageClip,
     CompositeVideoClip,
-    concatenate_videoclips,
 )
 
+from .encode import EncodeProfile, concat_segments, probe_media, run_ffmpeg
 from .slides import Section, render_slide
 from .subtitles import build_subtitles, to_srt
+from .timeline import Timeline, TimelineClip
+
+Pos = Union[str, int, float]
+
+# overlay expressions for MoviePy-style position names (W/H: frame, w/h: avatar)
+_POS_X = {"left": "0", "center": "(W-w)/2", "right": "W-w"}
+_POS_Y = {"top": "0", "center": "(H-h)/2", "bottom": "H-h"}
 
 
 def compose_scenes(
@@ -22,44 +33,158 @@ def compose_scenes(
     size: Tuple[int, int] = (1280, 720),
     theme: str = "dark",
     pip_size: float = 0.35,
-    pip_pos: Tuple[str, str] = ("right", "bottom"),
+    pip_pos: Tuple[Pos, Pos] = ("right", "bottom"),
     fps: int = 24,
+    engine: str = "ffmpeg",
+    workers: Optional[int] = None,
+    profile: Optional[EncodeProfile] = None,
+    bitrate: str = "3000k",
 ) -> str:
-    clips = []
-    for i, sc in enumerate(scenes):
-        title = sc.get("title") or f"Scene {i+1}"
-        visual = sc.get("visual") or sc.get("description") or ""
-        avatar_path = sc.get("avatar_video")
-        narration = sc.get("narration") or ""
+    """Slide backgrounds with the scene's avatar video as picture-in-picture.
 
-        # Background slide
-        bg_img = render_slide(Section(title=title, body=visual), size=size, theme=theme)
-        bg_clip = ImageClip(bg_img).with_duration(1)  # temp, will be set to avatar duration
+    `pip_size` scales the avatar video and `pip_pos` places it like MoviePy's
+    `with_position` (names or pixel offsets). The "ffmpeg" engine composites
+    each scene in one filter graph (avatar scaled once, overlaid on the
+    rendered slide) with up to `workers` scenes in flight, then joins the
+    segments without re-encoding; "moviepy" composites frames in Python.
+    `profile` sets the rate control against `bitrate` for both engines; the
+    avatar moves in every frame, so scenes keep a constant frame rate.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(out_video)) or ".", exist_ok=True)
+    if engine == "moviepy":
+        return _compose_moviepy(scenes, out_video, size, theme, pip_size, pip_pos, fps, profile, bitrate)
 
-        # Avatar PiP
-        avatar = VideoFileClip(avatar_path)
-        dur = avatar.duration
-        bg_clip = bg_clip.with_duration(dur)
-        pip = avatar.resized(lambda t: pip_size).with_position(pip_pos)
+    tmp_dir = tempfile.mkdtemp(prefix="scenes_")
+    try:
+        def one(i: int) -> str:
+            return _compose_segment(i, scenes[i], tmp_dir, size, theme, pip_size, pip_pos, fps, profile, bitrate)
 
-        comp = CompositeVideoClip([bg_clip, pip]).with_duration(dur).with_audio(avatar.audio)
-        clips.append(comp)
+        # Each scene holds one ffmpeg process (and its avatar reader) open.
+        workers = workers or max(1, (os.cpu_count() or 2) // 2)
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            segments = list(ex.map(one, range(len(scenes))))
+        return concat_segments(segments, out_video)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
 
-    final = concatenate_videoclips(clips, method="compose")
 
-    os.makedirs(os.path.dirname(os.path.abspath(out_video)) or ".", exist_ok=True)
-    final.write_videofile(
-        out_video,
-        fps=fps,
-        codec="libx264",
-        audio_codec="aac",
-        bitrate="3000k",
-        preset="ultrafast",
+def _scene_slide(i: int, sc: dict, size: Tuple[int, int], theme: str) -> Image.Image:
+    title = sc.get("title") or f"Scene {i+1}"
+    visual = sc.get("visual") or sc.get("description") or ""
+    return render_slide(Section(title=title, body=visual), size=size, theme=theme)
+
+
+def _overlay_xy(pip_pos: Tuple[Pos, Pos]) -> Tuple[str, str]:
+    px, py = pip_pos
+    x = _POS_X[px] if isinstance(px, str) else str(int(px))
+    y = _POS_Y[py] if isinstance(py, str) else str(int(py))
+    return x, y
+
+
+def _compose_segment(
+    i: int,
+    sc: dict,
+    tmp_dir: str,
+    size: Tuple[int, int],
+    theme: str,
+    pip_size: float,
+    pip_pos: Tuple[Pos, Pos],
+    fps: int,
+    profile: Optional[EncodeProfile] = None,
+    bitrate: str = "3000k",
+) -> str:
+    avatar_path = sc.get("avatar_video")
+    dur, has_audio = probe_media(avatar_path)
+    if dur is None:
+        raise RuntimeError(f"Could not read avatar video for scene {i+1}: {avatar_path}")
+    slide = os.path.join(tmp_dir, f"scene_{i:03d}.png")
+    _scene_slide(i, sc, size, theme).save(slide)
+    out = os.path.join(tmp_dir, f"scene_{i:03d}.mp4")
+
+    # The slide input loops forever and the last avatar frame is held, so the
+    # frame count alone sets the length; audio is padded/cut to match.
+    frames = max(1, int(round(dur * fps)))
+    x, y = _overlay_xy(pip_pos)
+    graph = (
+        f"[1:v]scale=trunc(iw*{pip_size}):trunc(ih*{pip_size})[pip];"
+        f"[0:v][pip]overlay=x={x}:y={y}:eof_action=repeat,fps={fps},format=yuv420p[v];"
     )
+    args = ["-loop", "1", "-framerate", str(fps), "-i", slide, "-i", avatar_path]
+    if has_audio:
+        graph += "[1:a]aresample=44100,aformat=sample_fmts=fltp:channel_layouts=stereo,apad"
+    else:
+        # Keep a silent track so every segment has the same streams for concat.
+        args += ["-f", "lavfi", "-i", "anullsrc=r=44100:cl=stereo"]
+        graph += "[2:a]anull"
+    graph += f",atrim=end_sample={int(round(frames / fps * 44100))}[a]"
+    run_ffmpeg(args + [
+        "-filter_complex", graph, "-map", "[v]", "-map", "[a]",
+        "-frames:v", str(frames),
+        "-c:v", "libx264", "-preset", "ultrafast", *(profile or EncodeProfile()).rate_args(bitrate),
+        "-g", str(fps * 10), "-r", str(fps), "-video_track_timescale", "90000",
+        "-c:a", "aac", "-b:a", "192k",
+        out,
+    ])
+    return out
+
+
+def _compose_moviepy(
+    scenes: List[dict],
+    out_video: str,
+    size: Tuple[int, int],
+    theme: str,
+    pip_size: float,
+    pip_pos: Tuple[Pos, Pos],
+    fps: int,
+    profile: Optional[EncodeProfile] = None,
+    bitrate: str = "3000k",
+) -> str:
+    profile = profile or EncodeProfile()
+    clips = []
+    readers = []
+    try:
+        for i, sc in enumerate(scenes):
+            # Background slide
+            bg_img = _scene_slide(i, sc, size, theme)
+
+            # Avatar PiP
+            avatar = VideoFileClip(sc.get("avatar_video"))
+            readers.append(avatar)
+            dur = avatar.duration
+            bg_clip = ImageClip(np.array(bg_img)).with_duration(dur)
+            pip = avatar.resized(pip_size).with_position(pip_pos)
+
+            comp = CompositeVideoClip([bg_clip, pip]).with_duration(dur).with_audio(avatar.audio)
+            clips.append(comp)
+
+        timeline = Timeline.from_durations([c.duration for c in clips])
+        final = TimelineClip(clips, timeline, size=size)
+        rate = {"bitrate": bitrate}
+        if profile.mode != "cbr":
+            keyframes = ",".join(f"{t:.3f}" for t in timeline.starts)
+            rate = {"ffmpeg_params": profile.rate_args(bitrate) + ["-force_key_frames", keyframes]}
+        final.write_videofile(
+            out_video,
+            fps=fps,
+            codec="libx264",
+            audio_codec="aac",
+            **rate,
+            preset="ultrafast",
+        )
+    finally:
+        for r in readers:
+            r.close()
     return out_video
 
 
-def compose_from_json(json_path: str, out_video: str) -> str:
+def compose_from_json(
+    json_path: str,
+    out_video: str,
+    engine: str = "ffmpeg",
+    workers: Optional[int] = None,
+    profile: Optional[EncodeProfile] = None,
+    bitrate: str = "3000k",
+) -> str:
     with open(json_path, "r", encoding="utf-8") as f:
         data = json.load(f)
     scenes = data["scenes"] if isinstance(data, dict) else data
@@ -68,4 +193,7 @@ def compose_from_json(json_path: str, out_video: str) -> str:
     pip_size = float(data.get("pip_size", 0.35)) if isinstance(data, dict) else 0.35
     pip_pos = tuple(data.get("pip_pos", ["right", "bottom"])) if isinstance(data, dict) else ("right", "bottom")
     fps = int(data.get("fps", 24)) if isinstance(data, dict) else 24
-    return compose_scenes(scenes, out_video, size=size, theme=theme, pip_size=pip_size, pip_pos=pip_pos, fps=fps)
+    return compose_scenes(
+        scenes, out_video, size=size, theme=theme, pip_size=pip_size, pip_pos=pip_pos, fps=fps,
+        engine=engine, workers=workers, profile=profile, bitrate=bitrate,
+    )
@@ -0,0 +1,479 @@
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .assemble import LectureMaker
+from .cli import build_parser, make_maker
+from .encode import concat_segments, plan_segments
+from .metrics import Instrumentation, json_lines_hook
+from .slides import Section, iter_sections
+from .subtitles import SubtitleWriter
+
+SHARD_SIZE = 20
+LEASE_SECONDS = 60.0
+MAX_ATTEMPTS = 3
+
+
+class ShardQueue:
+    """One lecture split into contiguous shards of sections, queued in a shared directory.
+
+    Layout under `path` (any directory every worker can reach):
+
+        job.json              CLI args, output path, shard ranges, lease settings
+        shards/<k>.json       sections of shard k, plus the section before it
+        leases/<k>.<n>        claim of attempt n on shard k (mtime = last heartbeat)
+        failed/<k>.<n>        error of a failed attempt
+        staging/              attempts in progress
+        done/<k>/             finished shard: video, narration, result.json
+
+    A claim is a lease file created with O_EXCL, so one worker wins each
+    attempt. A shard whose latest attempt failed, or whose lease was not
+    renewed for `lease_seconds`, can be claimed again as the next attempt, up
+    to `max_attempts`. Finished shards are published by renaming their staging
+    directory into `done/`, so each is done exactly once and never redone.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "job.json"), "r", encoding="utf-8") as f:
+            self.job = json.load(f)
+        self.count = len(self.job["shards"])
+        self.lease_seconds = float(self.job["lease_seconds"])
+        self.max_attempts = int(self.job["max_attempts"])
+
+    @classmethod
+    def create(
+        cls,
+        path: str,
+        sections: Iterable[Section],
+        args: List[str],
+        output: str,
+        shard_size: int = SHARD_SIZE,
+        lease_seconds: float = LEASE_SECONDS,
+        max_attempts: int = MAX_ATTEMPTS,
+    ) -> "ShardQueue":
+        """Write the job and its shards (`shard_size` sections each) to a new queue at `path`."""
+        if os.path.exists(os.path.join(path, "job.json")):
+            raise ValueError(f"A sharded job already exists in {path}")
+        for sub in ("shards", "leases", "failed", "staging", "done"):
+            os.makedirs(os.path.join(path, sub), exist_ok=True)
+        ranges: List[Tuple[int, int]] = []
+        chunk: List[Section] = []
+        before: Optional[Section] = None
+
+        def flush(last: bool) -> None:
+            nonlocal before
+            start = ranges[-1][1] if ranges else 0
+            spec = {
+                "start": start,
+                "end": start + len(chunk),
+                "lead": 1 if before else 0,
+                "last": last,
+                "sections": [{"title": s.title, "body": s.body} for s in ([before] if before else []) + chunk],
+            }
+            _write_json(os.path.join(path, "shards", f"{len(ranges):05d}.json"), spec)
+            ranges.append((spec["start"], spec["end"]))
+            before = chunk[-1]
+
+        # A full shard is written once the next section shows up, so only the final one is `last`.
+        for sec in sections:
+            if len(chunk) == shard_size:
+                flush(last=False)
+                chunk = []
+            chunk.append(sec)
+        if not chunk:
+            raise ValueError("No sections to shard.")
+        flush(last=True)
+        _write_json(os.path.join(path, "job.json"), {
+            "args": list(args),
+            "output": output,
+            "shards": ranges,
+            "lease_seconds": lease_seconds,
+            "max_attempts": max_attempts,
+        })
+        return cls(path)
+
+    def _dir(self, sub: str, name: str = "") -> str:
+        return os.path.join(self.path, sub, name)
+
+    def spec(self, shard: int) -> dict:
+        with open(self._dir("shards", f"{shard:05d}.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _attempts(self) -> Dict[int, int]:
+        """Latest attempt claimed so far, per shard."""
+        attempts: Dict[int, int] = {}
+        for name in os.listdir(self._dir("leases")):
+            if name.startswith("."):
+                continue
+            k, _, n = name.partition(".")
+            attempts[int(k)] = max(attempts.get(int(k), 0), int(n))
+        return attempts
+
+    def states(self, attempts: Optional[Dict[int, int]] = None) -> List[str]:
+        """Per shard: "done", "leased", "pending" (claimable) or "exhausted" (out of attempts)."""
+        done = set(os.listdir(self._dir("done")))
+        failed = set(os.listdir(self._dir("failed")))
+        if attempts is None:
+            attempts = self._attempts()
+        now = time.time()
+        states = []
+        for k in range(self.count):
+            n = attempts.get(k, 0)
+            name = f"{k:05d}.{n}"
+            if f"{k:05d}" in done:
+                states.append("done")
+            elif n and name not in failed and not self._expired(name, now):
+                states.append("leased")
+            else:
+                states.append("pending" if n < self.max_attempts else "exhausted")
+        return states
+
+    def _expired(self, lease: str, now: float) -> bool:
+        try:
+            return os.path.getmtime(self._dir("leases", lease)) + self.lease_seconds < now
+        except FileNotFoundError:
+            return True
+
+    def finished(self) -> bool:
+        """True once every shard is done or out of attempts."""
+        return all(s in ("done", "exhausted") for s in self.states())
+
+    def claim(self, worker: str) -> Optional["Lease"]:
+        """Lease the first claimable shard for `worker`, or None if there is none right now."""
+        # The attempt number comes from the same listing as the state, so two workers that
+        # both saw a shard as claimable race for the same lease file and only one wins.
+        attempts = self._attempts()
+        for k, state in enumerate(self.states(attempts)):
+            if state != "pending":
+                continue
+            attempt = attempts.get(k, 0) + 1
+            try:
+                fd = os.open(self._dir("leases", f"{k:05d}.{attempt}"), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                continue  # another worker claimed this attempt first
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"worker": worker, "claimed": time.time()}, f)
+            return Lease(self, k, attempt, worker)
+        return None
+
+    def errors(self) -> List[Tuple[int, str]]:
+        """(shard, error) of the last failed attempt of each shard that is out of attempts."""
+        out = []
+        for k, state in enumerate(self.states()):
+            if state != "exhausted":
+                continue
+            failures = sorted(
+                (n for n in os.listdir(self._dir("failed")) if n.startswith(f"{k:05d}.")),
+                key=lambda n: int(n.partition(".")[2]),
+            )
+            error = "lease expired"
+            if failures:
+                with open(self._dir("failed", failures[-1]), "r", encoding="utf-8") as f:
+                    error = json.load(f)["error"]
+            out.append((k, error))
+        return out
+
+    def wait(self, poll: float = 2.0) -> None:
+        """Block until every shard is done; raises RuntimeError if any ran out of attempts."""
+        while not self.finished():
+            time.sleep(poll)
+        errors = self.errors()
+        if errors:
+            raise RuntimeError(
+                f"{len(errors)} shard(s) failed after {self.max_attempts} attempts: "
+                + "; ".join(f"shard {k}: {e}" for k, e in errors)
+            )
+
+
+class Lease:
+    """A worker's claim on one attempt of a shard.
+
+    `heartbeat()` renews it in the background while the shard renders; it
+    expires (and the shard becomes claimable again) if the worker stops
+    renewing it.
+    """
+
+    def __init__(self, queue: ShardQueue, shard: int, attempt: int, worker: str):
+        self.queue = queue
+        self.shard = shard
+        self.attempt = attempt
+        self.worker = worker
+        self.name = f"{shard:05d}.{attempt}"
+        self.staging = queue._dir("staging", f"{self.name}.{worker}")
+        os.makedirs(self.staging, exist_ok=True)
+        self._stop = threading.Event()
+
+    def renew(self) -> None:
+        os.utime(self.queue._dir("leases", self.name))
+
+    def heartbeat(self) -> "Lease":
+        threading.Thread(target=self._beat, daemon=True).start()
+        return self
+
+    def _beat(self) -> None:
+        while not self._stop.wait(self.queue.lease_seconds / 3):
+            try:
+                self.renew()
+            except OSError:
+                pass
+
+    def __enter__(self) -> "Lease":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+
+    def complete(self) -> bool:
+        """Publish the staging directory as the shard's output; False if another attempt beat us to it."""
+        self._stop.set()
+        try:
+            os.rename(self.staging, self.queue._dir("done", f"{self.shard:05d}"))
+            return True
+        except OSError:
+            shutil.rmtree(self.staging, ignore_errors=True)
+            return False
+
+    def fail(self, error: str) -> None:
+        self._stop.set()
+        shutil.rmtree(self.staging, ignore_errors=True)
+        _write_json(self.queue._dir("failed", self.name), {"worker": self.worker, "error": error})
+
+
+def _write_json(path: str, data: dict) -> None:
+    # Written under a hidden temporary name and renamed, so readers never see a partial file.
+    head, tail = os.path.split(path)
+    tmp = os.path.join(head, f".{tail}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def render_shard(
+    maker: LectureMaker,
+    spec: dict,
+    out_dir: str,
+    fps: int,
+    crossfade: float,
+    instrument: Optional[Instrumentation] = None,
+    keep_temp: bool = False,
+) -> dict:
+    """Render one shard into `out_dir`: a video-only MP4 and its narration clips.
+    Returns (and writes as result.json) what the merge needs, including the exact
+    narration lengths the merged subtitles are laid out from.
+
+    The section before the shard is narrated and rendered too, so the fade into
+    the shard's first slide matches an unsharded build; its own segment is not
+    encoded. Narration and segments come from the maker's caches when possible.
+    """
+    instr = instrument or Instrumentation()
+    sections = [Section(**s) for s in spec["sections"]]
+    lead = spec["lead"]
+    with instr.stage("tts"):
+        texts = [f"{sec.title}. {sec.body}" if sec.body else sec.title for sec in sections]
+        narration = maker.tts.synthesize_many(texts, concurrency=maker.tts_concurrency)
+        durations = [d for _, d in narration]
+    # The shard's last slide is covered by the next shard's fade unless it ends the lecture.
+    frames, _ = plan_segments(durations if spec["last"] else durations + [0.0], crossfade, fps)
+    frames = frames[: len(sections)]
+
+    video = os.path.join(out_dir, "video.mp4")
+    tmp_dir = tempfile.mkdtemp(prefix="shard_")
+    instr.tmp_dir = tmp_dir
+    try:
+        segments, _, _ = maker.encode_slides(
+            sections, durations, video, tmp_dir, fps, crossfade, instr, keep_temp, frames=frames, lead=lead
+        )
+        with instr.stage("write"):
+            concat_segments(segments, video)
+    finally:
+        if not keep_temp:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    # Narration is copied next to the video: the merge may run elsewhere, and caches evict.
+    clips = []
+    for j, (path, _) in enumerate(narration[lead:]):
+        clips.append(f"narration_{j:04d}{os.path.splitext(path)[1]}")
+        shutil.copyfile(path, os.path.join(out_dir, clips[-1]))
+    result = {"durations": durations[lead:], "frames": frames[lead:], "narration": clips}
+    _write_json(os.path.join(out_dir, "result.json"), result)
+    return result
+
+
+def _job_args(queue: ShardQueue) -> argparse.Namespace:
+    return build_parser().parse_args(queue.job["args"])
+
+
+def work(
+    queue: ShardQueue,
+    worker: Optional[str] = None,
+    poll: float = 2.0,
+    maker: Optional[LectureMaker] = None,
+) -> int:
+    """Claim and render shards until every shard is done or out of attempts; returns
+    how many this worker published.
+
+    While the remaining shards are leased by others the worker keeps polling,
+    so it can take over any whose lease expires. A maker created here is closed
+    on return.
+    """
+    worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+    args = _job_args(queue)
+    if maker is None:
+        with make_maker(args) as maker:
+            return work(queue, worker, poll, maker)
+    progress = json_lines_hook(sys.stderr) if args.progress else None
+    published = 0
+    while True:
+        lease = queue.claim(worker)
+        if lease is None:
+            if queue.finished():
+                return published
+            time.sleep(poll)
+            continue
+        t0 = time.perf_counter()
+        instr = Instrumentation()
+        if progress:
+            instr.add_hook(lambda ev, k=lease.shard: progress({"shard": k, **ev}))
+        try:
+            with lease.heartbeat():
+                render_shard(
+                    maker, queue.spec(lease.shard), lease.staging, args.fps, args.crossfade, instr,
+                    keep_temp=args.keep_temp,
+                )
+        except Exception as e:
+            lease.fail(str(e) or type(e).__name__)
+            print(f"[{worker}] shard {lease.shard + 1}/{queue.count} attempt {lease.attempt} failed: {e}", file=sys.stderr)
+            continue
+        if lease.complete():
+            published += 1
+            print(f"[{worker}] shard {lease.shard + 1}/{queue.count} done in {time.perf_counter() - t0:.1f}s")
+
+
+def merge(
+    queue: ShardQueue,
+    out_video: Optional[str] = None,
+    maker: Optional[LectureMaker] = None,
+    instrument: Optional[Instrumentation] = None,
+) -> Tuple[str, str]:
+    """Join the finished shards into the final video and subtitles; returns both paths.
+
+    Shard videos are joined without re-encoding. Narration (with music, ducking
+    and normalization) is mixed once over the whole lecture. Subtitles are laid
+    out again from the shards' exact narration lengths, so they match an
+    unsharded build to the millisecond.
+    """
+    args = _job_args(queue)
+    if maker is None:
+        with make_maker(args) as maker:
+            return merge(queue, out_video, maker, instrument)
+    out_video = out_video or queue.job["output"]
+    out_srt = os.path.splitext(out_video)[0] + "." + args.subtitles
+    instr = instrument or Instrumentation()
+    os.makedirs(os.path.dirname(os.path.abspath(out_video)) or ".", exist_ok=True)
+    videos: List[str] = []
+    audio_paths: List[str] = []
+    frames: List[int] = []
+    with instr.stage("subtitles"), SubtitleWriter(out_srt) as subs:
+        for k in range(queue.count):
+            shard_dir = queue._dir("done", f"{k:05d}")
+            with open(os.path.join(shard_dir, "result.json"), "r", encoding="utf-8") as f:
+                result = json.load(f)
+            videos.append(os.path.join(shard_dir, "video.mp4"))
+            audio_paths += [os.path.join(shard_dir, name) for name in result["narration"]]
+            frames += result["frames"]
+            spec = queue.spec(k)
+            for sec, dur in zip(spec["sections"][spec["lead"]:], result["durations"]):
+                subs.add(f"{sec['title']}. {sec['body']}", dur)
+    starts = [f / args.fps for f in itertools.accumulate([0] + frames[:-1])]
+    total = sum(frames) / args.fps
+    tmp_dir = tempfile.mkdtemp(prefix="merge_")
+    try:
+        maker.finish_ffmpeg(videos, audio_paths, starts, total, out_video, tmp_dir, args.music, instr)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return out_video, out_srt
+
+
+def submit(
+    path: str,
+    cli_args: List[str],
+    shard_size: int = SHARD_SIZE,
+    lease_seconds: float = LEASE_SECONDS,
+    max_attempts: int = MAX_ATTEMPTS,
+) -> ShardQueue:
+    """Parse the script named in `cli_args` (CLI arguments) and queue it as shards at `path`."""
+    args = build_parser().parse_args(cli_args)
+    if args.engine == "moviepy" or args.rendition or args.progressive or args.draft:
+        raise SystemExit("Sharded rendering uses the ffmpeg engine with a single MP4 output.")
+    output = args.output or os.path.join("out", f"lecture_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4")
+    with open(args.input, "r", encoding="utf-8") as f:
+        return ShardQueue.create(
+            path, iter_sections(f), cli_args, os.path.abspath(output), shard_size, lease_seconds, max_attempts
+        )
+
+
+def main():
+    p = argparse.ArgumentParser(description="Render one lecture as shards over a shared-directory job queue.")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("queue", help="Queue directory, shared by every worker (e.g. on a network mount)")
+    queue_opts = argparse.ArgumentParser(add_help=False)
+    queue_opts.add_argument("--shard-size", type=int, default=SHARD_SIZE, help="Sections per shard")
+    queue_opts.add_argument("--lease", type=float, default=LEASE_SECONDS, help="Seconds without a heartbeat after which a claimed shard is handed to another worker")
+    queue_opts.add_argument("--attempts", type=int, default=MAX_ATTEMPTS, help="Attempts per shard before the job fails")
+    cli_args = argparse.ArgumentParser(add_help=False)
+    cli_args.add_argument("args", nargs=argparse.REMAINDER, help="Script path and options, as for `python -m src.video_lecture.cli` (everything after the queue directory; shard options go before it)")
+    sub.add_parser("submit", parents=[common, queue_opts, cli_args], help="Split a script into shards and queue them")
+    w = sub.add_parser("work", parents=[common], help="Claim and render shards until the queue is finished")
+    w.add_argument("--worker-id", help="Name recorded in leases. Default: <host>-<pid>")
+    w.add_argument("--poll", type=float, default=2.0, help="Seconds between looks for claimable shards")
+    m = sub.add_parser("merge", parents=[common], help="Wait for every shard, then write the final MP4 and subtitles")
+    m.add_argument("--output", "-o", help="Output video path. Default: the job's --output")
+    m.add_argument("--poll", type=float, default=2.0, help="Seconds between checks for unfinished shards")
+    sub.add_parser("status", parents=[common], help="Print the state of every shard")
+    r = sub.add_parser("run", parents=[common, queue_opts, cli_args], help="Submit, render with local worker processes, and merge")
+    r.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Local worker processes (stand-ins for nodes)")
+    args = p.parse_args()
+
+    if args.cmd == "status":
+        states = ShardQueue(args.queue).states()
+        for state in ("done", "leased", "pending", "exhausted"):
+            print(f"{state}: {states.count(state)}")
+        return
+    if args.cmd in ("submit", "run"):
+        queue = submit(args.queue, args.args, args.shard_size, args.lease, args.attempts)
+        print(f"Queued {queue.count} shard(s) in {args.queue}")
+        if args.cmd == "submit":
+            return
+    queue = ShardQueue(args.queue)
+    if args.cmd == "work":
+        work(queue, args.worker_id, args.poll)
+        return
+    if args.cmd == "run":
+        cmd = [sys.executable, "-m", f"{__package__}.shard", "work", args.queue]
+        procs = [subprocess.Popen(cmd + ["--worker-id", f"local-{i}"]) for i in range(max(1, args.workers))]
+        for proc in procs:
+            proc.wait()
+        if not queue.finished():
+            raise SystemExit(f"Workers exited before every shard was done; run `work {args.queue}` to resume.")
+    queue.wait(getattr(args, "poll", 2.0))
+    video_path, srt_path = merge(queue, getattr(args, "output", None))
+    print(f"Video saved to: {video_path}")
+    print(f"Subtitles saved to: {srt_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,19 @@
 from __future__ import annotations
 
+import hashlib
+import multiprocessing
+import os
 import re
 import textwrap
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError, ProcessPoolExecutor
 from dataclasses import dataclass
-from typing import List, Optional, Tuple
+from functools import lru_cache
+from multiprocessing import resource_tracker, shared_memory
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 
 
@@ -13,75 +22,86 @@ class Section:
     title: str
     body: str
 
+    def content_hash(self) -> str:
+        """Stable hash of the section text, used to key caches and build manifests."""
+        h = hashlib.sha256()
+        h.update(self.title.encode("utf-8"))
+        h.update(b"\0")
+        h.update(self.body.encode("utf-8"))
+        return h.hexdigest()
+
+
+_RULE = re.compile(r"^\s*---+\s*$")
+_HEADING = re.compile(r"^(#+)\s+(.*)$")
+_HEADING_LINE = re.compile(r"^#+\s+.*\n?")
+_FIRST_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+
 
 def split_script(text: str) -> List[Section]:
     """
     Split script into sections by markdown headings (## or #), `---` rules, or blank lines.
-    If none found, split every ~4 sentences.
+    See `iter_sections`, which does the work one section at a time.
     """
-    lines = [l.rstrip() for l in text.splitlines()]
-    blocks: List[List[str]] = []
-    cur: List[str] = []
-    def push():
-        if cur and any(x.strip() for x in cur):
-            blocks.append(cur.copy())
-        cur.clear()
+    return list(iter_sections(text.splitlines()))
+
 
+def iter_sections(lines: Iterable[str]) -> Iterator[Section]:
+    """Yield the sections of a script read line by line, e.g. from an open file.
+
+    Only the current block is held in memory, so input of any length parses in
+    constant memory (apart from the largest block). Sections are the same as
+    `split_script` returns for the whole text.
+    """
+    cur: List[str] = []
+    # Lines seen while there have only been rules and blanks; if that is all there
+    # is, the whole text is one block (as `split_script` always did).
+    only_rules: Optional[List[str]] = []
     for line in lines:
-        if re.match(r"^\s*---+\s*$", line):
-            push()
+        line = line.rstrip()
+        rule = _RULE.match(line)
+        if only_rules is not None:
+            if rule or not line.strip():
+                only_rules.append(line)
+            else:
+                only_rules = None
+        if rule:
+            yield from _block_section(cur)
+            cur = []
             continue
         if line.startswith("#"):
-            push()
-            cur.append(line)
+            yield from _block_section(cur)
+            cur = [line]
             continue
-        if not line.strip():
-            # paragraph break => softer split; we still accumulate
-            cur.append("")
-        else:
-            cur.append(line)
-    push()
+        # paragraph break => softer split; we still accumulate
+        cur.append(line if line.strip() else "")
+    yield from _block_section(cur)
+    if only_rules:
+        yield from _block_section(only_rules)
 
-    sections: List[Section] = []
-    for b in blocks if blocks else [lines]:
-        joined = "\n".join(b).strip()
-        if not joined:
-            continue
-        # Heading as title
-        m = re.match(r"^(#+)\s+(.*)$", joined)
-        if m:
-            title = m.group(2).strip()
-            body = re.sub(r"^#+\s+.*\n?", "", joined).strip()
+
+def _block_section(block: List[str]) -> Iterator[Section]:
+    joined = "\n".join(block).strip()
+    if not joined:
+        return
+    # Heading as title
+    m = _HEADING.match(joined)
+    if m:
+        title = m.group(2).strip()
+        body = _HEADING_LINE.sub("", joined, count=1).strip()
+    else:
+        # First line as title if short, else first sentence
+        first_line, _, rest = joined.partition("\n")
+        if len(first_line) <= 70:
+            title = first_line.strip()
+            body = rest.strip()
         else:
-            # First line as title if short, else first sentence
-            first_line = joined.splitlines()[0]
-            if len(first_line) <= 70:
-                title = first_line.strip()
-                body = "\n".join(joined.splitlines()[1:]).strip()
-            else:
-                sent_split = re.split(r"(?<=[.!?])\s+", joined, maxsplit=1)
-                title = sent_split[0].strip()
-                body = sent_split[1].strip() if len(sent_split) > 1 else ""
-        sections.append(Section(title=title, body=body))
-
-    if not sections:
-        # Fallback: naive sentence-based chunks
-        sents = re.split(r"(?<=[.!?])\s+", text)
-        chunk = []
-        for s in sents:
-            chunk.append(s)
-            if len(chunk) >= 4:
-                joined = " ".join(chunk).strip()
-                if joined:
-                    sections.append(Section(title=chunk[0][:70], body=" ".join(chunk[1:])))
-                chunk = []
-        if chunk:
-            joined = " ".join(chunk).strip()
-            if joined:
-                sections.append(Section(title=chunk[0][:70], body=" ".join(chunk[1:])))
-    return sections
+            sent_split = _FIRST_SENTENCE.split(joined, maxsplit=1)
+            title = sent_split[0].strip()
+            body = sent_split[1].strip() if len(sent_split) > 1 else ""
+    yield Section(title=title, body=body)
 
 
+@lru_cache(maxsize=None)
 def _load_font(font_path: Optional[str], size: int) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
     try:
         if font_path:
@@ -102,36 +122,63 @@ def _load_font(font_path: Optional[str], size: int) -> ImageFont.FreeTypeFont |
     return ImageFont.load_default()
 
 
+# Fonts, wrapped lines and glyph metrics are memoized per process: slides reuse
+# the same two font sizes and often repeat lines, and each pool worker keeps
+# its own warm copy across tasks.
+_MEASURE = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+
+
+@lru_cache(maxsize=65536)
+def _text_bbox(text: str, font_path: Optional[str], size: int) -> Tuple[int, int, int, int]:
+    return _MEASURE.textbbox((0, 0), text, font=_load_font(font_path, size))
+
+
+@lru_cache(maxsize=16384)
+def _wrap(text: str, width: int) -> Tuple[str, ...]:
+    return tuple(textwrap.wrap(text, width=width))
+
+
 def render_slide(
     section: Section,
     size: Tuple[int, int] = (1920, 1080),
     theme: str = "dark",
     font_path: Optional[str] = None,
     padding: int = 80,
+    scale: float = 1.0,
 ) -> Image.Image:
+    """Draw a section as a title slide with bullets.
+
+    `scale` multiplies font sizes and spacing, so a smaller copy of a deck
+    (e.g. `scale=0.5` at half the size) wraps and lays out like the original.
+    """
     W, H = size
     bg = (18, 24, 38) if theme == "dark" else (245, 246, 248)
     fg = (245, 246, 248) if theme == "dark" else (20, 23, 27)
 
+    def px(v: float) -> int:
+        return max(1, int(round(v * scale)))
+
     img = Image.new("RGB", (W, H), color=bg)
     draw = ImageDraw.Draw(img)
 
-    title_font = _load_font(font_path, size=68)
-    body_font = _load_font(font_path, size=40)
+    title_size, body_size = px(68), px(40)
+    title_font = _load_font(font_path, title_size)
+    body_font = _load_font(font_path, body_size)
+    padding = px(padding)
 
     # Title
     title = section.title.strip()
-    t_lines = textwrap.wrap(title, width=28)
+    t_lines = _wrap(title, 28)
     y = padding
     for i, line in enumerate(t_lines):
-        w, h = draw.textbbox((0, 0), line, font=title_font)[2:]
+        w, h = _text_bbox(line, font_path, title_size)[2:]
         draw.text(((W - w) // 2, y), line, font=title_font, fill=fg)
-        y += h + 10
+        y += h + px(10)
 
     # Separator
-    y += 10
-    draw.line([(padding, y), (W - padding, y)], fill=fg, width=3)
-    y += 30
+    y += px(10)
+    draw.line([(padding, y), (W - padding, y)], fill=fg, width=px(3))
+    y += px(30)
 
     # Body bullets
     body = section.body.strip()
@@ -145,20 +192,21 @@ def render_slide(
             else:
                 bullets.append(p)
         for b in bullets:
-            lines = textwrap.wrap(b, width=50)
+            lines = _wrap(b, 50)
             if not lines:
                 continue
             # draw bullet
-            bx, by = padding + 10, y
-            r = 6
-            draw.ellipse((bx - 20 - r, by + 10 - r, bx - 20 + r, by + 10 + r), fill=fg)
+            bx, by = padding + px(10), y
+            r, dx, dy = px(6), px(20), px(10)
+            draw.ellipse((bx - dx - r, by + dy - r, bx - dx + r, by + dy + r), fill=fg)
             for j, l in enumerate(lines):
                 draw.text((bx, y), l, font=body_font, fill=fg)
-                y += draw.textbbox((0, 0), l, font=body_font)[3] - draw.textbbox((0, 0), l, font=body_font)[1]
-                if y > H - padding - 60:
+                bbox = _text_bbox(l, font_path, body_size)
+                y += bbox[3] - bbox[1]
+                if y > H - padding - px(60):
                     break
-            y += 16
-            if y > H - padding - 60:
+            y += px(16)
+            if y > H - padding - px(60):
                 break
     return img
 
@@ -168,5 +216,208 @@ def render_slides(
     size: Tuple[int, int] = (1920, 1080),
     theme: str = "dark",
     font_path: Optional[str] = None,
+    workers: Optional[int] = 1,
+    on_done: Optional[Callable[[int, float], None]] = None,
+    scale: float = 1.0,
 ) -> List[Image.Image]:
-    return [render_slide(s, size=size, theme=theme, font_path=font_path) for s in sections]
+    """Render every section to a slide image, in order.
+
+    `workers` > 1 renders in a process pool (None or 0 means one per CPU core);
+    the output is identical to the serial path. `on_done(index, seconds)` is
+    called as each slide finishes.
+    """
+    if not workers:
+        workers = os.cpu_count() or 1
+    jobs = [(s, size, theme, font_path, scale) for s in sections]
+    if workers <= 1 or len(sections) < 2:
+        results = map(_render_job, jobs)
+    else:
+        chunksize = max(1, len(jobs) // (workers * 4))
+        results = _get_pool(workers).map(_render_job, jobs, chunksize=chunksize)
+    slides: List[Image.Image] = []
+    for i, (img, seconds) in enumerate(results):
+        if on_done:
+            on_done(i, seconds)
+        slides.append(img)
+    return slides
+
+
+class SlideFrame:
+    """A rendered slide as raw RGB pixels, handed to encoders without an image file.
+
+    Slides drawn in the process pool are written by the worker straight into
+    shared memory, so no pixels are pickled. Users `retain` the frame and
+    `release` it when done; the memory is freed with the last release.
+    """
+
+    def __init__(self, size: Tuple[int, int], data: Union[bytes, memoryview], shm=None):
+        self.size = size
+        self._data = data
+        self._shm = shm
+        self._refs = 1
+        self._lock = threading.Lock()
+
+    @property
+    def data(self) -> Union[bytes, memoryview]:
+        return self._data
+
+    def array(self) -> np.ndarray:
+        """H x W x 3 uint8 view of the pixels (no copy)."""
+        W, H = self.size
+        return np.frombuffer(self._data, dtype=np.uint8).reshape(H, W, 3)
+
+    def image(self) -> Image.Image:
+        return Image.frombuffer("RGB", self.size, self._data, "raw", "RGB", 0, 1)
+
+    def save(self, path: str) -> str:
+        self.image().save(path)
+        return path
+
+    def retain(self) -> "SlideFrame":
+        with self._lock:
+            self._refs += 1
+        return self
+
+    def release(self) -> None:
+        with self._lock:
+            self._refs -= 1
+            if self._refs > 0 or self._shm is None:
+                return
+            shm, self._shm = self._shm, None
+        data, self._data = self._data, b""
+        try:
+            data.release()
+            shm.close()
+        except BufferError:
+            pass  # a caller still holds a view; the mapping goes away with it
+        shm.unlink()
+
+
+def submit_frame(
+    section: Section,
+    size: Tuple[int, int] = (1920, 1080),
+    theme: str = "dark",
+    font_path: Optional[str] = None,
+    workers: Optional[int] = 1,
+    scale: float = 1.0,
+) -> "Future[Tuple[SlideFrame, float]]":
+    """Render one slide in memory; resolves to (frame, seconds).
+
+    With `workers` > 1 the slide is drawn in the shared process pool into a
+    shared-memory block allocated here, so only its name crosses the process
+    boundary. Cancelling the future drops the job if it has not started, and
+    frees the block either way.
+    """
+    if not workers:
+        workers = os.cpu_count() or 1
+    fut: "Future[Tuple[SlideFrame, float]]" = Future()
+    if workers <= 1:
+        try:
+            img, seconds = _render_job((section, size, theme, font_path, scale))
+            fut.set_result((SlideFrame(size, img.tobytes()), seconds))
+        except Exception as e:
+            fut.set_exception(e)
+        return fut
+
+    nbytes = size[0] * size[1] * 3
+    pool = _get_pool(workers)
+    shm = shared_memory.SharedMemory(create=True, size=nbytes)
+
+    def done(inner: Future) -> None:
+        try:
+            seconds = inner.result()
+        except BaseException as e:
+            shm.close()
+            shm.unlink()
+            if not fut.cancelled():
+                fut.set_exception(e)
+            return
+        frame = SlideFrame(size, shm.buf[:nbytes], shm)
+        try:
+            fut.set_result((frame, seconds))
+        except InvalidStateError:
+            frame.release()  # cancelled while it rendered
+
+    inner = pool.submit(_render_shm_job, (section, size, theme, font_path, scale, shm.name))
+    fut.add_done_callback(lambda f: inner.cancel() if f.cancelled() else None)
+    inner.add_done_callback(done)
+    return fut
+
+
+def iter_frames(
+    sections: List[Section],
+    size: Tuple[int, int] = (1920, 1080),
+    theme: str = "dark",
+    font_path: Optional[str] = None,
+    workers: Optional[int] = 1,
+    on_done: Optional[Callable[[int, float], None]] = None,
+    scale: float = 1.0,
+) -> Iterator[SlideFrame]:
+    """Yield every section's slide as a `SlideFrame`, in order.
+
+    At most `2 * workers` slides are rendered ahead of the consumer, so memory
+    stays bounded however long the deck is. `on_done(index, seconds)` is called
+    as each slide is taken. Slides rendered ahead are freed if the consumer
+    stops early (an error, or closing the generator).
+    """
+    if not workers:
+        workers = os.cpu_count() or 1
+    window = 2 * workers
+    pending = [submit_frame(sec, size, theme, font_path, workers, scale) for sec in sections[:window]]
+    try:
+        for k in range(len(sections)):
+            frame, seconds = pending.pop(0).result()
+            if k + window < len(sections):
+                pending.append(submit_frame(sections[k + window], size, theme, font_path, workers, scale))
+            if on_done:
+                on_done(k, seconds)
+            yield frame
+    finally:
+        for fut in pending:
+            if not fut.cancel():
+                fut.add_done_callback(_release_frame)
+
+
+def _release_frame(fut: "Future[Tuple[SlideFrame, float]]") -> None:
+    if fut.exception() is None:
+        fut.result()[0].release()
+
+
+_POOLS: Dict[int, ProcessPoolExecutor] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    # One pool per worker count, reused across calls so long-lived processes keep their
+    # warm font caches; concurrent builds asking for different counts don't disturb each
+    # other. Workers come from a fork server (or are spawned), never forked from this
+    # process, which may be running other threads that hold locks.
+    with _POOLS_LOCK:
+        pool = _POOLS.get(workers)
+        if pool is None:
+            if os.name == "posix":
+                # Workers must share our resource tracker, which owns the frames' shared memory.
+                resource_tracker.ensure_running()
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+            _POOLS[workers] = pool
+        return pool
+
+
+def _render_job(job: Tuple[Section, Tuple[int, int], str, Optional[str], float]) -> Tuple[Image.Image, float]:
+    section, size, theme, font_path, scale = job
+    t0 = time.perf_counter()
+    img = render_slide(section, size=size, theme=theme, font_path=font_path, scale=scale)
+    return img, time.perf_counter() - t0
+
+
+def _render_shm_job(job: Tuple[Section, Tuple[int, int], str, Optional[str], float, str]) -> float:
+    section, size, theme, font_path, scale, name = job
+    img, seconds = _render_job((section, size, theme, font_path, scale))
+    data = img.tobytes()
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        shm.buf[: len(data)] = data
+    finally:
+        shm.close()
+    return seconds
@@ -2,7 +2,10 @@ from __future__ import annotations
 
 import re
 from dataclasses import dataclass
-from typing import List, Tuple
+from typing import IO, Iterable, Iterator, List, Optional, Tuple
+
+# Sentence ends, or line breaks
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\n+")
 
 
 @dataclass
@@ -13,51 +16,91 @@ class Subtitle:
     text: str
 
 
-def _format_ts(t: float) -> str:
+def _format_ts(t: float, sep: str = ",") -> str:
     h = int(t // 3600)
     m = int((t % 3600) // 60)
     s = int(t % 60)
     ms = int((t - int(t)) * 1000)
-    return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
+    return f"{h:02d}:{m:02d}:{s:02d}{sep}{ms:03d}"
 
 
 def split_sentences(text: str) -> List[str]:
     # Simple sentence splitter
-    parts = re.split(r"(?<=[.!?])\s+|\n+", text.strip())
+    parts = _SENTENCE_BREAK.split(text.strip())
     return [p.strip() for p in parts if p.strip()]
 
 
-def build_subtitles(section_texts: List[str], section_durations: List[float]) -> List[Subtitle]:
+def section_subtitles(text: str, start: float, dur: float, index: int = 1) -> List[Subtitle]:
+    """Cues for one section narrated over [start, start + dur), numbered from `index`."""
+    sents = split_sentences(text)
+    if not sents:
+        return []
     subs: List[Subtitle] = []
+    # Allocate time proportionally to sentence length
+    total_len = sum(len(s) for s in sents)
+    cur_t = start
+    for s in sents:
+        frac = (len(s) / total_len) if total_len else 1.0 / len(sents)
+        end = min(cur_t + max(0.8, dur * frac), start + dur)  # min 0.8s per sent
+        subs.append(Subtitle(index=index + len(subs), start=cur_t, end=end, text=s))
+        cur_t = end
+    return subs
+
+
+def iter_subtitles(sections: Iterable[Tuple[str, float]]) -> Iterator[Subtitle]:
+    """Cues for (text, duration) pairs laid end to end, one section at a time."""
     cur_t = 0.0
     idx = 1
-    for text, dur in zip(section_texts, section_durations):
-        sents = split_sentences(text)
-        if not sents:
-            cur_t += dur
-            continue
-        # Allocate time proportionally to sentence length
-        total_len = sum(len(s) for s in sents)
-        allocs: List[Tuple[str, float]] = []
-        for s in sents:
-            frac = (len(s) / total_len) if total_len else 1.0 / len(sents)
-            allocs.append((s, max(0.8, dur * frac)))  # min 0.8s per sent
-        start = cur_t
-        for s, a in allocs:
-            end = min(cur_t + a, start + dur)
-            subs.append(Subtitle(index=idx, start=cur_t, end=end, text=s))
+    for text, dur in sections:
+        for sub in section_subtitles(text, cur_t, dur, idx):
             idx += 1
-            cur_t = end
+            yield sub
         # Ensure we end exactly at section end
-        cur_t = start + dur
-    return subs
+        cur_t += dur
+
+
+def build_subtitles(section_texts: List[str], section_durations: List[float]) -> List[Subtitle]:
+    return list(iter_subtitles(zip(section_texts, section_durations)))
+
+
+def format_cue(sub: Subtitle, fmt: str = "srt") -> str:
+    """One SRT or WebVTT cue, including its trailing blank line."""
+    sep = "." if fmt == "vtt" else ","
+    return f"{sub.index}\n{_format_ts(sub.start, sep)} --> {_format_ts(sub.end, sep)}\n{sub.text}\n\n"
 
 
 def to_srt(subs: List[Subtitle]) -> str:
-    lines = []
-    for s in subs:
-        lines.append(str(s.index))
-        lines.append(f"{_format_ts(s.start)} --> {_format_ts(s.end)}")
-        lines.append(s.text)
-        lines.append("")
-    return "\n".join(lines)
+    return "".join(format_cue(s) for s in subs)
+
+
+class SubtitleWriter:
+    """Writes SRT or WebVTT cues to a file as each section's narration length becomes known.
+
+    Sections must be added in order. The format follows the file extension
+    (`.vtt` is WebVTT, anything else SRT) unless `fmt` is given. Usable as a
+    context manager.
+    """
+
+    def __init__(self, path: str, fmt: Optional[str] = None):
+        self.path = path
+        self.fmt = fmt or ("vtt" if path.lower().endswith(".vtt") else "srt")
+        self.time = 0.0
+        self.count = 0
+        self._f: IO[str] = open(path, "w", encoding="utf-8")
+        if self.fmt == "vtt":
+            self._f.write("WEBVTT\n\n")
+
+    def add(self, text: str, duration: float) -> None:
+        for sub in section_subtitles(text, self.time, duration, self.count + 1):
+            self._f.write(format_cue(sub, self.fmt))
+            self.count += 1
+        self.time += duration
+
+    def close(self) -> None:
+        self._f.close()
+
+    def __enter__(self) -> "SubtitleWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -1,29 +1,58 @@
 import os
+import struct
 import tempfile
+import time
+import wave
 import asyncio
-from typing import Optional
+from typing import Callable, List, Optional, Tuple
+
+from .audio import probe_duration
+from .tts_cache import TTSCache
+from .tts_pool import EnginePool, apply_pyttsx3_settings
 
 
 class TTS:
     """TTS abstraction supporting 'edge' (Microsoft) and 'pyttsx3' (offline).
 
     Default provider is 'edge' if available, else falls back to 'pyttsx3'.
+    The 'stub' provider writes deterministic tone/silence audio whose length
+    follows the word count and rate; it is meant for tests and benchmarks.
+    Pass a `TTSCache` to reuse narration across runs. `communicate` replaces
+    `edge_tts.Communicate` (e.g. with a local stand-in for offline runs).
+    With pyttsx3, `workers` > 1 synthesizes on that many engine processes
+    (see `EnginePool`) instead of the single in-process engine. `close()` (or
+    leaving a `with` block) stops those processes.
     """
 
-    def __init__(self, voice: Optional[str] = None, rate: int = 180, provider: Optional[str] = None):
+    def __init__(
+        self,
+        voice: Optional[str] = None,
+        rate: int = 180,
+        provider: Optional[str] = None,
+        cache: Optional[TTSCache] = None,
+        communicate: Optional[Callable] = None,
+        workers: int = 1,
+    ):
         self.voice = voice
         self.rate = rate
-        self.provider = provider or self._default_provider()
-        if self.provider == "pyttsx3":
+        self.workers = max(1, workers)
+        self.pool: Optional[EnginePool] = None
+        self._engine = None
+        self.provider = provider or ("edge" if communicate else self._default_provider())
+        self.cache = cache
+        if self.provider == "stub":
+            pass
+        elif self.provider == "pyttsx3":
             try:
                 import pyttsx3  # type: ignore
             except ImportError as e:
                 raise SystemExit("pyttsx3 not installed. Install with `pip install pyttsx3`." ) from e
-            self._engine = pyttsx3.init()
-            if voice:
-                self._set_voice_pyttsx3(voice)
-            if rate:
-                self._engine.setProperty("rate", rate)
+            if self.workers > 1:
+                self.pool = EnginePool(self.workers, voice, rate)
+            else:
+                self._local_engine()
+        elif communicate is not None:
+            self._communicate = communicate
         else:
             # edge-tts is async
             try:
@@ -31,6 +60,7 @@ class TTS:
             except ImportError as e:
                 raise SystemExit("edge-tts not installed. Install with `pip install edge-tts`." ) from e
             self._edge_tts = edge_tts
+            self._communicate = edge_tts.Communicate
 
     def _default_provider(self) -> str:
         try:
@@ -39,17 +69,35 @@ class TTS:
         except Exception:
             return "pyttsx3"
 
-    # ============ pyttsx3 backend ============
-    def _set_voice_pyttsx3(self, name_or_id: str) -> None:
-        voices = self._engine.getProperty("voices")
-        for v in voices:
-            if name_or_id.lower() in (getattr(v, "name", "") or "").lower() or name_or_id.lower() in (getattr(v, "id", "") or "").lower():
-                self._engine.setProperty("voice", v.id)
-                return
+    @property
+    def parallel(self) -> bool:
+        """Whether `synthesize` may be called from several threads at once."""
+        return self.provider == "edge" or self.pool is not None
+
+    def close(self) -> None:
+        """Stop the pyttsx3 engine processes, if any."""
+        if self.pool is not None:
+            self.pool.shutdown()
+
+    def __enter__(self) -> "TTS":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _local_engine(self):
+        # The in-process engine; with a pool it is only created if asked for directly.
+        if self._engine is None:
+            import pyttsx3  # type: ignore
 
+            self._engine = pyttsx3.init()
+            apply_pyttsx3_settings(self._engine, self.voice, self.rate)
+        return self._engine
+
+    # ============ pyttsx3 backend ============
     def list_voices(self):
         if self.provider == "pyttsx3":
-            voices = self._engine.getProperty("voices")
+            voices = self._local_engine().getProperty("voices")
             return [(v.id, getattr(v, "name", v.id)) for v in voices]
         else:
             # edge-tts voice list requires network; return empty to keep API simple
@@ -59,26 +107,166 @@ class TTS:
         """Synthesize `text` to an audio file and return its path.
         For edge-tts, writes mp3; for pyttsx3, writes wav.
         """
+        if self.provider == "stub":
+            return self._synthesize_stub(text, out_path)
         if self.provider == "pyttsx3":
             return self._synthesize_pyttsx3(text, out_path)
         return asyncio.run(self._synthesize_edge(text, out_path, ext))
 
+    def synthesize(self, text: str) -> Tuple[str, float]:
+        """Synthesize `text` and return (audio_path, duration_seconds).
+
+        Goes through the cache when one is configured; cached paths are owned by
+        the cache and must not be deleted by the caller.
+        """
+        key = self.cache.make_key(self.provider, self.voice, self.rate, text) if self.cache else None
+        hit = self.cache.get(key) if key else None
+        if hit:
+            return hit
+        if self.pool is not None:
+            path, dur, _ = self.pool.speak(text)
+        else:
+            path = self.synthesize_to_file(text)
+            dur = probe_duration(path)
+        return self.cache.put(key, path, dur) if key else (path, dur)
+
+    def synthesize_many(
+        self,
+        texts: List[str],
+        concurrency: int = 4,
+        retries: int = 3,
+        backoff: float = 0.5,
+        on_done: Optional[Callable[[int, float, bool], None]] = None,
+    ) -> List[Tuple[str, float]]:
+        """Synthesize a batch of texts and return (audio_path, duration) in input order.
+
+        Cache hits are served directly and duplicate texts are synthesized once.
+        For edge-tts all misses run on a single event loop with at most
+        `concurrency` requests in flight; failed requests are retried up to
+        `retries` times with exponential backoff starting at `backoff` seconds.
+        With a pyttsx3 engine pool the misses are spread over its processes.
+        `on_done(index, seconds, cached)` is called as each text is resolved.
+        """
+        results: List[Optional[Tuple[str, float]]] = [None] * len(texts)
+        pending: dict = {}  # cache key -> indices sharing that text
+        for i, text in enumerate(texts):
+            key = self.cache.make_key(self.provider, self.voice, self.rate, text) if self.cache else text
+            if key in pending:
+                pending[key].append(i)
+                continue
+            hit = self.cache.get(key) if self.cache else None
+            if hit:
+                results[i] = hit
+                if on_done:
+                    on_done(i, 0.0, True)
+            else:
+                pending[key] = [i]
+
+        if pending:
+            batch = [texts[idx[0]] for idx in pending.values()]
+            elapsed = [0.0] * len(batch)
+            durations: List[Optional[float]] = [None] * len(batch)
+            if self.pool is not None:
+                paths = []
+                for j, (path, dur, seconds) in enumerate(self.pool.speak_many(batch)):
+                    paths.append(path)
+                    durations[j] = dur
+                    elapsed[j] = seconds
+            elif self.provider in ("pyttsx3", "stub"):
+                paths = []
+                for j, t in enumerate(batch):
+                    t0 = time.perf_counter()
+                    paths.append(self.synthesize_to_file(t))
+                    elapsed[j] = time.perf_counter() - t0
+            else:
+                paths = asyncio.run(self._synthesize_edge_many(batch, concurrency, retries, backoff, elapsed))
+            for j, ((key, indices), path) in enumerate(zip(pending.items(), paths)):
+                dur = durations[j] if durations[j] is not None else probe_duration(path)
+                res = self.cache.put(key, path, dur) if self.cache else (path, dur)
+                for i in indices:
+                    results[i] = res
+                    if on_done:
+                        on_done(i, elapsed[j], False)
+        return results  # type: ignore[return-value]
+
+    async def _synthesize_edge_many(
+        self, texts: List[str], concurrency: int, retries: int, backoff: float, elapsed: List[float]
+    ) -> List[str]:
+        sem = asyncio.Semaphore(max(1, concurrency))
+
+        async def one(j: int, text: str) -> str:
+            async with sem:
+                attempt = 0
+                t0 = time.perf_counter()
+                while True:
+                    try:
+                        path = await self._synthesize_edge(text, None, None)
+                        elapsed[j] = time.perf_counter() - t0
+                        return path
+                    except Exception:
+                        if attempt >= retries:
+                            raise
+                        await asyncio.sleep(backoff * (2 ** attempt))
+                        attempt += 1
+
+        return await asyncio.gather(*(one(j, t) for j, t in enumerate(texts)))
+
+    # ============ stub backend ============
+    def stub_duration(self, text: str) -> float:
+        """Length of the stub narration: one word per `60 / rate` seconds plus a short tail."""
+        words = max(1, len(text.split()))
+        return round(words * 60.0 / max(self.rate, 1) + 0.25, 3)
+
+    def _synthesize_stub(self, text: str, out_path: Optional[str]) -> str:
+        if not out_path:
+            fd, tmp = tempfile.mkstemp(suffix=".wav", prefix="tts_")
+            os.close(fd)
+            out_path = tmp
+        sr = 16000
+        word = int(sr * 60.0 / max(self.rate, 1))
+        tone_len = int(word * 0.7)
+        # One cycle of a quiet 400 Hz square-ish tone per word, then silence.
+        period = sr // 400
+        cycle = struct.pack(f"<{period}h", *([2000] * (period // 2) + [-2000] * (period - period // 2)))
+        tone = (cycle * (tone_len // period + 1))[: tone_len * 2]
+        unit = tone + b"\0\0" * (word - tone_len)
+        total = int(round(self.stub_duration(text) * sr))
+        words = max(1, len(text.split()))
+        frames = (unit * words)[: total * 2]
+        frames += b"\0\0" * (total - len(frames) // 2)
+        with wave.open(out_path, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(sr)
+            w.writeframes(frames)
+        return out_path
+
     def _synthesize_pyttsx3(self, text: str, out_path: Optional[str]) -> str:
         if not out_path:
             fd, tmp = tempfile.mkstemp(suffix=".wav", prefix="tts_")
             os.close(fd)
             out_path = tmp
-        self._engine.save_to_file(text, out_path)
-        self._engine.runAndWait()
+        engine = self._local_engine()
+        engine.save_to_file(text, out_path)
+        engine.runAndWait()
         return out_path
 
     async def _synthesize_edge(self, text: str, out_path: Optional[str], ext: Optional[str]) -> str:
         voice = self.voice or "en-US-AriaNeural"
+        owned = not out_path
         if not out_path:
             suffix = ".mp3" if (ext or ".mp3").lower() == ".mp3" else ".wav"
             fd, tmp = tempfile.mkstemp(suffix=suffix, prefix="tts_")
             os.close(fd)
             out_path = tmp
-        communicate = self._edge_tts.Communicate(text=text, voice=voice, rate=f"{self.rate-180:+d}%")
-        await communicate.save(out_path)
+        communicate = self._communicate(text=text, voice=voice, rate=f"{self.rate-180:+d}%")
+        try:
+            await communicate.save(out_path)
+        except BaseException:
+            if owned:
+                try:
+                    os.remove(out_path)
+                except OSError:
+                    pass
+            raise
         return out_path
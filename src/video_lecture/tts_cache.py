@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Optional
+
+from .cache import DiskCache
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+class TTSCache(DiskCache):
+    """Narration store keyed by a hash of (provider, voice, rate, normalized text).
+
+    Entries hold the synthesized audio and its measured duration.
+    """
+
+    @staticmethod
+    def make_key(provider: str, voice: Optional[str], rate: int, text: str) -> str:
+        payload = json.dumps([provider, voice or "", int(rate), normalize_text(text)], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from .audio import probe_duration
+
+
+def apply_pyttsx3_settings(engine, voice: Optional[str], rate: int) -> None:
+    """Select the first voice whose name or id contains `voice`, and set the rate (WPM)."""
+    if voice:
+        for v in engine.getProperty("voices"):
+            if voice.lower() in (getattr(v, "name", "") or "").lower() or voice.lower() in (getattr(v, "id", "") or "").lower():
+                engine.setProperty("voice", v.id)
+                break
+    if rate:
+        engine.setProperty("rate", rate)
+
+
+# Per worker process: the engine, the settings it was created with, and what creates it.
+_engine = None
+_settings: Tuple[Optional[str], int] = (None, 180)
+_factory: Optional[Callable[[], object]] = None
+
+
+def _init_worker(voice: Optional[str], rate: int, factory: Optional[Callable[[], object]] = None) -> None:
+    global _settings, _factory
+    _settings = (voice, rate)
+    _factory = factory
+    _get_engine()
+
+
+def _get_engine():
+    global _engine
+    if _engine is None:
+        if _factory is not None:
+            engine = _factory()
+        else:
+            import pyttsx3  # type: ignore
+
+            engine = pyttsx3.init()
+        apply_pyttsx3_settings(engine, *_settings)
+        _engine = engine
+    return _engine
+
+
+def _speak(text: str) -> Tuple[str, float, float]:
+    # (wav path, duration, seconds spent); runs in a worker process.
+    global _engine
+    fd, out_path = tempfile.mkstemp(suffix=".wav", prefix="tts_")
+    os.close(fd)
+    t0 = time.perf_counter()
+    try:
+        engine = _get_engine()
+        engine.save_to_file(text, out_path)
+        engine.runAndWait()
+        return out_path, probe_duration(out_path), time.perf_counter() - t0
+    except BaseException:
+        _engine = None  # start from a fresh engine for the next text
+        try:
+            os.remove(out_path)
+        except OSError:
+            pass
+        raise
+
+
+class EnginePool:
+    """Offline narration on `workers` processes, each owning an initialized pyttsx3 engine.
+
+    Voice and rate are applied once per process. Texts are spread over the
+    workers and results come back in input order as (path, duration, seconds).
+    A failed text is retried up to `retries` times: an engine error resets
+    that worker's engine, and a crashed worker (which breaks the whole
+    process pool) restarts the pool. Workers are spawned rather than forked,
+    since speech engines hold native state that does not survive a fork.
+    `engine_factory` (a picklable callable) replaces `pyttsx3.init` for
+    creating each worker's engine.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        voice: Optional[str] = None,
+        rate: int = 180,
+        retries: int = 2,
+        engine_factory: Optional[Callable[[], object]] = None,
+    ):
+        self.workers = max(1, workers)
+        self.voice = voice
+        self.rate = rate
+        self.retries = retries
+        self.engine_factory = engine_factory
+        self.restarts = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.voice, self.rate, self.engine_factory),
+                )
+            return self._executor
+
+    def _restart(self, broken: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is broken:  # another caller may have restarted it already
+                self._executor = None
+                self.restarts += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, text: str) -> Tuple[ProcessPoolExecutor, "Future[Tuple[str, float, float]]"]:
+        pool = self._pool()
+        try:
+            return pool, pool.submit(_speak, text)
+        except BrokenProcessPool:
+            self._restart(pool)
+            pool = self._pool()
+            return pool, pool.submit(_speak, text)
+
+    def speak(self, text: str) -> Tuple[str, float, float]:
+        """Synthesize one text, blocking; safe to call from several threads."""
+        return self.speak_many([text])[0]
+
+    def speak_many(self, texts: Sequence[str]) -> List[Tuple[str, float, float]]:
+        """Synthesize `texts` across the workers; returns (path, duration, seconds) in input order."""
+        results: List[Optional[Tuple[str, float, float]]] = [None] * len(texts)
+        todo = list(range(len(texts)))
+        for attempt in range(self.retries + 1):
+            jobs = [(i, *self._submit(texts[i])) for i in todo]
+            failed: List[int] = []
+            error: Optional[BaseException] = None
+            for i, pool, fut in jobs:
+                try:
+                    results[i] = fut.result()
+                except BrokenProcessPool as e:
+                    self._restart(pool)
+                    failed.append(i)
+                    error = e
+                except Exception as e:
+                    failed.append(i)
+                    error = e
+            if not failed:
+                break
+            if attempt == self.retries:
+                raise error  # type: ignore[misc]
+            todo = failed
+        return results  # type: ignore[return-value]
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._executor = self._executor, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, TextIO, Tuple
+
+from .assemble import LectureMaker
+from .cli import build_parser, make_maker, run
+from .metrics import Instrumentation
+
+# CLI options that shape a LectureMaker; jobs that agree on these share warm makers.
+_MAKER_FIELDS = (
+    "width", "height", "theme", "font", "voice", "rate", "tts_provider", "kenburns", "no_cache",
+    "cache_dir", "tts_cache_mb", "segment_cache_mb", "tts_concurrency", "render_workers", "engine", "bitrate",
+    "encode_profile", "crf", "max_temp_mb", "music_volume", "music_duck", "loudness", "no_normalize",
+)
+
+
+class MakerPool:
+    """Keeps idle LectureMakers (TTS engine, caches) warm between jobs.
+
+    A maker is only used by one job at a time; concurrent jobs with the same
+    settings each get their own instance. At most `max_idle` makers are kept;
+    the least recently used one beyond that is closed, which stops its TTS
+    engine processes.
+    """
+
+    def __init__(self, max_idle: int = 4):
+        self.max_idle = max(0, max_idle)
+        self._idle: List[Tuple[Tuple, LectureMaker]] = []  # least recently released first
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(args: argparse.Namespace) -> Tuple:
+        return tuple(getattr(args, f) for f in _MAKER_FIELDS)
+
+    def acquire(self, args: argparse.Namespace) -> LectureMaker:
+        key = self.key(args)
+        with self._lock:
+            for j in range(len(self._idle) - 1, -1, -1):
+                if self._idle[j][0] == key:
+                    return self._idle.pop(j)[1]
+        return make_maker(args)
+
+    def release(self, args: argparse.Namespace, maker: LectureMaker) -> None:
+        with self._lock:
+            self._idle.append((self.key(args), maker))
+            evicted = self._idle[: max(0, len(self._idle) - self.max_idle)]
+            del self._idle[: len(evicted)]
+        for _, old in evicted:
+            old.close()
+
+    def close(self) -> None:
+        """Close every idle maker."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for _, maker in idle:
+            maker.close()
+
+
+class Worker:
+    """Runs render jobs read as JSON lines and reports events as JSON lines.
+
+    Each job is `{"id": ..., "args": [<cli args>]}` using the same arguments as
+    `python -m src.video_lecture.cli`. Events are written to `out` as
+    `{"id": ..., "event": "started" | "result" | "error", ...}`, interleaved
+    with the build's instrumentation events (`stage_start`, `stage_end`,
+    `progress`) tagged with the same id.
+    """
+
+    def __init__(self, out: TextIO, jobs: int = 1):
+        self.out = out
+        self.pool = MakerPool()
+        self.executor = ThreadPoolExecutor(max_workers=max(1, jobs))
+        self._out_lock = threading.Lock()
+
+    def emit(self, event: dict) -> None:
+        line = json.dumps(event)
+        with self._out_lock:
+            self.out.write(line + "\n")
+            self.out.flush()
+
+    def submit(self, job: dict) -> None:
+        self.executor.submit(self._run_job, job)
+
+    def _run_job(self, job: dict) -> None:
+        job_id = job.get("id")
+        try:
+            args = build_parser().parse_args([str(a) for a in job.get("args", [])])
+        except SystemExit:
+            self.emit({"id": job_id, "event": "error", "error": "invalid arguments"})
+            return
+        self.emit({"id": job_id, "event": "started"})
+        maker = None
+        try:
+            maker = self.pool.acquire(args)
+            cache = maker.tts.cache
+            hits0, misses0 = (cache.hits, cache.misses) if cache else (0, 0)
+            instr = Instrumentation(hooks=[lambda ev: self.emit({"id": job_id, **ev})])
+            video_path, srt_path = run(args, maker, instr)
+        except (Exception, SystemExit) as e:
+            traceback.print_exc(file=sys.stderr)
+            self.emit({"id": job_id, "event": "error", "error": str(e) or type(e).__name__})
+            return
+        finally:
+            if maker is not None:
+                self.pool.release(args, maker)
+        result = {"id": job_id, "event": "result", "video": video_path, "srt": srt_path}
+        if cache:
+            result["tts_cache"] = {"hits": cache.hits - hits0, "misses": cache.misses - misses0}
+        self.emit(result)
+
+    def serve(self, stream: TextIO) -> None:
+        self.emit({"event": "ready", "pid": os.getpid()})
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                job = json.loads(line)
+            except ValueError:
+                self.emit({"event": "error", "error": "malformed job line"})
+                continue
+            if job.get("cmd") == "shutdown":
+                break
+            self.submit(job)
+        self.executor.shutdown(wait=True)
+        self.pool.close()
+
+
+def _protocol_stdout() -> TextIO:
+    """Return a private handle on the real stdout and point fd 1 at stderr.
+
+    MoviePy, ffmpeg and TTS engines may print to stdout; that must not corrupt
+    the JSON-lines stream the parent process is reading.
+    """
+    sys.stdout.flush()
+    out = os.fdopen(os.dup(1), "w", encoding="utf-8", buffering=1)
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+    return out
+
+
+def main():
+    p = argparse.ArgumentParser(description="Long-lived render worker: JSON-lines jobs on stdin, events on stdout.")
+    p.add_argument("--jobs", "-j", type=int, default=1, help="Number of lectures to render concurrently")
+    args = p.parse_args()
+
+    worker = Worker(_protocol_stdout(), jobs=args.jobs)
+    worker.serve(sys.stdin)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import wave
+
+import pytest
+
+from src.video_lecture.audio import probe_duration
+from src.video_lecture.encode import probe_media, run_ffmpeg
+
+# MPEG-1 layer III bitrates (kbit/s) by header index.
+_KBPS = (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+
+
+def _ffmpeg_duration(path):
+    # ffmpeg prints the duration rounded to 10 ms.
+    return pytest.approx(probe_media(str(path))[0], abs=0.0051)
+
+
+def _mp3(tmp_path, name, *args, seconds=3.3):
+    path = tmp_path / name
+    try:
+        run_ffmpeg(
+            ["-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}", "-c:a", "libmp3lame", *args, str(path)]
+        )
+    except RuntimeError as e:
+        pytest.skip(f"ffmpeg cannot encode MP3 here: {e}")
+    return path
+
+
+def _count_frames(data):
+    # Walk a tag-free MPEG-1 layer III stream frame by frame.
+    pos = count = 0
+    while pos + 4 <= len(data) and data[pos] == 0xFF:
+        b2 = data[pos + 2]
+        pos += 144000 * _KBPS[b2 >> 4] // (44100, 48000, 32000)[(b2 >> 2) & 3] + ((b2 >> 1) & 1)
+        count += 1
+    assert pos == len(data)
+    return count
+
+
+def test_wav(tmp_path):
+    path = tmp_path / "clip.wav"
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(22050)
+        w.writeframes(b"\0\0" * (22050 * 3 // 2))
+    assert probe_duration(str(path)) == pytest.approx(1.5)
+    assert probe_duration(str(path)) == _ffmpeg_duration(path)
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["-q:a", "5"],  # VBR with a Xing header
+        ["-q:a", "7", "-ac", "1", "-ar", "16000"],  # MPEG-2, mono side info
+        ["-b:a", "64k"],  # CBR with an Info header
+    ],
+    ids=["vbr-xing", "mpeg2-mono-xing", "cbr-info"],
+)
+def test_mp3_with_frame_count_header(tmp_path, args):
+    path = _mp3(tmp_path, "clip.mp3", *args)
+    assert probe_duration(str(path)) == _ffmpeg_duration(path)
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["-b:a", "64k", "-write_xing", "0"],  # ID3v2 tag before the first frame
+        ["-b:a", "32k", "-ar", "22050", "-write_xing", "0", "-id3v2_version", "0", "-write_id3v1", "1"],
+    ],
+    ids=["id3v2", "mpeg2-id3v1"],
+)
+def test_headerless_cbr_mp3(tmp_path, args):
+    path = _mp3(tmp_path, "clip.mp3", *args)
+    assert probe_duration(str(path)) == _ffmpeg_duration(path)
+
+
+def test_vbr_mp3_with_vbri_header(tmp_path):
+    # A quiet first half makes the first frames small, so the bitrate guess would be far off.
+    raw = _mp3(
+        tmp_path, "raw.mp3", "-af", "volume='if(lt(t,2),0.001,1)':eval=frame", "-q:a", "2",
+        "-write_xing", "0", "-id3v2_version", "0", seconds=4,
+    )
+    data = raw.read_bytes()
+    frames = _count_frames(data)
+    # An empty 128 kbit/s frame carrying the VBRI header, as Fraunhofer encoders write it.
+    info = bytearray(417)
+    info[:4] = b"\xff\xfb\x90\x00"
+    info[36:54] = b"VBRI" + (1).to_bytes(2, "big") + bytes(4) + len(data).to_bytes(4, "big") + frames.to_bytes(4, "big")
+    path = tmp_path / "vbri.mp3"
+    path.write_bytes(bytes(info) + data)
+    assert probe_duration(str(path)) == pytest.approx(frames * 1152 / 44100)
+    assert probe_duration(str(path)) == _ffmpeg_duration(path)
+    assert probe_duration(str(raw)) != pytest.approx(frames * 1152 / 44100, abs=0.5)
+
+
+def test_mp3_without_mpeg_frames_falls_back_to_ffmpeg(tmp_path):
+    # ADTS AAC shares the 0xFFF sync word but is not an MPEG audio frame.
+    path = tmp_path / "clip.mp3"
+    run_ffmpeg(["-f", "lavfi", "-i", "sine=duration=2.5", "-c:a", "aac", "-f", "adts", str(path)])
+    assert probe_duration(str(path)) == _ffmpeg_duration(path)
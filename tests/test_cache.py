@@ -0,0 +1,71 @@
+import os
+import time
+
+import pytest
+
+from src.video_lecture.cache import DiskCache
+
+
+def _file(tmp_path, name, size):
+    path = tmp_path / name
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+
+def _age(cache, key, seconds):
+    # Pretend the entry was last used `seconds` ago.
+    t = time.time() - seconds
+    os.utime(cache._meta_path(key), (t, t))
+
+
+def _stray_temp_files(root):
+    return [n for _, _, names in os.walk(root) for n in names if n.startswith(".tmp_")]
+
+
+def test_evicts_least_recently_used_first(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache"), max_bytes=350, min_age=0)
+    for k, key in enumerate(["aa1", "bb2", "cc3"]):
+        cache.put(key, _file(tmp_path, f"{key}.mp4", 100), 1.0)
+        _age(cache, key, 30 - 10 * k)
+    assert cache.get("aa1")  # a hit makes aa1 the most recently used
+    cache.put("dd4", _file(tmp_path, "dd4.mp4", 100), 1.0)
+    assert cache.get("bb2") is None
+    assert all(cache.get(k) for k in ("aa1", "cc3", "dd4"))
+    assert cache.stats()["bytes"] == 300
+
+
+def test_recent_entries_are_not_evicted(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache"), max_bytes=250, min_age=60)
+    for key in ("aa1", "bb2", "cc3"):
+        cache.put(key, _file(tmp_path, f"{key}.mp4", 100), 1.0)
+    assert all(cache.get(k) for k in ("aa1", "bb2", "cc3"))
+    assert cache.stats()["bytes"] == 300
+
+    _age(cache, "bb2", 120)
+    cache.evict()
+    assert cache.get("bb2") is None
+    assert cache.get("aa1") and cache.get("cc3")
+    assert cache.stats()["bytes"] == 200
+
+
+def test_overwriting_a_key_counts_its_file_once(tmp_path):
+    root = str(tmp_path / "cache")
+    cache = DiskCache(root, max_bytes=10_000, min_age=0)
+    cache.put("aa1", _file(tmp_path, "one.mp4", 100), 1.0)
+    cache.put("aa1", _file(tmp_path, "two.mp4", 100), 1.0)
+    assert cache.stats()["bytes"] == 100
+    cache.put("aa1", _file(tmp_path, "three.mp4", 40), 1.0)
+    cache.put("bb2", _file(tmp_path, "four.mp4", 60), 2.0)
+    assert cache.stats()["bytes"] == 100
+    assert DiskCache(root).stats()["bytes"] == 100  # matches a fresh scan
+    assert cache.get("bb2")[1] == 2.0
+
+
+def test_failed_put_leaves_no_temp_file(tmp_path):
+    root = str(tmp_path / "cache")
+    cache = DiskCache(root, min_age=0)
+    with pytest.raises(OSError):
+        cache.put("aa1", str(tmp_path / "missing.mp4"), 1.0)
+    assert _stray_temp_files(root) == []
+    assert cache.get("aa1") is None
+    assert cache.stats()["bytes"] == 0
@@ -0,0 +1,18 @@
+import json
+import os
+import stat
+
+from src.video_lecture.manifest import manifest_path, write_manifest
+
+
+def test_manifest_follows_the_umask(tmp_path):
+    old = os.umask(0o022)
+    try:
+        path = write_manifest(manifest_path(str(tmp_path / "lecture.mp4")), {"fps": 30}, [{"hash": "abc"}])
+    finally:
+        os.umask(old)
+    assert path == str(tmp_path / "lecture.manifest.json")
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == {"version": 1, "settings": {"fps": 30}, "sections": [{"hash": "abc"}]}
+    assert os.listdir(tmp_path) == ["lecture.manifest.json"]
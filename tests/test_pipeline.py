@@ -0,0 +1,88 @@
+import gc
+import hashlib
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from src.video_lecture.assemble import LectureMaker
+from src.video_lecture.pipeline import SegmentEncoder
+from src.video_lecture.slides import Section, SlideFrame, _get_pool
+
+
+def _sections(count):
+    return [Section(title=f"Slide {k}", body="- a point\n- another point" * (k % 3 + 1)) for k in range(count)]
+
+
+def _build(tmp_path, name, sections, **kw):
+    root = tmp_path / name
+    with LectureMaker(size=(320, 180), tts_provider="stub", cache_dir=str(root / "cache"), render_workers=1) as maker:
+        maker.build(sections, str(root / "out.mp4"), fps=10, crossfade=0.3, **kw)
+        with open(root / "out.manifest.json", "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        segments = {}
+        for entry in manifest["sections"]:
+            for key in (entry["segment"], entry["fade"]):
+                if key:
+                    segments[key] = _digest(maker.segment_cache.get(key)[0])
+    return manifest, segments, _digest(root / "out.mp4"), _digest(root / "out.srt")
+
+
+def _digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def test_streaming_build_matches_the_batch_build(tmp_path):
+    sections = _sections(5)
+    assert _build(tmp_path, "streaming", sections, streaming=True) == _build(tmp_path, "batch", sections)
+
+
+def _live_slides():
+    gc.collect()
+    return [o for o in gc.get_objects() if isinstance(o, SlideFrame) and o._refs > 0]
+
+
+def _shm_blocks():
+    return {n for n in os.listdir("/dev/shm") if n.startswith("psm_")}
+
+
+def _wait_for_threads(before):
+    deadline = time.monotonic() + 5
+    while set(threading.enumerate()) - before and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return set(threading.enumerate()) - before
+
+
+def _fail_after(calls, fn):
+    count = [0]
+
+    def wrapper(*args, **kw):
+        count[0] += 1
+        if count[0] > calls:
+            raise RuntimeError("encoder failed")
+        return fn(*args, **kw)
+
+    return wrapper
+
+
+@pytest.mark.skipif(not os.path.isdir("/dev/shm"), reason="needs POSIX shared memory")
+@pytest.mark.parametrize("where", ["encode", "submit"])
+def test_encoder_failure_stops_every_stage(tmp_path, monkeypatch, where):
+    _get_pool(2).submit(int).result()  # the shared slide pool (and its manager thread) outlives builds
+    before = set(threading.enumerate())
+    blocks = _shm_blocks()
+    with LectureMaker(size=(320, 180), tts_provider="stub", render_workers=2) as maker:
+        if where == "encode":
+            # Fails inside an encoder thread; surfaces when the segments are collected.
+            maker._encode_segment = _fail_after(2, maker._encode_segment)
+        else:
+            # Fails on the calling thread mid-build, while both stages are still busy.
+            monkeypatch.setattr(SegmentEncoder, "submit", _fail_after(2, SegmentEncoder.submit))
+        with pytest.raises(RuntimeError, match="encoder failed"):
+            maker.build(_sections(20), str(tmp_path / "out.mp4"), fps=10, streaming=True, queue_depth=2)
+    assert _wait_for_threads(before) == set()
+    assert _live_slides() == []
+    assert _shm_blocks() - blocks == set()
@@ -0,0 +1,97 @@
+import os
+import time
+
+import pytest
+
+from src.video_lecture.shard import ShardQueue
+from src.video_lecture.slides import Section
+
+LEASE = 0.2
+
+
+@pytest.fixture
+def queue(tmp_path):
+    sections = [Section(title=f"Slide {k}", body="text") for k in range(3)]
+    return ShardQueue.create(
+        str(tmp_path / "queue"), sections, [], "lecture.mp4", shard_size=3, lease_seconds=LEASE, max_attempts=2
+    )
+
+
+def _expire(queue, lease):
+    # Back-date the heartbeat instead of sleeping through the lease.
+    t = time.time() - 2 * LEASE
+    os.utime(queue._dir("leases", lease.name), (t, t))
+
+
+def _publish(lease):
+    with open(os.path.join(lease.staging, "result.json"), "w") as f:
+        f.write("{}")
+    return lease.complete()
+
+
+def test_only_one_claimer_wins(queue):
+    other = ShardQueue(queue.path)
+    lease = queue.claim("a")
+    assert (lease.shard, lease.attempt) == (0, 1)
+    assert other.claim("b") is None
+    assert queue.states() == ["leased"]
+
+
+def test_claimers_racing_on_the_same_listing_get_one_lease(queue):
+    other = ShardQueue(queue.path)
+    seen = other._attempts()  # b lists the leases before a's claim lands
+    assert queue.claim("a") is not None
+    other._attempts = lambda: seen
+    assert other.claim("b") is None
+    assert os.listdir(queue._dir("leases")) == ["00000.1"]
+
+
+def test_heartbeat_keeps_the_lease(queue):
+    with queue.claim("a").heartbeat():
+        time.sleep(3 * LEASE)
+        assert queue.states() == ["leased"]
+        assert queue.claim("b") is None
+
+
+def test_expired_lease_is_claimed_as_the_next_attempt(queue):
+    first = queue.claim("a")
+    _expire(queue, first)
+    assert queue.states() == ["pending"]
+    second = queue.claim("b")
+    assert (second.shard, second.attempt) == (0, 2)
+    assert _publish(second)
+    assert not _publish(first)  # the stale worker's output is discarded
+    assert not os.path.exists(first.staging)
+    assert queue.states() == ["done"]
+
+
+def test_failed_attempt_is_retried(queue):
+    first = queue.claim("a")
+    first.fail("encoder crashed")
+    assert not os.path.exists(first.staging)
+    assert queue.states() == ["pending"]
+    second = queue.claim("a")
+    assert second.attempt == 2
+    assert queue.states() == ["leased"]
+
+
+def test_out_of_attempts_is_exhausted(queue):
+    queue.claim("a").fail("first")
+    queue.claim("a").fail("second")
+    assert queue.states() == ["exhausted"]
+    assert queue.claim("a") is None
+    assert queue.finished()
+    assert queue.errors() == [(0, "second")]
+    with pytest.raises(RuntimeError, match="second"):
+        queue.wait(poll=0)
+
+
+def test_done_shard_is_never_reclaimed(queue):
+    lease = queue.claim("a")
+    assert _publish(lease)
+    assert os.path.exists(queue._dir("done", "00000/result.json"))
+    _expire(queue, lease)
+    assert queue.states() == ["done"]
+    assert queue.claim("b") is None
+    assert queue.finished()
+    queue.wait(poll=0)
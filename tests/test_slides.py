@@ -0,0 +1,110 @@
+import io
+import os
+import re
+import time
+
+import pytest
+
+from src.video_lecture.assemble import LectureMaker
+from src.video_lecture.renditions import Rendition
+from src.video_lecture.slides import Section, iter_frames, iter_sections, render_slide, split_script
+
+SCRIPTS = {
+    "headings": "# Intro\nWelcome to the course.\n\n## Part one\nFirst idea.\nSecond idea.\n### Deep\n",
+    "bullets": "## Topics\n- alpha\n* beta\n  - nested gamma\n\nClosing line.\n",
+    "rules": "Opening remarks\nmore text\n---\nNext block\n\n---\n\n---\nLast block\n",
+    "blank lines": "First paragraph title\nbody one\n\nSecond paragraph\nbody two\n\n\n",
+    "no heading": (
+        "This opening line is far too long to be used as a title on its own slide, really. "
+        "So the first sentence becomes the title!\nAnd the rest is the body.\n"
+    ),
+    "long line, one sentence": "x" * 80 + "\nbody",
+    "heading without body": "# Only a title",
+    "not a heading": "#hashtag line\nbody\n",
+    "only rules": "---\n\n-----\n",
+    "whitespace": "  \n\t\n",
+    "empty": "",
+    "trailing spaces": "# Title   \nbody   \n   \n---   \n",
+}
+
+
+def _reference_split(text):
+    # split_script as it was before iter_sections (the sentence-chunk fallback could
+    # only run on blank text, where it produced nothing).
+    lines = [l.rstrip() for l in text.splitlines()]
+    blocks, cur = [], []
+
+    def push():
+        if cur and any(x.strip() for x in cur):
+            blocks.append(cur.copy())
+        cur.clear()
+
+    for line in lines:
+        if re.match(r"^\s*---+\s*$", line):
+            push()
+            continue
+        if line.startswith("#"):
+            push()
+            cur.append(line)
+            continue
+        cur.append(line if line.strip() else "")
+    push()
+    sections = []
+    for b in blocks if blocks else [lines]:
+        joined = "\n".join(b).strip()
+        if not joined:
+            continue
+        m = re.match(r"^(#+)\s+(.*)$", joined)
+        if m:
+            title, body = m.group(2).strip(), re.sub(r"^#+\s+.*\n?", "", joined).strip()
+        elif len(joined.splitlines()[0]) <= 70:
+            title, body = joined.splitlines()[0].strip(), "\n".join(joined.splitlines()[1:]).strip()
+        else:
+            parts = re.split(r"(?<=[.!?])\s+", joined, maxsplit=1)
+            title, body = parts[0].strip(), parts[1].strip() if len(parts) > 1 else ""
+        sections.append(Section(title=title, body=body))
+    return sections
+
+
+@pytest.mark.parametrize("name", sorted(SCRIPTS))
+def test_parser_matches_the_whole_text_parser(name):
+    text = SCRIPTS[name]
+    assert split_script(text) == _reference_split(text)
+    assert list(iter_sections(io.StringIO(text))) == _reference_split(text)
+
+
+def _shm_blocks():
+    return {n for n in os.listdir("/dev/shm") if n.startswith("psm_")}
+
+
+@pytest.mark.skipif(not os.path.isdir("/dev/shm"), reason="needs POSIX shared memory")
+def test_frames_rendered_ahead_are_freed_when_the_consumer_stops():
+    before = _shm_blocks()
+    sections = [Section(title=f"Slide {k}", body="- one\n- two") for k in range(12)]
+    frames = iter_frames(sections, size=(320, 180), workers=2)
+    first = next(frames)
+    assert first.array().shape == (180, 320, 3)
+    first.release()
+    frames.close()
+    deadline = time.monotonic() + 10
+    while _shm_blocks() - before and time.monotonic() < deadline:
+        time.sleep(0.05)  # jobs already running free their block when they finish
+    assert _shm_blocks() - before == set()
+
+
+def test_slides_are_scaled_only_on_request():
+    section = Section(title="A title long enough to wrap at most sizes", body="- one bullet\n- another bullet")
+    plain = render_slide(section, size=(1280, 720))
+    scaled = render_slide(section, size=(1280, 720), scale=720 / 1080)
+    assert plain.tobytes() != scaled.tobytes()
+    assert render_slide(section, size=(1280, 720), scale=1.0).tobytes() == plain.tobytes()
+
+
+def test_derived_sizes_record_their_layout_in_the_segment_settings():
+    with LectureMaker(size=(1920, 1080), tts_provider="stub") as maker:
+        assert "layout_scale" not in maker.render_settings(30)
+        rendition = maker._for_rendition(Rendition(1280, 720))
+        assert rendition.render_settings(30)["layout_scale"] == pytest.approx(2 / 3, abs=1e-6)
+        assert maker._for_draft().render_settings(30)["layout_scale"] == pytest.approx(1 / 3, abs=1e-6)
+    with LectureMaker(size=(1280, 720), tts_provider="stub") as maker:
+        assert "layout_scale" not in maker.render_settings(30)
@@ -0,0 +1,43 @@
+import pytest
+
+from src.video_lecture.subtitles import SubtitleWriter, build_subtitles, to_srt
+
+SECTIONS = [("Intro. Hello there.", 2.0), ("", 1.5), ("Second.", 1.0)]
+
+CUES = [
+    ("00:00:00{}000", "00:00:00{}800", "Intro."),  # short sentences get at least 0.8 s
+    ("00:00:00{}800", "00:00:02{}000", "Hello there."),  # cut at the section's end
+    ("00:00:03{}500", "00:00:04{}500", "Second."),  # an empty section still takes its time
+]
+
+
+def _expected(sep):
+    return "".join(f"{k}\n{a.format(sep)} --> {b.format(sep)}\n{text}\n\n" for k, (a, b, text) in enumerate(CUES, 1))
+
+
+@pytest.mark.parametrize("ext, header, sep", [("srt", "", ","), ("vtt", "WEBVTT\n\n", ".")])
+def test_writer_output(tmp_path, ext, header, sep):
+    path = tmp_path / f"lecture.{ext}"
+    with SubtitleWriter(str(path)) as subs:
+        for text, dur in SECTIONS:
+            subs.add(text, dur)
+    assert path.read_text(encoding="utf-8") == header + _expected(sep)
+    assert subs.count == 3
+    assert subs.time == pytest.approx(4.5)
+
+
+def test_writer_matches_whole_deck_subtitles(tmp_path):
+    texts = [f"Sentence {k}. And a longer second sentence number {k}!" for k in range(30)]
+    durations = [1.0 + 0.37 * k for k in range(30)]
+    path = tmp_path / "lecture.srt"
+    with SubtitleWriter(str(path)) as subs:
+        for text, dur in zip(texts, durations):
+            subs.add(text, dur)
+    assert path.read_text(encoding="utf-8") == to_srt(build_subtitles(texts, durations))
+
+
+def test_format_follows_the_argument_over_the_extension(tmp_path):
+    path = tmp_path / "captions.txt"
+    with SubtitleWriter(str(path), fmt="vtt") as subs:
+        subs.add("Hello.", 1.0)
+    assert path.read_text(encoding="utf-8").startswith("WEBVTT\n\n1\n00:00:00.000 --> 00:00:01.000\n")
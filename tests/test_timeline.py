@@ -0,0 +1,87 @@
+import math
+import random
+
+import pytest
+
+from src.video_lecture.timeline import Timeline
+
+
+def _brute_active(timeline, t):
+    return [timeline.order[j] for j in range(len(timeline)) if timeline.starts[j] <= t < timeline.ends[j]]
+
+
+def test_back_to_back_boundaries():
+    tl = Timeline.from_durations([2.0, 3.0, 1.0])
+    assert tl.starts == [0.0, 2.0, 5.0]
+    assert tl.active(0.0) == [0]
+    assert tl.active(math.nextafter(2.0, 0)) == [0]
+    assert tl.active(2.0) == [1]  # a clip's end is exclusive, its start inclusive
+    assert tl.active(5.0) == [2]
+    assert tl.top(4.999) == 1
+
+
+def test_crossfade_overlaps():
+    tl = Timeline.from_durations([2.0, 3.0, 1.0], overlap=0.5)
+    assert tl.starts == [0.0, 1.5, 4.0]
+    assert tl.active(1.5) == [0, 1]
+    assert tl.top(1.5) == 1  # the later clip fades in on top
+    assert tl.active(math.nextafter(2.0, 0)) == [0, 1]
+    assert tl.active(2.0) == [1]
+    assert tl.active(4.25) == [1, 2]
+    assert tl.overlapping(1.0, 4.0) == [0, 1, 2]
+    assert tl.overlapping(2.0, 3.9) == [1]
+
+
+def test_long_clip_under_short_ones():
+    # The scan back from `t` must reach a clip that started long before its neighbours.
+    tl = Timeline([0.0, 1.0, 2.0, 8.0], [10.0, 2.0, 3.0, 9.0])
+    assert tl.active(2.5) == [0, 2]
+    assert tl.active(2.0) == [0, 2]
+    assert tl.active(8.5) == [0, 3]
+    assert tl.top(5.0) == 0
+
+
+def test_unsorted_and_tied_starts():
+    tl = Timeline([3.0, 0.0, 0.0], [4.0, 1.0, 2.0])
+    assert tl.active(0.0) == [1, 2]  # ties keep input order, later on top
+    assert tl.top(0.5) == 2
+    assert tl.active(3.0) == [0]
+
+
+def test_gaps_and_past_the_end():
+    tl = Timeline([0.0, 5.0], [1.0, 6.0])
+    assert tl.top(3.0) is None
+    assert tl.active(6.0) == []
+    assert tl.top(6.0) == 1  # the final frame lands on the end: hold the last clip
+    assert tl.top(100.0) == 1
+    assert tl.overlapping(6.0, 7.0) == []
+    assert Timeline([], []).top(0.0) is None
+    assert Timeline([], []).active(0.0) == []
+
+
+def test_frame_segments_meet_exactly():
+    rng = random.Random(7)
+    for fps in (10, 24, 25, 30, 60):
+        frames = [rng.randint(1, 500) for _ in range(200)]
+        tl = Timeline.from_frames(frames, fps)
+        assert tl.ends[:-1] == tl.starts[1:]
+        assert tl.duration == sum(frames) / fps
+        for k, start in enumerate(tl.starts):
+            assert tl.active(start) == [k]
+
+
+def test_matches_a_linear_scan_at_every_boundary():
+    rng = random.Random(13)
+    for _ in range(500):
+        n = rng.randint(1, 25)
+        starts = [rng.choice([rng.uniform(0, 40), round(rng.uniform(0, 40), 1)]) for _ in range(n)]
+        ends = [s + rng.choice([rng.uniform(0.01, 8), round(rng.uniform(0.1, 8), 1)]) for s in starts]
+        tl = Timeline(starts, ends)
+        for v in starts + ends:
+            for t in (math.nextafter(v, -math.inf), v, math.nextafter(v, math.inf)):
+                assert tl.active(t) == _brute_active(tl, t)
+
+
+def test_mismatched_lengths():
+    with pytest.raises(ValueError):
+        Timeline([0.0, 1.0], [1.0])
@@ -0,0 +1,100 @@
+import asyncio
+import os
+import time
+import wave
+from collections import Counter
+
+import pytest
+
+from src.video_lecture.tts import TTS
+
+
+class FakeEdge:
+    """Local stand-in for `edge_tts.Communicate` that records how it is called.
+
+    Each text becomes a silent WAV of `0.1 + 0.01 * len(text)` seconds. Shorter
+    texts take longer to "synthesize", so results finish out of order. A text
+    listed in `fail` raises that many times before it succeeds.
+    """
+
+    def __init__(self, fail=None):
+        self.calls = Counter()
+        self.attempts = {}
+        self.active = 0
+        self.max_active = 0
+        self.fail = dict(fail or {})
+
+    def __call__(self, text, voice, rate):
+        fake = self
+
+        class Communicate:
+            async def save(self, path):
+                fake.calls[text] += 1
+                fake.attempts.setdefault(text, []).append(time.monotonic())
+                fake.active += 1
+                fake.max_active = max(fake.max_active, fake.active)
+                try:
+                    await asyncio.sleep(0.05 / (1 + len(text)))
+                    if fake.fail.get(text, 0) > 0:
+                        fake.fail[text] -= 1
+                        raise ConnectionError("service unavailable")
+                    with wave.open(path, "wb") as w:
+                        w.setnchannels(1)
+                        w.setsampwidth(2)
+                        w.setframerate(16000)
+                        w.writeframes(b"\0\0" * int(16000 * (0.1 + 0.01 * len(text))))
+                finally:
+                    fake.active -= 1
+
+        return Communicate()
+
+
+@pytest.fixture
+def synthesize():
+    paths = set()
+
+    def run(fake, texts, **kw):
+        results = TTS(communicate=fake).synthesize_many(texts, **kw)
+        paths.update(p for p, _ in results)
+        return results
+
+    yield run
+    for p in paths:
+        os.remove(p)
+
+
+def test_results_follow_input_order(synthesize):
+    texts = [f"section {'x' * k}" for k in range(12)]
+    results = synthesize(FakeEdge(), texts, concurrency=4)
+    assert [d for _, d in results] == pytest.approx([0.1 + 0.01 * len(t) for t in texts], abs=1e-3)
+    assert len({p for p, _ in results}) == len(texts)
+
+
+def test_duplicate_texts_are_synthesized_once(synthesize):
+    fake = FakeEdge()
+    results = synthesize(fake, ["intro", "body", "intro", "outro", "intro"], concurrency=4)
+    assert fake.calls == {"intro": 1, "body": 1, "outro": 1}
+    assert results[0] == results[2] == results[4]
+
+
+def test_concurrency_limit(synthesize):
+    fake = FakeEdge()
+    synthesize(fake, [f"text {k}" for k in range(20)], concurrency=3)
+    assert fake.max_active == 3
+
+
+def test_failed_request_is_retried_with_backoff(synthesize):
+    fake = FakeEdge(fail={"flaky": 2})
+    results = synthesize(fake, ["steady", "flaky"], concurrency=2, retries=3, backoff=0.05)
+    assert fake.calls["flaky"] == 3
+    first, second, third = fake.attempts["flaky"]
+    assert second - first >= 0.05
+    assert third - second >= 0.1  # backoff doubles
+    assert results[1][1] == pytest.approx(0.1 + 0.01 * len("flaky"), abs=1e-3)
+
+
+def test_gives_up_after_retries():
+    fake = FakeEdge(fail={"down": 5})
+    with pytest.raises(ConnectionError):
+        TTS(communicate=fake).synthesize_many(["down"], retries=2, backoff=0.01)
+    assert fake.calls["down"] == 3
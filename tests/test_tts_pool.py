@@ -0,0 +1,108 @@
+import functools
+import os
+import wave
+
+import pytest
+
+from src.video_lecture.tts_pool import EnginePool
+
+
+class FakeEngine:
+    """Stand-in for a pyttsx3 engine, created in each pool worker.
+
+    Each text becomes a silent WAV of `0.01 * len(text)` seconds. The first
+    text starting with "fail" raises, and the first starting with "crash" kills
+    its worker process; files in `state_dir` record this across processes,
+    along with the pid of every engine created.
+    """
+
+    def __init__(self, state_dir):
+        self.state_dir = state_dir
+        self.props = {}
+        self.queued = []
+        with open(os.path.join(state_dir, "engines"), "a") as f:
+            f.write(f"{os.getpid()}\n")
+
+    def getProperty(self, name):
+        return [] if name == "voices" else self.props.get(name)
+
+    def setProperty(self, name, value):
+        self.props[name] = value
+
+    def save_to_file(self, text, path):
+        self.queued.append((text, path))
+
+    def runAndWait(self):
+        queued, self.queued = self.queued, []
+        for text, path in queued:
+            if text.startswith("crash") and self._first("crash"):
+                os._exit(1)
+            if text.startswith("fail") and self._first("fail"):
+                raise RuntimeError("engine error")
+            with wave.open(path, "wb") as w:
+                w.setnchannels(1)
+                w.setsampwidth(2)
+                w.setframerate(16000)
+                w.writeframes(b"\0\0" * (160 * len(text)))
+
+    def _first(self, event):
+        try:
+            fd = os.open(os.path.join(self.state_dir, event), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        return True
+
+
+def _engine_pids(state_dir):
+    with open(os.path.join(state_dir, "engines")) as f:
+        return f.read().split()
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = EnginePool(2, retries=2, engine_factory=functools.partial(FakeEngine, str(tmp_path)))
+    yield pool
+    pool.shutdown()
+
+
+def _speak(pool, texts):
+    results = pool.speak_many(texts)
+    for path, _, _ in results:
+        os.remove(path)
+    return [round(dur, 4) for _, dur, _ in results]
+
+
+def test_results_come_back_in_order_after_an_error_and_a_crash(pool, tmp_path):
+    texts = [f"text {'x' * k}" for k in range(6)]
+    texts[1] = "fail once"
+    texts[4] = "crash once"
+    assert _speak(pool, texts) == [round(0.01 * len(t), 4) for t in texts]
+    assert pool.restarts == 1
+
+    # The restarted pool keeps working without further restarts.
+    assert _speak(pool, ["after", "the crash"]) == [0.05, 0.09]
+    assert pool.restarts == 1
+
+
+def test_engine_error_resets_only_the_engine(tmp_path):
+    pool = EnginePool(1, retries=1, engine_factory=functools.partial(FakeEngine, str(tmp_path)))
+    try:
+        assert _speak(pool, ["fail once", "next"]) == [0.09, 0.04]
+        assert pool.restarts == 0
+        # The same worker process created a second engine after the error.
+        pids = _engine_pids(tmp_path)
+        assert len(pids) == 2 and len(set(pids)) == 1
+    finally:
+        pool.shutdown()
+
+
+def test_gives_up_after_retries(tmp_path):
+    pool = EnginePool(1, retries=0, engine_factory=functools.partial(FakeEngine, str(tmp_path)))
+    try:
+        with pytest.raises(RuntimeError, match="engine error"):
+            pool.speak_many(["fail now"])
+        assert _speak(pool, ["fail again"]) == [0.1]  # only the first "fail" text raises
+    finally:
+        pool.shutdown()